@@ -1,13 +1,21 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import random
-import io
 import time
-import math
+import os
+import io
+import json
+import hashlib
+import uuid
+import random
+from contextlib import nullcontext
+from functools import partial
 from datetime import time as dtime
 import matplotlib.pyplot as plt
-from copy import deepcopy
+
+from horarios import (CacheSoluciones, ColaTrabajos, Instancia, TabuScheduler, exportar, huella_tabla, lanzar_trabajo,
+                      leer_entradas, mins_to_str, obtener_trabajo, perfil, resultado_corrida)
+from horarios.motor import MIN_HILOS_CPSAT, TIEMPO_PREASIGNACION
 
 # ==============================================================================
 # 1. ESTÉTICA
@@ -125,610 +133,7 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ==============================================================================
-# 2. UTILIDADES Y TABLAS DE REFERENCIA
-# ==============================================================================
-COMPENSACION_TABLE = [
-    (1, 1, 44, 0.0), (1, 45, 74, 0.5), (1, 75, 104, 1.0), (1, 105, 134, 1.5), (1, 135, 164, 2.0),
-    (2, 1, 37, 0.0), (2, 38, 52, 0.5), (2, 53, 67, 1.0), (2, 68, 82, 1.5), (2, 83, 97, 2.0),
-    (2, 98, 112, 2.5), (2, 113, 127, 3.0), (2, 128, 142, 3.5), (2, 143, 147, 4.0),
-    (3, 1, 34, 0.0), (3, 35, 44, 0.5), (3, 45, 54, 1.0), (3, 55, 64, 1.5), (3, 65, 74, 2.0),
-    (3, 75, 84, 2.5), (3, 85, 94, 3.0), (3, 95, 104, 3.5), (3, 105, 114, 4.0), (3, 115, 124, 4.5),
-    (3, 125, 134, 5.0), (3, 135, 144, 5.5), (3, 145, 154, 6.0),
-    (4, 1, 33, 0.0), (4, 34, 41, 0.5), (4, 42, 48, 1.0), (4, 49, 56, 1.5), (4, 57, 63, 2.0),
-    (4, 64, 71, 2.5), (4, 72, 78, 3.0), (4, 79, 86, 3.5), (4, 87, 93, 4.0), (4, 94, 101, 4.5),
-    (4, 102, 108, 5.0), (4, 109, 116, 5.5), (4, 117, 123, 6.0), (4, 124, 131, 6.5), (4, 132, 138, 7.0),
-    (4, 139, 146, 7.5), (4, 147, 153, 8.0),
-    (5, 1, 32, 0.0), (5, 33, 38, 0.5), (5, 39, 44, 1.0), (5, 45, 50, 1.5), (5, 51, 56, 2.0),
-    (5, 57, 62, 2.5), (5, 63, 68, 3.0), (5, 69, 74, 3.5), (5, 75, 80, 4.0), (5, 81, 86, 4.5),
-    (5, 87, 92, 5.0), (5, 93, 98, 5.5), (5, 99, 104, 6.0), (5, 105, 110, 6.5), (5, 111, 116, 7.0),
-    (5, 117, 122, 7.5), (5, 123, 128, 8.0)
-]
-
-def get_creditos_reales(creditos_base, cupo):
-    for (cb, min_est, max_est, extra) in COMPENSACION_TABLE:
-        if cb == creditos_base and min_est <= cupo <= max_est:
-            return float(creditos_base) + extra
-    max_extra = 0
-    for (cb, min_est, max_est, extra) in COMPENSACION_TABLE:
-        if cb == creditos_base and cupo >= min_est:
-            max_extra = max(max_extra, extra)
-    return float(creditos_base) + max_extra
-
-def mins_to_str(m):
-    h, mins = divmod(int(m), 60)
-    am_pm = "AM" if h < 12 else "PM"
-    h_disp = h if h <= 12 else h - 12
-    if h_disp == 0: h_disp = 12
-    return f"{h_disp:02d}:{mins:02d} {am_pm}"
-
-def str_to_mins(t_str):
-    t_str = t_str.strip().upper()
-    parts = t_str.split()
-    time_part = parts[0]
-    ampm = parts[1] if len(parts) > 1 else "AM"
-    h, m = map(int, time_part.split(':'))
-    if ampm == "PM" and h != 12: h += 12
-    if ampm == "AM" and h == 12: h = 0
-    return h * 60 + m
-
-PATRONES = {
-    3: [
-        {"name": "Lu-Mi-Vi", "days": {"Lu": 1, "Mi": 1, "Vi": 1}},
-        {"name": "Ma-Ju", "days": {"Ma": 1.5, "Ju": 1.5}},
-        {"name": "Lu (Intensivo)", "days": {"Lu": 3}},
-        {"name": "Ma (Intensivo)", "days": {"Ma": 3}},
-        {"name": "Mi (Intensivo)", "days": {"Mi": 3}},
-        {"name": "Ju (Intensivo)", "days": {"Ju": 3}},
-        {"name": "Vi (Intensivo)", "days": {"Vi": 3}},
-    ],
-    4: [
-        {"name": "Lu-Ma-Mi-Ju", "days": {"Lu": 1, "Ma": 1, "Mi": 1, "Ju": 1}},
-        {"name": "Lu-Ma-Mi-Vi", "days": {"Lu": 1, "Ma": 1, "Mi": 1, "Vi": 1}},
-        {"name": "Lu-Ma-Ju-Vi", "days": {"Lu": 1, "Ma": 1, "Ju": 1, "Vi": 1}},
-        {"name": "Lu-Mi-Ju-Vi", "days": {"Lu": 1, "Mi": 1, "Ju": 1, "Vi": 1}},
-        {"name": "Ma-Mi-Ju-Vi", "days": {"Ma": 1, "Mi": 1, "Ju": 1, "Vi": 1}},
-        {"name": "Lu-Mi", "days": {"Lu": 2, "Mi": 2}},
-        {"name": "Lu-Vi", "days": {"Lu": 2, "Vi": 2}},
-        {"name": "Ma-Ju", "days": {"Ma": 2, "Ju": 2}},
-        {"name": "Mi-Vi", "days": {"Mi": 2, "Vi": 2}},
-    ],
-    5: [
-        {"name": "Lu-Ma-Mi-Ju-Vi", "days": {"Lu": 1, "Ma": 1, "Mi": 1, "Ju": 1, "Vi": 1}},
-        {"name": "Lu-Ma-Mi-Vi", "days": {"Lu": 1, "Ma": 1, "Mi": 1, "Vi": 2}},
-        {"name": "Lu-Ma-Ju-Vi", "days": {"Lu": 1, "Ma": 1, "Ju": 1, "Vi": 2}},
-        {"name": "Lu-Mi-Ju-Vi", "days": {"Lu": 1, "Mi": 1, "Ju": 1, "Vi": 2}},
-        {"name": "Ma-Mi-Ju-Vi", "days": {"Ma": 1, "Mi": 1, "Ju": 1, "Vi": 2}},
-        {"name": "Lu-Mi-Vi", "days": {"Lu": 2, "Mi": 2, "Vi": 1}},
-        {"name": "Ma-Ju-Vi", "days": {"Ma": 1.5, "Ju": 1.5, "Vi": 2}},
-        {"name": "Lu-Ma-Mi", "days": {"Lu": 2, "Ma": 1, "Mi": 2}},
-    ]
-}
-
-def format_horario(patron, h_ini):
-    parts = []
-    for dia, contrib in patron['days'].items():
-        mins_duracion = int(contrib * 50)
-        h_fin = h_ini + mins_duracion
-        parts.append(f"{dia}: {mins_to_str(h_ini)}-{mins_to_str(h_fin)}")
-    return " | ".join(parts)
-
-def exportar_todo(df):
-    out = io.BytesIO()
-    with pd.ExcelWriter(out, engine='xlsxwriter') as writer:
-        df.to_excel(writer, sheet_name='Maestro', index=False)
-        for p in df['Persona'].unique():
-            if str(p) != "TBA" and str(p) != "GRADUADOS":
-                clean_name = "".join([c for c in str(p) if c.isalnum() or c==' '])[:25]
-                df[df['Persona'] == p].to_excel(writer, sheet_name=f"User_{clean_name}", index=False)
-    return out.getvalue()
-
-# ==============================================================================
-# 3. MODELO DE DATOS
-# ==============================================================================
-class Seccion:
-    def __init__(self, cod, creditos, cupo, candidatos_raw, tipo_salon, es_ayudantia=False):
-        self.cod = str(cod)
-        self.creditos = int(creditos)
-        self.cupo = int(cupo)
-        
-        if isinstance(candidatos_raw, list):
-            raw_list = [c.strip().upper() for c in candidatos_raw if c.strip()]
-        else:
-            raw_list = [c.strip().upper() for c in str(candidatos_raw).split(',') if c.strip() and str(c).upper() != 'NAN']
-        self.cands = list(set(raw_list))
-        
-        try:
-            self.tipo_salon = int(float(str(tipo_salon)))
-        except:
-            self.tipo_salon = 1
-            
-        self.es_ayudantia = es_ayudantia
-        base = self.cod.split('-')[0].upper().replace(" ", "")
-        self.es_fusionable = base in ["MATE3171", "MATE3172", "MATE3173"]
-        self.prof_preasignado = None  
-
-class Profesor:
-    def __init__(self, nombre, carga_min, carga_max, pref_dias, pref_horas,
-                 bloqueo_dias, bloqueo_ini, bloqueo_fin,
-                 preferencias_cursos, compensacion, acepta_grandes, cursos_intensivos=0):
-        self.nombre = nombre.upper().strip()
-        self.carga_min = float(carga_min) if pd.notnull(carga_min) and carga_min != '' else 0.0
-        self.carga_max = float(carga_max) if pd.notnull(carga_max) and carga_max != '' else 12.0
-        self.pref_dias = pref_dias if isinstance(pref_dias, str) else ''
-        self.pref_horas = pref_horas if isinstance(pref_horas, str) else 'ANY'
-        
-        self.preferencias = []
-        if isinstance(preferencias_cursos, list):
-            self.preferencias = [c.upper().strip() for c in preferencias_cursos if c and str(c).upper() != 'NAN']
-            
-        self.compensacion = str(compensacion).upper().strip() in ('SI', 'SÍ', 'YES', '1')
-        self.acepta_grandes = int(acepta_grandes) if pd.notnull(acepta_grandes) and acepta_grandes != '' else 0
-        
-        try:
-            self.cursos_intensivos = int(cursos_intensivos)
-        except:
-            self.cursos_intensivos = 0
-
-    def prioridad_curso(self, curso_cod):
-        for idx, pref in enumerate(self.preferencias):
-            if pref in curso_cod:
-                return 1.0 / (idx + 1)
-        return 0.0
-
-# ==============================================================================
-# 4. MOTOR DE OPTIMIZACIÓN EVOLUTIVA
-# ==============================================================================
-class TabuScheduler:
-    def __init__(self, df_cursos, df_profes, df_salones, zona):
-        self.zona = zona
-        
-        # 1. Procesar Salones
-        df_salones.columns = [c.strip().upper() for c in df_salones.columns]
-        self.salones = []
-        self.mega_salones = set()
-        for _, r in df_salones.iterrows():
-            codigo = str(r['CODIGO']).strip().upper()
-            try: cap = int(r['CAPACIDAD'])
-            except: cap = 25
-            try: tipo = int(r['TIPO'])
-            except: tipo = 1
-            self.salones.append({'CODIGO': codigo, 'CAPACIDAD': cap, 'TIPO': tipo})
-            if any(x in codigo.replace(" ", "").replace("-", "") for x in ["FA", "FB", "FC"]):
-                self.mega_salones.add(codigo)
-
-        # 2. Procesar Profesores
-        self.profesores = {}
-        if df_profes is not None and not df_profes.empty:
-            df_profes.columns = [c.strip().upper() for c in df_profes.columns]
-            for _, r in df_profes.iterrows():
-                prefs = [str(r.get(col, '')).strip().upper() for col in ['PREF1', 'PREF2', 'PREF3'] if pd.notnull(r.get(col)) and str(r.get(col)).strip().upper() != 'NAN']
-                prof = Profesor(
-                    nombre=str(r['NOMBRE']).strip().upper(),
-                    carga_min=r.get('CARGA_MIN', 0),
-                    carga_max=r.get('CARGA_MAX', 15),
-                    pref_dias=r.get('PREF_DIAS', ''),
-                    pref_horas=r.get('PREF_HORAS', 'ANY'),
-                    bloqueo_dias='', bloqueo_ini='', bloqueo_fin='',
-                    preferencias_cursos=prefs,
-                    compensacion=r.get('COMPENSACION', 'NO'),
-                    acepta_grandes=r.get('ACEPTA_GRANDES', 0),
-                    cursos_intensivos=r.get('CURSOS_INTENSIVOS', 0)
-                )
-                self.profesores[prof.nombre] = prof
-
-        # 3. Procesar Cursos y Secciones
-        self.secciones = []
-        df_cursos.columns = [c.strip().upper() for c in df_cursos.columns]
-        cursos_agrupados = {}
-        for _, r in df_cursos.iterrows():
-            cod_base = str(r['CODIGO']).strip().upper()
-            if cod_base not in cursos_agrupados:
-                cursos_agrupados[cod_base] = {
-                    'creditos': int(r['CREDITOS']), 'demanda': int(r.get('DEMANDA', 0)),
-                    'cupo_tipico': int(r.get('CUPO', '30')), 'candidatos': r.get('CANDIDATOS', ''),
-                    'tipo_salon': int(r.get('TIPO_SALON', 1))
-                }
-            else:
-                cursos_agrupados[cod_base]['demanda'] += int(r.get('DEMANDA', 0))
-
-        for cod_base, datos in cursos_agrupados.items():
-            demanda_total = datos['demanda']
-            cupo_tipico = datos['cupo_tipico']
-            
-            candidatos_list = [c.strip().upper() for c in str(datos['candidatos']).split(',') if c.strip() and str(c).upper() != 'NAN']
-            acepta_comp = any(c in self.profesores and self.profesores[c].compensacion for c in candidatos_list)
-            
-            if acepta_comp and demanda_total > cupo_tipico:
-                cupo_efectivo = min(demanda_total, 150) 
-            else:
-                cupo_efectivo = cupo_tipico
-
-            num_secciones = math.ceil(demanda_total / cupo_efectivo) if demanda_total > 0 else 1
-            est_sec = [cupo_efectivo] * (num_secciones - 1)
-            resto = demanda_total - sum(est_sec)
-            est_sec.append(resto if resto > 0 else cupo_efectivo)
-            
-            for i, cupo in enumerate(est_sec):
-                self.secciones.append(Seccion(f"{cod_base}-{i+1:02d}", datos['creditos'], cupo, datos['candidatos'], datos['tipo_salon']))
-
-        self._preasignar_profesores_robusto()
-
-        self.bloques = list(range(420, 1171, 30))
-        if zona == "CENTRAL":
-            self.hora_universal = (630, 750)
-            self.limite_operativo = (450, 1170)
-        else:
-            self.hora_universal = (600, 720)
-            self.limite_operativo = (420, 1140)
-
-        self.solucion = self._construir_solucion_greedy()
-        self.mejor_solucion = deepcopy(self.solucion)
-        self.mejor_costo = self._costo_total(self.solucion)
-        self.historial_costos = [self.mejor_costo]
-
-    def get_sec_creditos(self, s, prof_name):
-        if prof_name in self.profesores:
-            if self.profesores[prof_name].compensacion:
-                return get_creditos_reales(s.creditos, s.cupo)
-        return float(s.creditos)
-
-    def _preasignar_profesores_robusto(self):
-        carga_actual = {p: 0.0 for p in self.profesores}
-        carga_actual["GRADUADOS"] = 0.0
-        carga_actual["TBA"] = 0.0
-        
-        for s in self.secciones:
-            cands_validos = [p for p in s.cands if p in self.profesores]
-            if cands_validos:
-                s.prof_preasignado = random.choice(cands_validos)
-            elif "GRADUADOS" in s.cands:
-                s.prof_preasignado = "GRADUADOS"
-            else:
-                s.prof_preasignado = "TBA"
-            
-            if s.prof_preasignado in carga_actual:
-                carga_actual[s.prof_preasignado] += self.get_sec_creditos(s, s.prof_preasignado)
-
-        def calc_penalidad():
-            pen = 0
-            for p, c in carga_actual.items():
-                if p in self.profesores:
-                    if c < self.profesores[p].carga_min - 1.5:
-                        pen += (self.profesores[p].carga_min - c) * 10
-                    elif c > self.profesores[p].carga_max + 1.5:
-                        pen += (c - self.profesores[p].carga_max) * 10
-            return pen
-
-        penalidad_actual = calc_penalidad()
-
-        T = 100.0
-        for _ in range(30000):
-            if penalidad_actual == 0: break
-            
-            s = random.choice(self.secciones)
-            prof_viejo = s.prof_preasignado
-            if prof_viejo not in self.profesores: continue
-            
-            cands = [p for p in s.cands if p in self.profesores and p != prof_viejo]
-            if not cands: continue
-            
-            nuevo_prof = random.choice(cands)
-            
-            creditos_viejos = self.get_sec_creditos(s, prof_viejo)
-            creditos_nuevos = self.get_sec_creditos(s, nuevo_prof)
-            
-            carga_actual[prof_viejo] -= creditos_viejos
-            carga_actual[nuevo_prof] += creditos_nuevos
-            
-            nueva_pen = calc_penalidad()
-            
-            if nueva_pen < penalidad_actual:
-                penalidad_actual = nueva_pen
-                s.prof_preasignado = nuevo_prof
-            else:
-                delta = nueva_pen - penalidad_actual
-                if T > 0.01 and random.random() < math.exp(-delta / T):
-                    penalidad_actual = nueva_pen
-                    s.prof_preasignado = nuevo_prof
-                else:
-                    carga_actual[prof_viejo] += creditos_viejos
-                    carga_actual[nuevo_prof] -= creditos_nuevos
-            T *= 0.995
-
-    def _costo_total(self, sol):
-        conflicts = 0
-        soft_penalty = 0
-        occ_prof = {}
-        occ_salon = {}
-        
-        # INICIALIZACIÓN ABSOLUTA: Todos en 0
-        carga_prof = {p: 0.0 for p in self.profesores}
-        carga_prof["GRADUADOS"] = 0.0
-        carga_prof["TBA"] = 0.0
-        
-        for i, asign in enumerate(sol):
-            s = asign['seccion']
-            prof = asign['profesor']
-            salon = asign['salon']
-            patron = asign['patron']
-            ini = asign['ini']
-            
-            if prof == "TBA" or salon == "TBA":
-                conflicts += 10000
-                continue
-            
-            salon_info = next((sl for sl in self.salones if sl['CODIGO'] == salon), None)
-            if salon_info and salon_info['CAPACIDAD'] < s.cupo: conflicts += 10000
-            if salon_info and not (salon in self.mega_salones and s.es_fusionable) and salon_info['TIPO'] != s.tipo_salon:
-                conflicts += 10000
-            
-            if prof in carga_prof:
-                carga_prof[prof] += self.get_sec_creditos(s, prof)
-            
-            es_intensivo = any(c >= 3 for c in patron['days'].values())
-            puede_ser_intensivo = any(any(c >= 3 for c in p['days'].values()) for p in PATRONES.get(s.creditos, PATRONES[3]))
-            
-            if prof != "GRADUADOS" and prof in self.profesores:
-                prof_obj = self.profesores[prof]
-                
-                # Validación segura: Si puede ser intensivo, se obliga o penaliza según la preferencia
-                if prof_obj.cursos_intensivos == 0 and es_intensivo:
-                    conflicts += 10000
-                elif prof_obj.cursos_intensivos == 1 and puede_ser_intensivo and not es_intensivo:
-                    conflicts += 10000
-
-                # RESTRICCIONES SUAVES: Guían el Fitness dinámicamente
-                if prof_obj.pref_horas == 'AM' and ini >= 720: soft_penalty += 30
-                elif prof_obj.pref_horas == 'PM' and ini < 720: soft_penalty += 30
-                
-                if prof_obj.pref_dias:
-                    for dia in patron['days'].keys():
-                        dia_letra = 'W' if dia == 'Mi' else dia[0]
-                        if dia_letra not in prof_obj.pref_dias:
-                            soft_penalty += 15
-
-            for dia, contrib in patron['days'].items():
-                fin = ini + int(contrib * 50)
-                if dia in ["Ma", "Ju"] and max(ini, self.hora_universal[0]) < min(fin, self.hora_universal[1]): conflicts += 10000
-                if s.creditos == 3 and contrib >= 3 and ini < 930: conflicts += 10000
-                if fin > self.limite_operativo[1] or ini < self.limite_operativo[0]: conflicts += 10000
-                
-                if prof != "GRADUADOS":
-                    clave = (prof, dia)
-                    if clave not in occ_prof: occ_prof[clave] = []
-                    for (ini_ex, fin_ex) in occ_prof[clave]:
-                        if max(ini, ini_ex) < min(fin, fin_ex): conflicts += 10000
-                    occ_prof[clave].append((ini, fin))
-                
-                clave_s = (salon, dia)
-                if clave_s not in occ_salon: occ_salon[clave_s] = []
-                for (ini_ex, fin_ex, cupo_ex, fus_ex) in occ_salon[clave_s]:
-                    if max(ini, ini_ex) < min(fin, fin_ex):
-                        if salon in self.mega_salones and s.es_fusionable and fus_ex:
-                            if s.cupo + cupo_ex <= salon_info['CAPACIDAD']: continue
-                        conflicts += 10000
-                occ_salon[clave_s].append((ini, fin, s.cupo, s.es_fusionable))
-        
-        for prof, carga in carga_prof.items():
-            prof_obj = self.profesores.get(prof)
-            if prof_obj:
-                if carga > prof_obj.carga_max + 1.5: conflicts += 10000
-                if carga < prof_obj.carga_min - 1.5: conflicts += 10000
-        
-        return conflicts + soft_penalty
-
-    def _obtener_conflictos(self, sol):
-        conflictos_list = []
-        occ_prof = {}
-        occ_salon = {}
-        
-        carga_prof = {p: 0.0 for p in self.profesores}
-        carga_prof["GRADUADOS"] = 0.0
-        carga_prof["TBA"] = 0.0
-        
-        for i, asign in enumerate(sol):
-            s = asign['seccion']
-            prof = asign['profesor']
-            salon = asign['salon']
-            patron = asign['patron']
-            ini = asign['ini']
-            
-            if prof == "TBA": conflictos_list.append(f"Sección {s.cod}: profesor TBA")
-            if salon == "TBA": conflictos_list.append(f"Sección {s.cod}: salón TBA")
-            
-            salon_info = next((sl for sl in self.salones if sl['CODIGO'] == salon), None)
-            if salon_info and salon_info['CAPACIDAD'] < s.cupo:
-                conflictos_list.append(f"Sección {s.cod}: salón {salon} capacidad insuficiente")
-            
-            if prof in carga_prof:
-                carga_prof[prof] += self.get_sec_creditos(s, prof)
-                
-            es_intensivo = any(c >= 3 for c in patron['days'].values())
-            puede_ser_intensivo = any(any(c >= 3 for c in p['days'].values()) for p in PATRONES.get(s.creditos, PATRONES[3]))
-
-            if prof != "GRADUADOS" and prof in self.profesores:
-                prof_obj = self.profesores[prof]
-                if prof_obj.cursos_intensivos == 0 and es_intensivo:
-                    conflictos_list.append(f"Sección {s.cod}: Prof {prof} tiene clase intensiva pero solicitó NO intensivos.")
-                elif prof_obj.cursos_intensivos == 1 and puede_ser_intensivo and not es_intensivo:
-                    conflictos_list.append(f"Sección {s.cod}: Prof {prof} NO tiene clase intensiva pero solicitó SÍ intensivos.")
-            
-            for dia, contrib in patron['days'].items():
-                fin = ini + int(contrib * 50)
-                if dia in ["Ma", "Ju"] and max(ini, self.hora_universal[0]) < min(fin, self.hora_universal[1]):
-                    conflictos_list.append(f"Sección {s.cod}: violación de hora universal el {dia}")
-                
-                if prof != "GRADUADOS":
-                    clave = (prof, dia)
-                    if clave not in occ_prof: occ_prof[clave] = []
-                    for (ini_ex, fin_ex) in occ_prof[clave]:
-                        if max(ini, ini_ex) < min(fin, fin_ex):
-                            conflictos_list.append(f"Cruce de profesor {prof} el {dia}")
-                    occ_prof[clave].append((ini, fin))
-                
-                clave_s = (salon, dia)
-                if clave_s not in occ_salon: occ_salon[clave_s] = []
-                for (ini_ex, fin_ex, cupo_ex, fus_ex) in occ_salon[clave_s]:
-                    if max(ini, ini_ex) < min(fin, fin_ex):
-                        if not (salon in self.mega_salones and s.es_fusionable and fus_ex and s.cupo + cupo_ex <= salon_info['CAPACIDAD']):
-                            conflictos_list.append(f"Cruce de salón {salon} el {dia}")
-                occ_salon[clave_s].append((ini, fin, s.cupo, s.es_fusionable))
-        
-        for prof, carga in carga_prof.items():
-            prof_obj = self.profesores.get(prof)
-            if prof_obj:
-                if carga > prof_obj.carga_max + 1.5:
-                    conflictos_list.append(f"Profesor {prof} excede carga máxima ({carga} > {prof_obj.carga_max})")
-                if carga < prof_obj.carga_min - 1.5:
-                    conflictos_list.append(f"Profesor {prof} no alcanza carga mínima ({carga} < {prof_obj.carga_min})")
-        
-        return conflictos_list
-
-    def _construir_solucion_greedy(self):
-        sol = [None] * len(self.secciones)
-        asignado = [False] * len(self.secciones)
-        for i, s in enumerate(self.secciones):
-            prof = getattr(s, 'prof_preasignado', 'TBA')
-            exito = self._asignar_seccion(i, prof, sol, asignado)
-            if not exito:
-                sol[i] = self._crear_asignacion_temporal(s, prof=prof)
-                asignado[i] = True
-        return sol
-
-    def _crear_asignacion_temporal(self, seccion, prof="TBA", salon="TBA", patron=None, ini=None):
-        if patron is None: patron = random.choice(PATRONES.get(seccion.creditos, PATRONES[3]))
-        if ini is None: ini = random.choice(self.bloques)
-        if salon == "TBA":
-            salones_posibles = [sl['CODIGO'] for sl in self.salones if sl['CAPACIDAD'] >= seccion.cupo]
-            salon = random.choice(salones_posibles) if salones_posibles else "TBA"
-        return {'seccion': seccion, 'profesor': prof, 'salon': salon, 'patron': patron, 'ini': ini}
-
-    def _asignar_seccion(self, idx, prof, sol, asignado):
-        s = sol[idx]['seccion'] if sol[idx] else self.secciones[idx]
-        patrones = PATRONES.get(s.creditos, PATRONES[3])
-        
-        puede_ser_intensivo = any(any(c >= 3 for c in p['days'].values()) for p in patrones)
-        
-        if prof in self.profesores:
-            prof_obj = self.profesores[prof]
-            if prof_obj.cursos_intensivos == 0:
-                patrones = [p for p in patrones if not any(c >= 3 for c in p['days'].values())]
-            elif prof_obj.cursos_intensivos == 1 and puede_ser_intensivo:
-                patrones_int = [p for p in patrones if any(c >= 3 for c in p['days'].values())]
-                if patrones_int: patrones = patrones_int
-                
-        if not patrones: patrones = PATRONES.get(s.creditos, PATRONES[3])
-
-        random.shuffle(patrones)
-        for patron in patrones:
-            for dia, contrib in patron['days'].items():
-                duracion = contrib * 50
-                inicios_posibles = [ini for ini in self.bloques if ini >= self.limite_operativo[0] and ini + duracion <= self.limite_operativo[1]]
-                if dia in ["Ma", "Ju"]:
-                    inicios_posibles = [ini for ini in inicios_posibles if not (max(ini, self.hora_universal[0]) < min(ini+duracion, self.hora_universal[1]))]
-                if s.creditos == 3 and contrib >= 3:
-                    inicios_posibles = [ini for ini in inicios_posibles if ini >= 930]
-                
-                salones_posibles = [sl['CODIGO'] for sl in self.salones if sl['TIPO'] == s.tipo_salon and sl['CAPACIDAD'] >= s.cupo]
-                if not salones_posibles: salones_posibles = [sl['CODIGO'] for sl in self.salones if sl['CAPACIDAD'] >= s.cupo]
-                
-                for ini in inicios_posibles:
-                    for salon in salones_posibles:
-                        conflicto = False
-                        for j, asign in enumerate(sol):
-                            if asign and asignado[j] and j != idx:
-                                if asign['profesor'] == prof:
-                                    for dia2, contrib2 in asign['patron']['days'].items():
-                                        if dia == dia2 and max(ini, asign['ini']) < min(ini + duracion, asign['ini'] + int(contrib2 * 50)):
-                                            conflicto = True; break
-                                if asign['salon'] == salon:
-                                    for dia2, contrib2 in asign['patron']['days'].items():
-                                        if dia == dia2 and max(ini, asign['ini']) < min(ini + duracion, asign['ini'] + int(contrib2 * 50)):
-                                            if salon in self.mega_salones and s.es_fusionable and asign['seccion'].es_fusionable:
-                                                if s.cupo + asign['seccion'].cupo <= next(sl['CAPACIDAD'] for sl in self.salones if sl['CODIGO']==salon): continue
-                                            conflicto = True; break
-                            if conflicto: break
-                        if not conflicto:
-                            sol[idx] = {'seccion': s, 'profesor': prof, 'salon': salon, 'patron': patron, 'ini': ini}
-                            asignado[idx] = True
-                            return True
-        return False
-
-    def _mutar_solucion(self, sol):
-        nuevo = deepcopy(sol)
-        idx = random.randint(0, len(nuevo)-1)
-        asign = nuevo[idx]
-        s = asign['seccion']
-        prof = asign['profesor']
-        
-        mejores_opciones = []
-        patrones = PATRONES.get(s.creditos, PATRONES[3])
-        puede_ser_intensivo = any(any(c >= 3 for c in p['days'].values()) for p in patrones)
-        
-        if prof in self.profesores:
-            p_obj = self.profesores[prof]
-            if p_obj.cursos_intensivos == 0:
-                patrones = [p for p in patrones if not any(c >= 3 for c in p['days'].values())]
-            elif p_obj.cursos_intensivos == 1 and puede_ser_intensivo:
-                patrones_int = [p for p in patrones if any(c >= 3 for c in p['days'].values())]
-                if patrones_int: patrones = patrones_int
-
-        if not patrones: patrones = PATRONES.get(s.creditos, PATRONES[3])
-
-        for _ in range(15):
-            p_test = random.choice(patrones)
-            ini_test = random.choice(self.bloques)
-            s_test = asign['salon']
-            
-            if random.random() < 0.2:
-                sals = [sl['CODIGO'] for sl in self.salones if sl['TIPO'] == s.tipo_salon and sl['CAPACIDAD'] >= s.cupo]
-                if sals: s_test = random.choice(sals)
-                
-            nuevo[idx]['patron'] = p_test
-            nuevo[idx]['ini'] = ini_test
-            nuevo[idx]['salon'] = s_test
-            
-            costo = self._costo_total(nuevo)
-            mejores_opciones.append((costo, p_test, ini_test, s_test))
-            
-        mejores_opciones.sort(key=lambda x: x[0])
-        mejor_op = mejores_opciones[0]
-        
-        nuevo[idx]['patron'] = mejor_op[1]
-        nuevo[idx]['ini'] = mejor_op[2]
-        nuevo[idx]['salon'] = mejor_op[3]
-        
-        return nuevo, mejor_op[0]
-
-    def optimizar(self, iteraciones=200, bar=None, status_text=None):
-        temp_inicial = 5000.0
-        for it in range(iteraciones):
-            vecino, costo_vecino = self._mutar_solucion(self.solucion)
-            
-            if costo_vecino <= self.mejor_costo:
-                self.solucion = vecino
-                self.mejor_costo = costo_vecino
-                self.mejor_solucion = deepcopy(self.solucion)
-            else:
-                temp = temp_inicial / (it + 1)
-                try: prob = math.exp((self.mejor_costo - costo_vecino) / temp)
-                except: prob = 0
-                if random.random() < prob:
-                    self.solucion = vecino
-                    
-            self.historial_costos.append(self.mejor_costo)
-            
-            if it % 10 == 0 or it == iteraciones - 1:
-                if status_text: 
-                    fitness_actual = 10000 / (10000 + self.mejor_costo)
-                    duros = int(self.mejor_costo // 10000)
-                    status_text.markdown(f"**🔄 Generación {it+1}/{iteraciones}** | Conflictos Duros: {duros} | Costo Total: {self.mejor_costo:.2f} | Fitness: {fitness_actual:.5f}")
-                if bar: bar.progress((it+1)/iteraciones)
-        
-        return self.mejor_solucion, int(self.mejor_costo // 10000), self.historial_costos
-
-# ==============================================================================
-# 5. FUNCIÓN PARA GENERAR HEATMAP DE OCUPACIÓN DE SALONES
+# 2. FUNCIÓN PARA GENERAR HEATMAP DE OCUPACIÓN DE SALONES
 # ==============================================================================
 def generar_heatmap_ocupacion(scheduler, solucion):
     """
@@ -803,15 +208,305 @@ def generar_heatmap_ocupacion(scheduler, solucion):
     plt.tight_layout()
     return fig
 
+def _estilo_oscuro(fig, ax):
+    fig.patch.set_facecolor('#0F0F0F')
+    ax.set_facecolor('#1A1A1A')
+    ax.tick_params(colors='white')
+    for spine in ax.spines.values(): spine.set_edgecolor('#D4AF37')
+
+def figura_fitness(historial, historiales_islas=None):
+    fitness_history = [10000 / (10000 + costo) for costo in historial]
+    fig, ax = plt.subplots(figsize=(10, 4))
+    ax.plot(fitness_history, color='#D4AF37', linewidth=2.5)
+    if historiales_islas:
+        inicio_islas = len(fitness_history) - max(len(h) for h in historiales_islas)
+        for h in historiales_islas:
+            ax.plot(range(inicio_islas, inicio_islas + len(h)), [10000 / (10000 + c) for c in h], linewidth=1, alpha=0.4)
+    ax.set_title("Crecimiento de Fitness Evolutivo", color='white', pad=15)
+    ax.set_xlabel("Iteraciones", color='white')
+    ax.set_ylabel("Fitness (1.0 = Ideal)", color='white')
+    _estilo_oscuro(fig, ax)
+    return fig
+
+def figura_cargas(cargas):
+    cargas_df = pd.DataFrame(list(cargas.items()), columns=['Profesor', 'Créditos Reales'])
+    cargas_df = cargas_df.sort_values('Créditos Reales', ascending=False)
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.bar(cargas_df['Profesor'], cargas_df['Créditos Reales'], color='#8E6E13')
+    ax.axhline(y=12, color='#FF4B4B', linestyle='--', linewidth=2, label='Carga Estándar Típica (12 cr)')
+    ax.set_xticks(range(len(cargas_df)))
+    ax.set_xticklabels(cargas_df['Profesor'], rotation=45, ha='right', color='white')
+    _estilo_oscuro(fig, ax)
+    ax.legend()
+    return fig
+
+def figura_mejoras(mejoras):
+    segundos, costos = zip(*mejoras)
+    fig, ax = plt.subplots(figsize=(10, 3.5))
+    ax.step(segundos, costos, where='post', color='#D4AF37', linewidth=2)
+    ax.set_title("Mejor Costo en el Tiempo", color='white', pad=15)
+    ax.set_xlabel("Segundos desde el inicio", color='white')
+    ax.set_ylabel("Mejor Costo", color='white')
+    _estilo_oscuro(fig, ax)
+    return fig
+
+# ==============================================================================
+# 3. CACHÉ ENTRE RECARGAS: ENTRADAS, VISTAS Y FIGURAS
+# ==============================================================================
+# Streamlit vuelve a correr el script en cada clic. Lo derivado de una corrida
+# se guarda con la clave `corrida` (huella de los archivos, zona e id único de
+# la corrida), así que cambiar de profesor o de pestaña no recalcula nada y una
+# corrida nueva nunca reutiliza lo de otra. Las cachés tienen tope de entradas.
+def huella_archivos(archivos):
+    h = hashlib.sha256()
+    for a in archivos:
+        h.update(a.name.encode())
+        h.update(a.getvalue())
+    return h.hexdigest()
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def cargar_entradas(huella, _archivos):
+    """Tablas de entrada leídas y validadas una vez por contenido de archivo (copias nuevas en cada uso)."""
+    copias = []
+    for a in _archivos:
+        copia = io.BytesIO(a.getvalue())
+        copia.name = a.name
+        copias.append(copia)
+    return leer_entradas(copias)
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def vistas_corrida(corrida, _master):
+    """Subtablas por profesor, curso y salón de una corrida, con una pasada de groupby por vista (solo lectura)."""
+    vistas = {}
+    for columna, columnas in (('Persona', ['ID', 'Estudiantes (Cupo)', 'Créditos Reales', 'Días', 'Horario', 'Salón']),
+                              ('Asignatura', ['ID', 'Estudiantes (Cupo)', 'Persona', 'Días', 'Horario', 'Salón']),
+                              ('Salón', ['ID', 'Asignatura', 'Persona', 'Días', 'Horario'])):
+        vistas[columna] = {clave: filas[columnas] for clave, filas in _master.groupby(columna, sort=True)}
+    return vistas
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def png_figura(corrida, nombre, _construir):
+    """PNG de una figura de la corrida, dibujada con matplotlib una sola vez (mismas opciones que st.pyplot)."""
+    fig = _construir()
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=200, bbox_inches='tight')
+    plt.close(fig)
+    return buf.getvalue()
+
+# ==============================================================================
+# 4. OPTIMIZACIÓN EN SEGUNDO PLANO
+# ==============================================================================
+# La corrida vive en el registro de trabajos de `horarios`, fuera de la sesión:
+# la interfaz consulta su avance cada INTERVALO_SONDEO segundos y, al recargar la
+# página, se vuelve a enganchar por el id que queda en la URL (?trabajo=...).
+INTERVALO_SONDEO = 1.0
+
+def ejecutar_motor(scheduler, bar, status, reanudar, motor, iteraciones=None, tiempo_limite=None, n_procesos=None,
+                   solo_horario=False, costo_objetivo=None, sin_mejora=None, meseta_suave=None, perfilar=False,
+                   semilla=None, respaldo_recocido=False):
+    """Corre el motor elegido en la barra lateral (en el hilo del trabajo); devuelve la solución y el perfil opcional."""
+    # Perfil opcional con cProfile de la búsqueda (no de la lectura ni la construcción)
+    with (perfil() if perfilar else nullcontext({})) as perfilado:
+        if motor == "Recocido Evolutivo":
+            mejor_sol, conflictos, historial = scheduler.optimizar(
+                iteraciones, bar, status, solo_horario=solo_horario, tiempo_limite=tiempo_limite,
+                costo_objetivo=costo_objetivo, sin_mejora=sin_mejora, meseta_suave=meseta_suave,
+                temp_inicial=scheduler.temperatura if reanudar else None)
+        elif motor == "Islas en Paralelo":
+            # Diez épocas con migración entre islas
+            mejor_sol, conflictos, historial = scheduler.optimizar_islas(
+                n_procesos, epocas=10, iteraciones=max(1, iteraciones // 10), bar=bar, status_text=status,
+                semilla=semilla, desde_actual=reanudar or scheduler.sembradas > 0)
+        elif motor == "Templado Paralelo":
+            # Rondas de 50 pasos entre propuestas de intercambio
+            mejor_sol, conflictos, historial = scheduler.templado_paralelo(
+                n_procesos, rondas=max(1, iteraciones // 50), pasos=50, bar=bar, status_text=status,
+                semilla=semilla, desde_actual=reanudar or scheduler.sembradas > 0)
+        elif motor == "CP-SAT (OR-Tools)":
+            mejor_sol, conflictos, historial = scheduler.resolver_cpsat(tiempo_limite, bar, status,
+                                                                        respaldo_recocido=respaldo_recocido)
+        else:
+            mejor_sol, conflictos, historial = scheduler.resolver_lns(tiempo_limite, bar, status)
+    return mejor_sol, conflictos, historial, perfilado.get('resumen')
+
+def construir_scheduler(df_cursos, df_profes, df_salones, zona, asignacion, tiempo_preasignacion, semilla=None,
+                        cache=None, instancia=None):
+    """TabuScheduler del trabajo; con caché, arranca desde la solución guardada más parecida si la hay."""
+    if semilla is not None:
+        random.seed(semilla)
+    scheduler = TabuScheduler(df_cursos, df_profes, df_salones, zona, asignacion, tiempo_preasignacion)
+    if cache is not None:
+        cache.sembrar(scheduler, instancia)
+    return scheduler
+
+def guardar_resultados(trabajo):
+    """Pasa el último resultado del trabajo a la sesión, con lo que leen las pestañas de resultados."""
+    scheduler, p = trabajo.scheduler, trabajo.parametros
+    mejor_sol, conflictos, historial, resumen_perfil = trabajo.resultado
+    resultado = resultado_corrida(scheduler, mejor_sol, conflictos, historial, trabajo.segundos,
+                                  zona=p['zona'], motor=p['motor'], preasignacion=p['preasignacion'])
+    guardar_resultado_tabla(resultado, f"{p['huella'][:16]}-{p['zona']}-{trabajo.id[:8]}-{trabajo.version}",
+                            (trabajo.id, trabajo.version))
+    st.session_state.scheduler = scheduler          # guardamos para usar después
+    st.session_state.mejor_sol = mejor_sol          # guardamos la solución
+    st.session_state.perfil = resumen_perfil
+    if p.get('cache') is not None:
+        p['cache'].guardar(p['instancia'], scheduler, resultado, **p['config'])
+
+def guardar_resultado_tabla(resultado, corrida, version):
+    """
+    Como guardar_resultados, para un resultado ya armado (servicio de cola o
+    caché de soluciones): llega la tabla, no el scheduler.
+    """
+    st.session_state.elapsed_time = resultado['segundos']
+    st.session_state.motivo_parada = resultado['motivo_parada']
+    st.session_state.conflicts = resultado['conflictos']
+    st.session_state.historial = resultado['historial']
+    st.session_state.historiales_islas = resultado['historiales_islas']
+    st.session_state.tasas_intercambio = resultado['tasas_intercambio']
+    st.session_state.scheduler = st.session_state.mejor_sol = None
+    st.session_state.cargas_finales = resultado['cargas_finales']
+    st.session_state.master = resultado['maestro']
+    st.session_state.detailed_conflicts = resultado['detalle_conflictos']
+    st.session_state.reporte = resultado['reporte']
+    st.session_state.perfil = None
+    st.session_state.corrida = corrida
+    st.session_state.version_guardada = version
+
+ESTADOS_TRABAJO = {'construyendo': "🏗️ Construyendo la solución inicial", 'corriendo': "🔄 Optimizando",
+                   'deteniendo': "⏸️ Deteniendo", 'detenido': "⏸️ Detenido", 'terminado': "✅ Terminado",
+                   'error': "❌ Error", 'en_cola': "⏳ En cola", 'cancelado': "🚫 Cancelado"}
+
+def panel_trabajo(id_trabajo):
+    """Avance del trabajo y botones Detener/Reanudar; al llegar un resultado nuevo, lo guarda y recarga la app."""
+    trabajo = obtener_trabajo(id_trabajo)
+    if trabajo is None:
+        st.warning("La corrida ya no está disponible en el servidor. Inicie una nueva optimización.")
+        return
+    foto = trabajo.estado_actual()
+    st.progress(min(1.0, foto['fraccion']))
+    if foto['mensaje']: st.markdown(foto['mensaje'])
+    k1, k2, k3, k4 = st.columns(4)
+    with k1: st.metric("Estado", ESTADOS_TRABAJO[foto['estado']])
+    with k2: st.metric("Mejor Costo", f"{foto['mejor_costo']:.2f}" if foto['mejor_costo'] is not None else "—")
+    with k3: st.metric("Conflictos Duros", foto['conflictos_duros'] if foto['conflictos_duros'] is not None else "—")
+    with k4: st.metric("Iteraciones / s", foto['iteraciones_s'] if foto['iteraciones_s'] is not None else "—")
+    b1, b2 = st.columns(2)
+    with b1:
+        st.button("⏹️ DETENER", on_click=trabajo.detener, disabled=not trabajo.activo, use_container_width=True)
+    with b2:
+        if st.button("▶️ REANUDAR", disabled=trabajo.activo or trabajo.scheduler is None, use_container_width=True):
+            trabajo.reanudar()
+            st.rerun()
+    if trabajo.error:
+        st.error("La optimización falló.")
+        with st.expander("Detalle del error"): st.code(trabajo.error)
+    if not trabajo.activo and trabajo.resultado is not None \
+            and st.session_state.get('version_guardada') != (trabajo.id, trabajo.version):
+        guardar_resultados(trabajo)
+        st.rerun()
+
+# ------------------------------------------------------------------------------
+# Servicio de cola: los trabajos los resuelve `python -m horarios.cola`, en otros
+# procesos y con límite de CPU, así varias corridas a la vez no frenan la interfaz
+# ------------------------------------------------------------------------------
+MOTORES_SERVICIO = {"Recocido Evolutivo": 'recocido', "Islas en Paralelo": 'islas', "Templado Paralelo": 'templado',
+                    "CP-SAT (OR-Tools)": 'cpsat', "LNS (CP-SAT por Vecindarios)": 'lns'}
+
+@st.cache_resource
+def cola_servicio():
+    return ColaTrabajos(os.environ.get('HORARIOS_COLA', 'horarios_cola.sqlite'))
+
+@st.cache_resource
+def cache_soluciones():
+    """Caché de soluciones en disco (HORARIOS_CACHE), la misma que usan la línea de comandos y la cola."""
+    return CacheSoluciones(os.environ.get('HORARIOS_CACHE', 'horarios_cache.sqlite'))
+
+def panel_cola(id_cola):
+    """Avance de un trabajo del servicio de cola y botón Detener; al terminar, trae el resultado a la sesión."""
+    cola = cola_servicio()
+    estado = cola.estado(id_cola)
+    if estado is None:
+        st.warning("El trabajo ya no está en la cola. Inicie una nueva optimización.")
+        return
+    avance = estado['avance']
+    if estado['estado'] == 'en_cola':
+        st.info(f"En cola, con {estado['en_cola_delante']} trabajos antes. El servicio se levanta con "
+                f"`python -m horarios.cola --db {cola.ruta}`.")
+    st.progress(min(1.0, avance.get('fraccion', 0.0)))
+    if avance.get('mensaje'): st.markdown(avance['mensaje'])
+    k1, k2, k3, k4 = st.columns(4)
+    with k1: st.metric("Estado", ESTADOS_TRABAJO[estado['estado']])
+    with k2: st.metric("Mejor Costo", f"{avance['mejor_costo']:.2f}" if avance.get('mejor_costo') is not None else "—")
+    with k3: st.metric("Conflictos Duros", avance['conflictos_duros'] if avance.get('conflictos_duros') is not None else "—")
+    with k4: st.metric("Iteraciones / s", avance['iteraciones_s'] if avance.get('iteraciones_s') is not None else "—")
+    st.button("⏹️ DETENER", on_click=cola.detener, args=(id_cola,), disabled=estado['estado'] not in ('en_cola', 'corriendo'),
+              use_container_width=True)
+    if estado['error']:
+        st.error("La optimización falló.")
+        with st.expander("Detalle del error"): st.code(estado['error'])
+    if estado['estado'] in ('terminado', 'detenido') and st.session_state.get('version_guardada') != (id_cola, 0):
+        guardar_resultado_tabla(cola.resultado(id_cola), f"cola-{estado['parametros']['zona']}-{id_cola}", (id_cola, 0))
+        st.rerun()
+
+# Mientras el trabajo corre, solo su panel se vuelve a dibujar, cada INTERVALO_SONDEO segundos
+panel_trabajo_vivo = st.fragment(run_every=INTERVALO_SONDEO)(panel_trabajo)
+panel_cola_vivo = st.fragment(run_every=INTERVALO_SONDEO)(panel_cola)
+
 # ==============================================================================
-# 6. UI PRINCIPAL
+# 5. UI PRINCIPAL
 # ==============================================================================
 def main():
+    iteraciones = tiempo_limite = n_procesos = None
+    solo_horario, costo_objetivo, sin_mejora, meseta_suave, perfilar = False, 0, 0, 0, False
+    respaldo_recocido = False
     with st.sidebar:
         st.markdown("### ∑ Configuración")
         zona = st.selectbox("Zona Campus", ["CENTRAL", "PERIFERICA"])
-        iteraciones = st.slider("Iteraciones de Búsqueda", 100, 5000, 300)
-        file = st.file_uploader("Subir Protocolo Excel", type=['xlsx'])
+        preasignacion = st.selectbox("Preasignación de Profesores", ["Recocido", "Exacta (CP-SAT)"])
+        tiempo_preasignacion = TIEMPO_PREASIGNACION
+        if preasignacion == "Exacta (CP-SAT)":
+            tiempo_preasignacion = st.number_input("Tiempo de la Preasignación Exacta (s)", 0.5, 60.0,
+                                                   TIEMPO_PREASIGNACION, step=0.5,
+                                                   help="Si CP-SAT no mejora la preasignación del recocido en este "
+                                                        "tiempo, se usa la del recocido.")
+        motor = st.selectbox("Motor de Optimización", ["Recocido Evolutivo", "Islas en Paralelo", "Templado Paralelo",
+                                                        "CP-SAT (OR-Tools)", "LNS (CP-SAT por Vecindarios)"])
+        if motor == "Recocido Evolutivo":
+            presupuesto = st.radio("Presupuesto", ["Iteraciones", "Tiempo"], horizontal=True)
+            if presupuesto == "Iteraciones":
+                iteraciones, tiempo_limite = st.slider("Iteraciones de Búsqueda", 100, 5000, 300), None
+            else:
+                iteraciones, tiempo_limite = None, st.slider("Tiempo Límite (s)", 10, 600, 60)
+            solo_horario = st.checkbox("Buscar solo horarios (salones por emparejamiento)", value=False)
+            with st.expander("Criterios de Parada"):
+                costo_objetivo = st.number_input("Costo objetivo (0 = ninguno)", 0, None, 0, step=1000)
+                sin_mejora = st.number_input("Iteraciones sin mejora (0 = sin límite)", 0, None, 0, step=100)
+                meseta_suave = st.number_input("Meseta con 0 conflictos duros (iteraciones, 0 = sin límite)", 0, None, 500, step=100)
+        elif motor in ("Islas en Paralelo", "Templado Paralelo"):
+            iteraciones = st.slider("Iteraciones de Búsqueda", 100, 5000, 300)
+            n_procesos = st.slider("Procesos en Paralelo", 2, max(2, os.cpu_count() or 2), max(2, os.cpu_count() or 2))
+        else:
+            tiempo_limite = st.slider("Tiempo Límite (s)", 10, 600, 60)
+            if motor == "CP-SAT (OR-Tools)" and (os.cpu_count() or 1) < MIN_HILOS_CPSAT:
+                st.caption(f"Este servidor tiene menos de {MIN_HILOS_CPSAT} núcleos: CP-SAT suele quedar por "
+                           "detrás del recocido con este tiempo.")
+                respaldo_recocido = st.checkbox("Usar el recocido en su lugar", value=False,
+                                                help=f"Con menos de {MIN_HILOS_CPSAT} hilos corre el recocido con "
+                                                     "el mismo tiempo en vez de CP-SAT.")
+        ejecucion = st.radio("Ejecución", ["En este servidor", "Servicio de cola"], horizontal=True,
+                             help="El servicio de cola resuelve en otros procesos, con límite de CPU por trabajo "
+                                  "(python -m horarios.cola); conviene cuando varias personas usan la app a la vez.")
+        if ejecucion == "En este servidor":
+            perfilar = st.checkbox("Perfilar la búsqueda (cProfile)", value=False)
+        semilla = st.number_input("Semilla (0 = al azar)", 0, None, 0, step=1,
+                                  help="Con la misma semilla y las mismas opciones, la corrida se repite igual.") or None
+        usar_cache = st.checkbox("Reutilizar soluciones guardadas", value=True,
+                                 help="Si la misma instancia ya se resolvió con estas opciones y semilla, y con al menos "
+                                      "este presupuesto, se muestra ese resultado al instante; si hay una parecida, la "
+                                      "búsqueda parte de ella.")
+        file = st.file_uploader("Subir Protocolo (Excel, o Cursos/Profesores/Salones en CSV o Parquet)",
+                                type=['xlsx', 'csv', 'parquet'], accept_multiple_files=True)
 
     st.markdown(f"### Ω Condiciones de Zona: {zona}")
     c1, c2, c3 = st.columns(3)
@@ -820,89 +515,121 @@ def main():
     with c2: st.metric("Hora Universal", "10:30 AM - 12:30 PM" if zona == "CENTRAL" else "10:00 AM - 12:00 PM")
     with c3: st.markdown(f"""<div class="status-badge">RESTRICCIONES FUERTES ACTIVAS</div>""", unsafe_allow_html=True)
 
+    id_trabajo = st.session_state.get('trabajo') or st.query_params.get('trabajo')
+    trabajo = obtener_trabajo(id_trabajo) if id_trabajo else None
+    id_cola = st.session_state.get('trabajo_cola') or st.query_params.get('cola')
     if not file:
-        st.markdown("""
-            <div class='glass-card' style='text-align: center;'>
-                <h3 style='margin-top:0; color: #D4AF37;'>📥 Sincronización de Datos</h3>
-                <p>Asegúrese de que el archivo Profesores.csv contiene la columna CURSOS_INTENSIVOS.</p>
-            </div>
-        """, unsafe_allow_html=True)
-    else:
-        if st.button("🚀 INICIAR OPTIMIZACIÓN ABSOLUTA"):
-            with st.spinner("Balanceando cargas, consolidando secciones y resolviendo..."):
-                xls = pd.ExcelFile(file)
-                df_cursos = pd.read_excel(xls, 'Cursos')
-                df_profes = pd.read_excel(xls, 'Profesores')
-                df_salones = pd.read_excel(xls, 'Salones')
-
-                scheduler = TabuScheduler(df_cursos, df_profes, df_salones, zona)
-                
-                start_time = time.time()
-                bar = st.progress(0)
-                status = st.empty()
-                mejor_sol, conflictos, historial = scheduler.optimizar(iteraciones, bar, status)
-                
-                st.session_state.elapsed_time = time.time() - start_time
-                st.session_state.conflicts = conflictos
-                st.session_state.historial = historial
-                st.session_state.scheduler = scheduler          # guardamos para usar después
-                st.session_state.mejor_sol = mejor_sol          # guardamos la solución
-                
-                cargas_finales = {}
-                for asign in mejor_sol:
-                    p = asign['profesor']
-                    if p != "GRADUADOS" and p != "TBA":
-                        cargas_finales[p] = cargas_finales.get(p, 0) + scheduler.get_sec_creditos(asign['seccion'], p)
-                
-                for p in scheduler.profesores:
-                    if p not in cargas_finales:
-                        cargas_finales[p] = 0.0
-
-                st.session_state.cargas_finales = cargas_finales
-
-                st.session_state.master = pd.DataFrame([{
-                    'ID': a['seccion'].cod, 
-                    'Asignatura': a['seccion'].cod.split('-')[0],
-                    'Estudiantes (Cupo)': a['seccion'].cupo,
-                    'Créditos Reales': scheduler.get_sec_creditos(a['seccion'], a['profesor']),
-                    'Persona': a['profesor'], 
-                    'Días': a['patron']['name'], 
-                    'Horario': format_horario(a['patron'], a['ini']), 
-                    'Salón': a['salon']
-                } for a in mejor_sol])
-                st.session_state.detailed_conflicts = scheduler._obtener_conflictos(mejor_sol)
+        if trabajo is None and id_cola is None:
+            st.markdown("""
+                <div class='glass-card' style='text-align: center;'>
+                    <h3 style='margin-top:0; color: #D4AF37;'>📥 Sincronización de Datos</h3>
+                    <p>Suba el libro Excel del protocolo, o Cursos, Profesores y Salones como .csv o .parquet.</p>
+                    <p>Asegúrese de que la tabla Profesores contiene la columna CURSOS_INTENSIVOS.</p>
+                </div>
+            """, unsafe_allow_html=True)
+    elif st.button("🚀 INICIAR OPTIMIZACIÓN ABSOLUTA", disabled=trabajo is not None and trabajo.activo):
+        huella = huella_archivos(file)
+        df_cursos, df_profes, df_salones = cargar_entradas(huella, file)
+        # Una sola corrida a la vista por sesión: la nueva reemplaza a la anterior en el panel
+        trabajo = id_cola = None
+        for clave in ('trabajo', 'trabajo_cola'): st.session_state.pop(clave, None)
+        for clave in ('trabajo', 'cola'): st.query_params.pop(clave, None)
+        asignacion = "exacta" if preasignacion == "Exacta (CP-SAT)" else "recocido"
+        criterios = dict(costo_objetivo=costo_objetivo or None, sin_mejora=sin_mejora or None,
+                         meseta_suave=meseta_suave or None)
+        cache = cache_soluciones() if usar_cache else None
+        instancia = Instancia(df_cursos, df_profes, df_salones) if usar_cache else None
+        config = dict(zona=zona, motor=MOTORES_SERVICIO[motor], preasignacion=asignacion, semilla=semilla,
+                      tiempo_preasignacion=tiempo_preasignacion, procesos=n_procesos, solo_horario=solo_horario,
+                      iteraciones=iteraciones, tiempo_limite=tiempo_limite, respaldo_recocido=respaldo_recocido,
+                      **(criterios if motor == "Recocido Evolutivo" else {}))
+        # Con un acierto, el reporte lleva los parámetros de esta corrida, como en guardar_resultados
+        parametros = dict(zona=zona, motor=motor, preasignacion=preasignacion)
+        guardado = cache.buscar(instancia, **config, parametros=parametros) if usar_cache else None
+        if guardado is not None:
+            guardar_resultado_tabla(guardado, f"cache-{uuid.uuid4().hex}", ('cache', instancia.huella))
+        elif ejecucion == "Servicio de cola":
+            id_cola = cola_servicio().encolar(
+                df_cursos, df_profes, df_salones, zona, MOTORES_SERVICIO[motor], asignacion, tiempo_preasignacion,
+                tiempo_limite=tiempo_limite, iteraciones=iteraciones, procesos=n_procesos, semilla=semilla,
+                solo_horario=solo_horario, cache=cache and cache.ruta, respaldo_recocido=respaldo_recocido,
+                **(criterios if motor == "Recocido Evolutivo" else {}))
+            st.session_state.trabajo_cola = id_cola
+            st.query_params["cola"] = id_cola
+        else:
+            trabajo = lanzar_trabajo(
+                partial(construir_scheduler, df_cursos, df_profes, df_salones, zona, asignacion, tiempo_preasignacion,
+                        semilla, cache, instancia),
+                partial(ejecutar_motor, motor=motor, iteraciones=iteraciones, tiempo_limite=tiempo_limite,
+                        n_procesos=n_procesos, solo_horario=solo_horario, perfilar=perfilar, semilla=semilla,
+                        respaldo_recocido=respaldo_recocido, **criterios),
+                huella=huella, zona=zona, motor=motor, preasignacion=preasignacion, cache=cache, instancia=instancia,
+                config=config)
+            st.session_state.trabajo = trabajo.id
+            st.query_params["trabajo"] = trabajo.id
+
+    if trabajo is not None:
+        st.markdown("### ⚙️ Corrida en Curso")
+        (panel_trabajo_vivo if trabajo.activo else panel_trabajo)(trabajo.id)
+    elif id_cola is not None:
+        st.markdown("### ⚙️ Corrida en el Servicio de Cola")
+        estado = cola_servicio().estado(id_cola)
+        (panel_cola_vivo if estado and estado['estado'] in ('en_cola', 'corriendo') else panel_cola)(id_cola)
 
     if 'master' in st.session_state:
-        st.success(f"✅ Optimización completada en {st.session_state.elapsed_time:.2f} segundos.")
+        corrida = st.session_state.get('corrida') or uuid.uuid4().hex
+        motivo = st.session_state.get('motivo_parada')
+        st.success(f"✅ Optimización completada en {st.session_state.elapsed_time:.2f} segundos de búsqueda."
+                   + (f" Criterio de parada: {motivo}." if motivo else ""))
+        reporte = st.session_state.get('reporte') or {}
+        if reporte.get('respaldo_recocido'):
+            st.warning(f"⚠️ Con menos de {MIN_HILOS_CPSAT} hilos se corrió el recocido en lugar de CP-SAT, como se pidió.")
+        if reporte.get('desde_cache'):
+            st.info("♻️ Resultado tomado de la caché de soluciones: esta instancia ya se había resuelto con las mismas "
+                    "opciones y semilla, y al menos este presupuesto. Desmarque «Reutilizar soluciones guardadas» para volver a optimizar.")
+        elif reporte.get('secciones_sembradas'):
+            st.info(f"♻️ La búsqueda partió de una solución guardada de una instancia parecida "
+                    f"({reporte['secciones_sembradas']} secciones reutilizadas).")
         
         st.markdown("<div class='glass-card'>", unsafe_allow_html=True)
         t1, t2, t3, t4 = st.tabs(["💎 PANEL DE CONTROL", "🔍 VISTAS DETALLADAS", "🚨 AUDITORÍA DE CALIDAD", "📊 ANALÍTICAS AVANZADAS"])
         
         with t1:
             edited = st.data_editor(st.session_state.master, use_container_width=True, height=500)
-            st.download_button("💾 EXPORTAR EXCEL PLATINUM", exportar_todo(edited), "Horario_Final_UPRM.xlsx", use_container_width=True)
+            # La exportación se arma solo a pedido y se reutiliza mientras la tabla editada no cambie
+            formatos = {"Excel (hoja por profesor)": ('xlsx', "Horario_Final_UPRM.xlsx"),
+                        "CSV por profesor (ZIP)": ('csv', "Horario_Final_UPRM_csv.zip"),
+                        "Parquet por profesor (ZIP)": ('parquet', "Horario_Final_UPRM_parquet.zip")}
+            e1, e2 = st.columns([1, 2])
+            with e1: formato, nombre_archivo = formatos[st.selectbox("Formato de Exportación", list(formatos))]
+            clave = (huella_tabla(edited), formato)
+            with e2:
+                if st.session_state.get('exportacion', (None,))[0] != clave:
+                    if st.button("⚙️ PREPARAR EXPORTACIÓN", use_container_width=True):
+                        with st.spinner("Generando archivo..."):
+                            st.session_state.exportacion = (clave, exportar(edited, formato))
+                if st.session_state.get('exportacion', (None,))[0] == clave:
+                    st.download_button("💾 EXPORTAR EXCEL PLATINUM" if formato == 'xlsx' else "💾 DESCARGAR PAQUETE ZIP",
+                                       st.session_state.exportacion[1], nombre_archivo, use_container_width=True)
             
         with t2:
             f1, f2, f3 = st.tabs(["Por Profesor", "Por Curso", "Por Salón"])
-            df_master = st.session_state.master
+            vistas = vistas_corrida(corrida, st.session_state.master)
             with f1:
-                lista_profes = sorted([p for p in df_master['Persona'].unique() if p != "GRADUADOS"])
+                lista_profes = [p for p in vistas['Persona'] if p != "GRADUADOS"]
                 if lista_profes:
                     p = st.selectbox("Seleccionar Profesor", lista_profes)
-                    subset = df_master[df_master['Persona'] == p]
-                    st.table(subset[['ID', 'Estudiantes (Cupo)', 'Créditos Reales', 'Días', 'Horario', 'Salón']])
+                    st.table(vistas['Persona'][p])
             with f2:
-                lista_cursos = sorted(df_master['Asignatura'].unique())
+                lista_cursos = list(vistas['Asignatura'])
                 if lista_cursos:
                     c = st.selectbox("Seleccionar Curso", lista_cursos)
-                    subset = df_master[df_master['Asignatura'] == c]
-                    st.table(subset[['ID', 'Estudiantes (Cupo)', 'Persona', 'Días', 'Horario', 'Salón']])
+                    st.table(vistas['Asignatura'][c])
             with f3:
-                lista_salones = sorted(df_master['Salón'].unique())
+                lista_salones = list(vistas['Salón'])
                 if lista_salones:
                     sl = st.selectbox("Seleccionar Salón", lista_salones)
-                    subset = df_master[df_master['Salón'] == sl]
-                    st.table(subset[['ID', 'Asignatura', 'Persona', 'Días', 'Horario']])
+                    st.table(vistas['Salón'][sl])
                 
         with t3:
             conflictos = st.session_state.conflicts
@@ -915,42 +642,52 @@ def main():
         with t4:
             st.markdown("### 🧬 Evolución del Algoritmo (Fitness vs Generaciones)")
             
-            fitness_history = [10000 / (10000 + costo) for costo in st.session_state.historial]
-            
-            fig1, ax1 = plt.subplots(figsize=(10, 4))
-            ax1.plot(fitness_history, color='#D4AF37', linewidth=2.5)
-            ax1.set_title("Crecimiento de Fitness Evolutivo", color='white', pad=15)
-            ax1.set_xlabel("Iteraciones", color='white')
-            ax1.set_ylabel("Fitness (1.0 = Ideal)", color='white')
-            fig1.patch.set_facecolor('#0F0F0F')
-            ax1.set_facecolor('#1A1A1A')
-            ax1.tick_params(colors='white')
-            for spine in ax1.spines.values(): spine.set_edgecolor('#D4AF37')
-            st.pyplot(fig1)
+            st.image(png_figura(corrida, 'fitness', lambda: figura_fitness(st.session_state.historial,
+                                                                           st.session_state.get('historiales_islas'))))
+
+            if st.session_state.get('tasas_intercambio'):
+                st.markdown("### 🌡️ Tasas de Intercambio entre Temperaturas Vecinas")
+                st.dataframe(pd.DataFrame({'Niveles': [f"T{j} ↔ T{j+1}" for j in range(len(st.session_state.tasas_intercambio))],
+                                           'Aceptación': [f"{t:.1%}" for t in st.session_state.tasas_intercambio]}),
+                             hide_index=True)
             
             st.markdown("---")
             st.markdown("### ⚖️ Distribución de Carga Académica")
-            cargas_df = pd.DataFrame(list(st.session_state.cargas_finales.items()), columns=['Profesor', 'Créditos Reales'])
-            cargas_df = cargas_df.sort_values('Créditos Reales', ascending=False)
-            
-            fig2, ax2 = plt.subplots(figsize=(12, 6))
-            ax2.bar(cargas_df['Profesor'], cargas_df['Créditos Reales'], color='#8E6E13')
-            ax2.axhline(y=12, color='#FF4B4B', linestyle='--', linewidth=2, label='Carga Estándar Típica (12 cr)')
-            ax2.set_xticklabels(cargas_df['Profesor'], rotation=45, ha='right', color='white')
-            ax2.tick_params(colors='white')
-            fig2.patch.set_facecolor('#0F0F0F')
-            ax2.set_facecolor('#1A1A1A')
-            for spine in ax2.spines.values(): spine.set_edgecolor('#D4AF37')
-            ax2.legend()
-            st.pyplot(fig2)
+            st.image(png_figura(corrida, 'cargas', lambda: figura_cargas(st.session_state.cargas_finales)))
 
             st.markdown("---")
             st.markdown("### 🗺️ Heatmap de Ocupación de Salones")
-            if 'scheduler' in st.session_state and 'mejor_sol' in st.session_state:
-                fig3 = generar_heatmap_ocupacion(st.session_state.scheduler, st.session_state.mejor_sol)
-                st.pyplot(fig3)
+            if st.session_state.get('scheduler') is not None and st.session_state.get('mejor_sol') is not None:
+                st.image(png_figura(corrida, 'heatmap', lambda: generar_heatmap_ocupacion(st.session_state.scheduler,
+                                                                                          st.session_state.mejor_sol)))
             else:
                 st.warning("No hay datos suficientes para generar el heatmap.")
+
+            st.markdown("---")
+            st.markdown("### ⏱️ Instrumentación de la Corrida")
+            reporte = st.session_state.get('reporte')
+            if reporte:
+                m = reporte['metricas']
+                k1, k2, k3, k4 = st.columns(4)
+                with k1: st.metric("Iteraciones / s", m['iteraciones_s'] if m['iteraciones_s'] is not None else "—")
+                with k2: st.metric("Tasa de Aceptación", f"{m['tasa_aceptacion']:.1%}" if m['tasa_aceptacion'] is not None else "—")
+                with k3: st.metric("Llamadas a _costo_total", m['contadores'].get('llamadas_costo_total', 0))
+                with k4: st.metric("Candidatos Evaluados / s", m['candidatos_evaluados_s'] if m['candidatos_evaluados_s'] is not None else "—")
+
+                e1, e2 = st.columns(2)
+                with e1:
+                    st.dataframe(pd.DataFrame(list(m['tiempos'].items()), columns=['Etapa', 'Segundos']), hide_index=True)
+                with e2:
+                    st.dataframe(pd.DataFrame(list(m['contadores'].items()), columns=['Contador', 'Valor']), hide_index=True)
+
+                if m['mejoras']:
+                    st.image(png_figura(corrida, 'mejoras', lambda: figura_mejoras(m['mejoras'])))
+
+                if st.session_state.get('perfil'):
+                    with st.expander("Perfil cProfile de la búsqueda"):
+                        st.code(st.session_state.perfil)
+                st.download_button("📄 DESCARGAR REPORTE DE LA CORRIDA (JSON)", json.dumps(reporte, ensure_ascii=False, indent=2),
+                                   "Reporte_Corrida.json", use_container_width=True)
             
         st.markdown("</div>", unsafe_allow_html=True)
 
@@ -0,0 +1,40 @@
+"""
+Motor del generador de horarios académicos, sin dependencias de interfaz:
+se puede importar desde trabajos por lotes o procesos aparte sin cargar
+streamlit, matplotlib ni plotly. La interfaz está en app.py y la línea de
+comandos en `python -m horarios`.
+"""
+from .utilidades import (COMPENSACION_TABLE, PATRONES, CATALOGO_PATRONES, get_creditos_reales,
+                         mins_to_str, str_to_mins, id_patron, format_horario)
+from .modelo import Seccion, Profesor, TablaIds, SolucionArreglos
+from .evaluacion import DIAS_SEMANA, IndiceOcupacion, EvaluadorIncremental
+from .cpsat import ModeloCPSAT
+from .motor import TabuScheduler
+from .entrada import leer_entradas, leer_tabla
+from .salida import (tabla_maestra, cargas_finales, exportar_todo, exportar_paquete, exportar, huella_tabla,
+                     escribir_horario, reporte_ejecucion, resultado_corrida)
+from .sintetico import generar_instancia
+from .metricas import Metricas, perfil
+from .trabajos import Avance, Trabajo, lanzar_trabajo, obtener_trabajo
+from .cache import CacheSoluciones, Instancia
+
+__all__ = [
+    'COMPENSACION_TABLE', 'PATRONES', 'CATALOGO_PATRONES', 'get_creditos_reales',
+    'mins_to_str', 'str_to_mins', 'id_patron', 'format_horario',
+    'Seccion', 'Profesor', 'TablaIds', 'SolucionArreglos',
+    'DIAS_SEMANA', 'IndiceOcupacion', 'EvaluadorIncremental',
+    'ModeloCPSAT', 'TabuScheduler',
+    'leer_entradas', 'leer_tabla',
+    'tabla_maestra', 'cargas_finales', 'exportar_todo', 'exportar_paquete', 'exportar', 'huella_tabla',
+    'escribir_horario', 'reporte_ejecucion', 'resultado_corrida',
+    'generar_instancia', 'Metricas', 'perfil',
+    'Avance', 'Trabajo', 'lanzar_trabajo', 'obtener_trabajo', 'ColaTrabajos', 'servir',
+    'CacheSoluciones', 'Instancia',
+]
+
+def __getattr__(nombre):
+    # La cola se importa al pedirla: así `python -m horarios.cola` no la encuentra ya cargada
+    if nombre in ('ColaTrabajos', 'servir'):
+        from . import cola
+        return getattr(cola, nombre)
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
@@ -0,0 +1,113 @@
+"""
+Banco de pruebas de escalamiento: genera instancias sintéticas de varios
+tamaños y mide, por motor y semilla, la construcción inicial, la velocidad
+de búsqueda, el rendimiento del evaluador y el resultado final. Cada
+corrida agrega filas a un CSV para seguir regresiones entre versiones.
+
+    python -m horarios.benchmark --tamanos 100 1000 5000 --semillas 0 1 2 \\
+        --motores recocido lns --iteraciones 2000 --tiempo 30 --salida benchmark.csv
+"""
+import argparse
+import copy
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from .cli import MOTORES, resolver
+from .motor import TabuScheduler
+from .sintetico import generar_instancia
+
+def medir_evaluador(scheduler, movimientos=200, completos=3, candidatos=100):
+    """
+    Rendimiento del evaluador sobre la solución actual: candidatos de
+    movimiento evaluados por segundo (deltas en lote) y evaluaciones
+    completas del costo por segundo. Se mide sobre una copia y se restaura
+    el estado de `random`, así la búsqueda que siga (contadores, azar y
+    orden interno del evaluador) es la misma que sin esta medición.
+    """
+    copia = copy.deepcopy(scheduler)
+    sol = copia.solucion
+    estado = random.getstate()
+    inicio = time.perf_counter()
+    for _ in range(movimientos):
+        copia._mutar_solucion(sol, candidatos)
+        copia._deshacer(sol)
+    deltas_s = movimientos * candidatos / (time.perf_counter() - inicio)
+    inicio = time.perf_counter()
+    for _ in range(completos):
+        copia._costo_total(sol)
+    completos_s = completos / (time.perf_counter() - inicio)
+    random.setstate(estado)
+    return deltas_s, completos_s
+
+def medir(tamano, semilla, motor, iteraciones=1000, tiempo_limite=30, procesos=None, zona="CENTRAL", **dificultad):
+    """Una fila del banco: instancia sintética (tamano, semilla), construcción, evaluador y búsqueda con `motor`."""
+    entradas = generar_instancia(tamano, semilla=semilla, **dificultad)
+    random.seed(semilla)
+    inicio = time.perf_counter()
+    scheduler = TabuScheduler(*entradas, zona)
+    segundos_init = time.perf_counter() - inicio
+    costo_inicial = scheduler.mejor_costo
+    deltas_s, completos_s = medir_evaluador(scheduler)
+
+    # Iteraciones y segundos de búsqueda de las métricas del motor: el largo del historial
+    # no cuenta pasos en lns, cpsat ni islas
+    previos = dict(scheduler.metricas.contadores)
+    _, conflictos, _ = resolver(scheduler, motor, tiempo_limite if motor in ('cpsat', 'lns') else None,
+                                iteraciones, procesos, semilla)
+    segundos_busqueda = scheduler.metricas.tiempos.get('busqueda', 0.0)
+    pasos = scheduler.metricas.desde(previos).get('iteraciones', 0)
+    return {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'tamano': tamano, 'semilla': semilla, 'motor': motor, **dificultad,
+        'secciones': len(scheduler.secciones), 'profesores': len(scheduler.profesores), 'salones': len(scheduler.salones),
+        'segundos_init': round(segundos_init, 4),
+        **{f'segundos_{etapa}': round(scheduler.metricas.tiempos.get(etapa, 0.0), 4)
+           for etapa in ('lectura', 'preasignacion', 'construccion', 'salones_iniciales')},
+        'candidatos_evaluados_s': round(deltas_s, 1),
+        'costos_completos_s': round(completos_s, 3),
+        'segundos_busqueda': round(segundos_busqueda, 4),
+        'iteraciones': pasos,
+        'iteraciones_s': round(pasos / segundos_busqueda, 1) if segundos_busqueda > 0 else None,
+        'tasa_aceptacion': scheduler.metricas.reporte()['tasa_aceptacion'],
+        'costo_inicial': float(costo_inicial),
+        'costo_final': float(scheduler.mejor_costo),
+        'conflictos_duros': int(conflictos),
+    }
+
+def _argumentos(argv):
+    parser = argparse.ArgumentParser(prog="python -m horarios.benchmark", description="Banco de escalamiento del generador de horarios.")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[100, 1000], help="Secciones por instancia (p. ej. 100 1000 5000 20000)")
+    parser.add_argument("--semillas", type=int, nargs="+", default=[0])
+    parser.add_argument("--motores", choices=MOTORES, nargs="+", default=["recocido"])
+    parser.add_argument("--iteraciones", type=int, default=1000, help="Iteraciones de recocido, islas y templado")
+    parser.add_argument("--tiempo", type=float, default=30, help="Segundos para cpsat y lns")
+    parser.add_argument("--procesos", type=int, default=None)
+    parser.add_argument("--ocupacion-salones", type=float, default=0.6)
+    parser.add_argument("--solape-profesores", type=float, default=0.2)
+    parser.add_argument("--prop-compensacion", type=float, default=0.2)
+    parser.add_argument("--prop-intensivos", type=float, default=0.3)
+    parser.add_argument("--holgura-carga", type=float, default=1.25)
+    parser.add_argument("--salida", default="benchmark.csv", help="CSV al que se agregan las filas")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = _argumentos(argv)
+    dificultad = dict(ocupacion_salones=args.ocupacion_salones, solape_profesores=args.solape_profesores,
+                      prop_compensacion=args.prop_compensacion, prop_intensivos=args.prop_intensivos, holgura_carga=args.holgura_carga)
+    for tamano in args.tamanos:
+        for semilla in args.semillas:
+            for motor in args.motores:
+                fila = medir(tamano, semilla, motor, args.iteraciones, args.tiempo, args.procesos, **dificultad)
+                # Fila por fila, para no perder lo medido si una corrida grande se interrumpe
+                pd.DataFrame([fila]).to_csv(args.salida, mode='a', header=not os.path.exists(args.salida), index=False)
+                print(f"{tamano} secciones, semilla {semilla}, {motor}: init {fila['segundos_init']:.2f} s, "
+                      f"{fila['iteraciones_s']} it/s, {fila['conflictos_duros']} conflictos duros", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
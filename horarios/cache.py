@@ -0,0 +1,263 @@
+"""
+Caché persistente de soluciones en SQLite. La clave es una huella canónica
+de las tablas normalizadas (Cursos expandido en secciones, Profesores,
+Salones; sin importar el orden de las filas) junto con zona, motor,
+preasignación, semilla y las demás opciones de la corrida (procesos, solo
+horarios, criterios de parada). El presupuesto (iteraciones y tiempo) no
+entra en la clave: se guarda aparte y una instancia ya resuelta se devuelve
+al instante si la corrida guardada tuvo al menos el presupuesto pedido. Una
+parecida (por ejemplo, con una fila cambiada) arranca en caliente desde la
+solución guardada más cercana. El archivo tiene tope de entradas y de bytes,
+y se desaloja la entrada usada hace más tiempo.
+"""
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import time
+import zlib
+from contextlib import closing, contextmanager
+
+import numpy as np
+import pandas as pd
+
+from .entrada import candidatos_de, expandir_secciones, normalizar_profesores, normalizar_salones
+
+RUTA_POR_DEFECTO = os.environ.get('HORARIOS_CACHE', 'horarios_cache.sqlite')
+MAX_ENTRADAS = 200
+MAX_BYTES = 256 * 2**20
+# Parecido mínimo (Jaccard entre las filas de ambas instancias) para arrancar en caliente
+SIMILITUD_MINIMA = 0.8
+# Corridas cortadas antes de su criterio de parada: sirven para arrancar en caliente, no como acierto exacto
+MOTIVOS_INCOMPLETOS = ("detenido", "límite de CPU")
+# Sube con cada cambio de la clave o de la tabla; un archivo de otra versión se vacía
+VERSION_ESQUEMA = 2
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS soluciones (
+    clave TEXT PRIMARY KEY,         -- huella de la instancia con zona, motor, preasignación, semilla y opciones
+    instancia TEXT NOT NULL,        -- huella de la instancia sola
+    zona TEXT NOT NULL,
+    costo REAL NOT NULL,
+    completa INTEGER NOT NULL,      -- 1 si alguna corrida con esta clave llegó a su criterio de parada
+    presupuesto TEXT NOT NULL,      -- JSON [iteraciones, segundos] (null: sin límite) que cubren las corridas completas
+    creado REAL NOT NULL,
+    usado REAL NOT NULL,            -- último acierto, para el desalojo LRU
+    bytes INTEGER NOT NULL,
+    firma BLOB NOT NULL,            -- hashes ordenados de las filas normalizadas
+    filas BLOB NOT NULL,            -- claves de sección y filas de TabuScheduler.exportar, comprimidas
+    resultado BLOB NOT NULL         -- salida.resultado_corrida, comprimido
+);
+CREATE INDEX IF NOT EXISTS soluciones_por_zona ON soluciones (zona);
+CREATE INDEX IF NOT EXISTS soluciones_por_uso ON soluciones (usado);
+"""
+
+# ==============================================================================
+# HUELLA DE LA INSTANCIA
+# ==============================================================================
+def _numeros(serie):
+    return pd.to_numeric(serie, errors='coerce').astype(float).astype(str)
+
+def _hash_filas(df, clave):
+    """Un uint64 por fila; `clave` (16 caracteres) separa los hashes de cada tabla."""
+    return pd.util.hash_pandas_object(df.astype(str), index=False, hash_key=clave).to_numpy()
+
+class Instancia:
+    """
+    Huella de las entradas de un TabuScheduler: `huella` (hex) identifica la
+    instancia, `secciones` trae un hash por sección en el orden del scheduler
+    y `firma` los hashes de todas las filas, para medir el parecido.
+    """
+    def __init__(self, df_cursos, df_profes, df_salones):
+        salones = normalizar_salones(df_salones)[['CODIGO', 'CAPACIDAD', 'TIPO']]
+        profes = pd.DataFrame(columns=['NOMBRE'])
+        compensan = []
+        if df_profes is not None and not df_profes.empty:
+            profes = normalizar_profesores(df_profes)
+            for col in ('CARGA_MIN', 'CARGA_MAX', 'ACEPTA_GRANDES', 'CURSOS_INTENSIVOS'):
+                profes[col] = _numeros(profes[col])
+            profes['PREFS'] = profes['PREFS'].map(','.join)
+            # Misma regla que Profesor.compensacion
+            comp = profes['COMPENSACION'].astype(str).str.upper().str.strip().isin(('SI', 'SÍ', 'YES', '1'))
+            compensan = profes['NOMBRE'][comp].tolist()
+        secciones = expandir_secciones(df_cursos, compensan)
+        secciones['CANDIDATOS'] = secciones['CANDIDATOS'].map(lambda v: ','.join(sorted(set(candidatos_de(v)))))
+
+        self.secciones = _hash_filas(secciones, 'horarios:secc:00')
+        partes = [np.sort(self.secciones), np.sort(_hash_filas(profes, 'horarios:prof:00')),
+                  np.sort(_hash_filas(salones, 'horarios:salo:00'))]
+        h = hashlib.sha256()
+        for parte in partes:
+            h.update(len(parte).to_bytes(8, 'little'))
+            h.update(parte.tobytes())
+        self.huella = h.hexdigest()
+        self.firma = np.unique(np.concatenate(partes))
+
+def _cubre(guardado, pedido):
+    """Si un presupuesto [iteraciones, segundos] guardado alcanza al pedido; None es sin límite."""
+    return all(g is None or (p is not None and g >= p) for g, p in zip(guardado, pedido))
+
+def _mayor(a, b):
+    return [None if x is None or y is None else max(x, y) for x, y in zip(a, b)]
+
+def _empacar(obj):
+    return zlib.compress(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL), 1)
+
+def _desempacar(blob):
+    return pickle.loads(zlib.decompress(blob))
+
+# ==============================================================================
+# CACHÉ DE SOLUCIONES
+# ==============================================================================
+class CacheSoluciones:
+    """Soluciones ya halladas en un archivo SQLite, compartido por la interfaz, la línea de comandos y la cola."""
+    def __init__(self, ruta=RUTA_POR_DEFECTO, max_entradas=MAX_ENTRADAS, max_bytes=MAX_BYTES,
+                 similitud_minima=SIMILITUD_MINIMA):
+        self.ruta = str(ruta)
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.similitud_minima = similitud_minima
+        with self._conexion() as con:
+            # Solo tiene efecto en un archivo nuevo: así el desalojo devuelve espacio al disco
+            con.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            con.execute("PRAGMA journal_mode=WAL")
+            if con.execute("PRAGMA user_version").fetchone()[0] != VERSION_ESQUEMA:
+                con.execute("DROP TABLE IF EXISTS soluciones")
+                con.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
+            con.executescript(ESQUEMA)
+
+    @contextmanager
+    def _conexion(self):
+        with closing(sqlite3.connect(self.ruta, timeout=30, isolation_level=None)) as con:
+            yield con
+
+    @staticmethod
+    def clave(instancia, zona, motor, preasignacion='recocido', semilla=None, **opciones):
+        """
+        `opciones` son las demás de la corrida que cambian la búsqueda (p. ej.
+        tiempo_preasignacion, procesos, solo_horario, costo_objetivo,
+        sin_mejora, meseta_suave); las que valen None o False no cuentan.
+        """
+        if preasignacion != 'exacta':
+            opciones.pop('tiempo_preasignacion', None)
+        if motor not in ('islas', 'templado'):
+            opciones.pop('procesos', None)
+        opciones = {k: v for k, v in opciones.items() if v is not None and v is not False}
+        return hashlib.sha256(json.dumps([instancia.huella, zona, motor, preasignacion, semilla, opciones],
+                                         sort_keys=True).encode()).hexdigest()
+
+    def buscar(self, instancia, zona, motor, preasignacion='recocido', semilla=None, iteraciones=None,
+               tiempo_limite=None, parametros=None, **opciones):
+        """
+        Acierto exacto: el resultado guardado (ver salida.resultado_corrida)
+        de una corrida completa con la misma clave y al menos este
+        presupuesto, o None. El reporte queda marcado `desde_cache`, con
+        `parametros` (los de la corrida actual) en lugar de los guardados,
+        que pasan a `parametros_guardados`.
+        """
+        clave = self.clave(instancia, zona, motor, preasignacion, semilla, **opciones)
+        with self._conexion() as con:
+            fila = con.execute("SELECT resultado, presupuesto FROM soluciones WHERE clave = ? AND completa",
+                               (clave,)).fetchone()
+            if fila is None or not _cubre(json.loads(fila[1]), [iteraciones, tiempo_limite]):
+                return None
+            con.execute("UPDATE soluciones SET usado = ? WHERE clave = ?", (time.time(), clave))
+        resultado = _desempacar(fila[0])
+        reporte = resultado['reporte']
+        reporte['desde_cache'] = True
+        if parametros is not None:
+            reporte['parametros_guardados'] = reporte['parametros']
+            reporte['parametros'] = parametros
+        return resultado
+
+    def cercana(self, instancia, zona):
+        """
+        Acierto cercano: (similitud, filas) de la solución guardada más
+        parecida en la misma zona, con una fila exportada por sección de
+        `instancia` (None donde la sección no estaba), o None si ninguna llega
+        a `similitud_minima`. A igual parecido gana la de menor costo.
+        """
+        mejor = None
+        with self._conexion() as con:
+            for clave, firma, costo in con.execute("SELECT clave, firma, costo FROM soluciones WHERE zona = ?", (zona,)):
+                otra = np.frombuffer(firma, dtype=np.uint64)
+                comunes = np.intersect1d(instancia.firma, otra, assume_unique=True).size
+                similitud = comunes / (instancia.firma.size + otra.size - comunes)
+                if similitud >= self.similitud_minima and (mejor is None or (similitud, -costo) > (mejor[0], -mejor[2])):
+                    mejor = (similitud, clave, costo)
+            if mejor is None:
+                return None
+            similitud, clave, _ = mejor
+            (blob,) = con.execute("SELECT filas FROM soluciones WHERE clave = ?", (clave,)).fetchone()
+            con.execute("UPDATE soluciones SET usado = ? WHERE clave = ?", (time.time(), clave))
+        claves, filas = _desempacar(blob)
+        por_seccion = dict(zip(claves, filas))
+        return similitud, [por_seccion.get(k) for k in instancia.secciones.tolist()]
+
+    def sembrar(self, scheduler, instancia):
+        """Arranca el scheduler desde la solución guardada más parecida; devuelve la similitud, o None si no hubo."""
+        cercana = self.cercana(instancia, scheduler.zona)
+        if cercana is None:
+            return None
+        similitud, filas = cercana
+        scheduler.sembrar(filas)
+        return similitud
+
+    def guardar(self, instancia, scheduler, resultado, zona, motor, preasignacion='recocido', semilla=None,
+                iteraciones=None, tiempo_limite=None, **opciones):
+        """
+        Guarda la mejor solución del scheduler y su `resultado` si mejora (o
+        iguala) la que había con la misma clave; después desaloja las entradas
+        usadas hace más tiempo hasta volver a los topes. La solución que queda
+        es al menos tan buena como la de cualquier corrida completa con esa
+        clave, así que cubre el mayor de sus presupuestos.
+        """
+        clave = self.clave(instancia, zona, motor, preasignacion, semilla, **opciones)
+        costo = float(scheduler.mejor_costo)
+        completa = scheduler.motivo_parada not in MOTIVOS_INCOMPLETOS
+        presupuesto = [iteraciones, tiempo_limite]
+        ahora = time.time()
+        with self._conexion() as con:
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                previa = con.execute("SELECT costo, completa, presupuesto FROM soluciones WHERE clave = ?",
+                                     (clave,)).fetchone()
+                if previa is not None and previa[1]:
+                    presupuesto = _mayor(presupuesto, json.loads(previa[2])) if completa else json.loads(previa[2])
+                completa = completa or bool(previa and previa[1])
+                if previa is None or costo <= previa[0]:
+                    firma = instancia.firma.tobytes()
+                    filas = _empacar((instancia.secciones.tolist(), scheduler.exportar()))
+                    datos = _empacar(resultado)
+                    con.execute("INSERT OR REPLACE INTO soluciones VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                (clave, instancia.huella, zona, costo, int(completa), json.dumps(presupuesto), ahora,
+                                 ahora, len(firma) + len(filas) + len(datos), firma, filas, datos))
+                else:
+                    # La guardada es mejor: si esta corrida fue completa, la guardada vale como acierto exacto
+                    # para su presupuesto
+                    con.execute("UPDATE soluciones SET usado = ?, completa = ?, presupuesto = ? WHERE clave = ?",
+                                (ahora, int(completa), json.dumps(presupuesto), clave))
+                desalojadas = self._desalojar(con)
+                con.execute("COMMIT")
+            except BaseException:
+                con.execute("ROLLBACK")
+                raise
+            if desalojadas:
+                con.execute("PRAGMA incremental_vacuum")
+
+    def _desalojar(self, con):
+        sobran = []
+        total = 0
+        for k, (clave, n_bytes) in enumerate(con.execute("SELECT clave, bytes FROM soluciones ORDER BY usado DESC").fetchall()):
+            total += n_bytes
+            if k >= self.max_entradas or total > self.max_bytes:
+                sobran.append((clave,))
+        con.executemany("DELETE FROM soluciones WHERE clave = ?", sobran)
+        return len(sobran)
+
+    def estadisticas(self):
+        """Entradas y bytes guardados."""
+        with self._conexion() as con:
+            entradas, n_bytes = con.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM soluciones").fetchone()
+        return {'entradas': entradas, 'bytes': n_bytes}
@@ -0,0 +1,124 @@
+"""
+Línea de comandos del generador: lee las entradas, resuelve con el motor
+elegido y escribe el horario maestro y un reporte JSON de la corrida.
+
+    python -m horarios Protocolo.xlsx --zona CENTRAL --motor recocido --tiempo 120 \\
+        --semilla 7 --salida horario.parquet --salida horario.xlsx --reporte corrida.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from contextlib import nullcontext
+
+from .cache import CacheSoluciones, Instancia
+from .entrada import leer_entradas
+from .metricas import perfil
+from .motor import MIN_HILOS_CPSAT, TIEMPO_PREASIGNACION, TabuScheduler
+from .salida import escribir_horario, resultado_corrida
+
+MOTORES = ('recocido', 'islas', 'templado', 'cpsat', 'lns')
+
+def resolver(scheduler, motor, tiempo_limite=None, iteraciones=None, procesos=None, semilla=None, solo_horario=False,
+             bar=None, status_text=None, respaldo_recocido=False, **criterios):
+    """
+    Corre el motor indicado con los mismos repartos de iteraciones que la
+    interfaz. `criterios` (costo_objetivo, sin_mejora, meseta_suave) son
+    los criterios de parada adicionales del recocido. Si el scheduler se
+    sembró con una solución anterior, islas y templado parten de ella.
+    Con `respaldo_recocido`, cpsat corre el recocido si hay pocos hilos.
+    """
+    desde_actual = scheduler.sembradas > 0
+    if motor == 'recocido':
+        return scheduler.optimizar(iteraciones, bar, status_text, tiempo_limite=tiempo_limite, solo_horario=solo_horario,
+                                   **criterios)
+    if motor == 'islas':
+        return scheduler.optimizar_islas(procesos, epocas=10, iteraciones=max(1, iteraciones // 10), bar=bar,
+                                         status_text=status_text, semilla=semilla, desde_actual=desde_actual)
+    if motor == 'templado':
+        return scheduler.templado_paralelo(procesos, rondas=max(1, iteraciones // 50), pasos=50, bar=bar,
+                                           status_text=status_text, semilla=semilla, desde_actual=desde_actual)
+    if motor == 'cpsat':
+        return scheduler.resolver_cpsat(tiempo_limite, bar, status_text, respaldo_recocido=respaldo_recocido)
+    if motor == 'lns':
+        return scheduler.resolver_lns(tiempo_limite, bar, status_text)
+    raise ValueError(f"Motor desconocido: {motor}")
+
+def _argumentos(argv):
+    parser = argparse.ArgumentParser(prog="python -m horarios", description="Generador de horarios académicos sin interfaz.")
+    parser.add_argument("entrada", help="Libro Excel con hojas Cursos/Profesores/Salones, o carpeta con esas tablas en .parquet o .csv")
+    parser.add_argument("--zona", choices=("CENTRAL", "PERIFERICA"), default="CENTRAL")
+    parser.add_argument("--motor", choices=MOTORES, default="recocido")
+    parser.add_argument("--respaldo-recocido", action="store_true",
+                        help=f"Con cpsat y menos de {MIN_HILOS_CPSAT} hilos, corre el recocido con el mismo tiempo")
+    parser.add_argument("--preasignacion", choices=("recocido", "exacta"), default="recocido")
+    parser.add_argument("--tiempo-preasignacion", type=float, default=TIEMPO_PREASIGNACION,
+                        help=f"Segundos de CP-SAT para la preasignación exacta (por defecto {TIEMPO_PREASIGNACION:g})")
+    parser.add_argument("--semilla", type=int, default=None)
+    parser.add_argument("--tiempo", type=float, default=None,
+                        help="Presupuesto en segundos (recocido, cpsat y lns; por defecto 60 en cpsat y lns)")
+    parser.add_argument("--iteraciones", type=int, default=None,
+                        help="Iteraciones del recocido, islas o templado (por defecto 300 si no hay --tiempo)")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos para islas o templado (por defecto, todos los núcleos)")
+    parser.add_argument("--solo-horario", action="store_true", help="Recocido solo de horarios; salones por emparejamiento")
+    parser.add_argument("--salida", action="append", default=[],
+                        help="Horario maestro en .parquet, .csv, .xlsx o .zip de CSV por profesor (se puede repetir)")
+    parser.add_argument("--reporte", default=None, help="Reporte JSON de la corrida (por defecto junto a la primera salida)")
+    parser.add_argument("--cache", default=None,
+                        help="Caché de soluciones (SQLite): una instancia ya resuelta con las mismas opciones y al menos "
+                             "este presupuesto se devuelve al instante; una parecida arranca desde la guardada")
+    parser.add_argument("--perfil", default=None, help="Perfila la búsqueda con cProfile y guarda las estadísticas en este .prof")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = _argumentos(argv)
+    salidas = args.salida or ["horario.parquet"]
+    reporte = args.reporte or os.path.splitext(salidas[0])[0] + ".json"
+    iteraciones = args.iteraciones
+    tiempo_limite = args.tiempo
+    if args.motor in ('cpsat', 'lns'):
+        tiempo_limite = tiempo_limite or 60
+    elif iteraciones is None and (args.motor != 'recocido' or tiempo_limite is None):
+        iteraciones = 300
+
+    if args.semilla is not None:
+        random.seed(args.semilla)
+    inicio = time.perf_counter()
+    df_cursos, df_profes, df_salones = leer_entradas(args.entrada)
+    cache = CacheSoluciones(args.cache) if args.cache else None
+    config = dict(zona=args.zona, motor=args.motor, preasignacion=args.preasignacion, semilla=args.semilla,
+                  tiempo_preasignacion=args.tiempo_preasignacion, procesos=args.procesos, solo_horario=args.solo_horario,
+                  respaldo_recocido=args.respaldo_recocido and args.motor == 'cpsat')
+    presupuesto = dict(iteraciones=iteraciones, tiempo_limite=tiempo_limite)
+    parametros = dict(entrada=str(args.entrada), tiempo=tiempo_limite, iteraciones=iteraciones, salidas=salidas, **config)
+    resultado = None
+    if cache is not None:
+        instancia = Instancia(df_cursos, df_profes, df_salones)
+        resultado = cache.buscar(instancia, **config, **presupuesto, parametros=parametros)
+    if resultado is None:
+        scheduler = TabuScheduler(df_cursos, df_profes, df_salones, args.zona, args.preasignacion,
+                                  args.tiempo_preasignacion)
+        if cache is not None:
+            cache.sembrar(scheduler, instancia)
+        with (perfil(args.perfil) if args.perfil else nullcontext({})) as perfilado:
+            solucion, conflictos, historial = resolver(scheduler, args.motor, tiempo_limite, iteraciones, args.procesos,
+                                                       args.semilla, args.solo_horario,
+                                                       respaldo_recocido=config['respaldo_recocido'])
+        segundos = time.perf_counter() - inicio
+        resultado = resultado_corrida(scheduler, solucion, conflictos, historial, segundos, **parametros)
+        if perfilado:
+            resultado['reporte']['perfil'] = perfilado['resumen']
+        if cache is not None:
+            cache.guardar(instancia, scheduler, resultado, **config, **presupuesto)
+    datos = resultado['reporte']
+
+    for ruta in salidas:
+        escribir_horario(resultado['maestro'], ruta)
+    with open(reporte, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, ensure_ascii=False, indent=2)
+    origen = " (caché)" if datos.get('desde_cache') else ""
+    print(f"{args.motor}{origen}: {datos['conflictos_duros']} conflictos duros, costo {datos['costo_total']:.2f}, "
+          f"{time.perf_counter() - inicio:.1f} s -> {', '.join(salidas)}", file=sys.stderr)
+    return 0
@@ -0,0 +1,349 @@
+"""
+Servicio local de resolución: una cola de trabajos en SQLite y un grupo de
+trabajadores que la consumen. Cada trabajo corre en su propio proceso, con
+límite de CPU y menor prioridad, así varias corridas a la vez no le quitan
+el procesador al servidor de la interfaz. La interfaz (u otro cliente)
+encola con `ColaTrabajos.encolar` y consulta `estado` y `resultado`.
+
+    python -m horarios.cola --db horarios_cola.sqlite --trabajadores 4 --limite-cpu 900
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import pickle
+import random
+import signal
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+import uuid
+from contextlib import closing, contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows: sin límite de CPU por trabajo
+    resource = None
+
+from .cache import CacheSoluciones, Instancia
+from .cli import MOTORES, resolver
+from .motor import TIEMPO_PREASIGNACION, TabuScheduler
+from .paralelo import limitar_cpu
+from .salida import resultado_corrida
+from .trabajos import Avance
+
+RUTA_POR_DEFECTO = os.environ.get('HORARIOS_COLA', 'horarios_cola.sqlite')
+# Segundos entre escrituras del avance y entre consultas del pedido de parada
+INTERVALO_AVANCE = 1.0
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS trabajos (
+    id TEXT PRIMARY KEY,
+    estado TEXT NOT NULL,           -- en_cola, corriendo, terminado, detenido, cancelado, error
+    creado REAL NOT NULL,
+    iniciado REAL,
+    terminado REAL,
+    parametros TEXT NOT NULL,       -- JSON: zona, motor, presupuesto, criterios, limite_cpu
+    entradas BLOB NOT NULL,         -- (df_cursos, df_profes, df_salones) serializados
+    avance TEXT,                    -- JSON con la última foto del avance
+    resultado BLOB,
+    error TEXT,
+    detener INTEGER NOT NULL DEFAULT 0,
+    trabajador INTEGER
+);
+CREATE INDEX IF NOT EXISTS trabajos_por_estado ON trabajos (estado, creado);
+"""
+
+class ColaTrabajos:
+    """Cola de trabajos de resolución en un archivo SQLite, compartida por la interfaz y los trabajadores."""
+    def __init__(self, ruta=RUTA_POR_DEFECTO):
+        self.ruta = str(ruta)
+        with self._conexion() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.executescript(ESQUEMA)
+
+    @contextmanager
+    def _conexion(self):
+        # Una conexión por operación: la cola se usa desde varios procesos e hilos
+        with closing(sqlite3.connect(self.ruta, timeout=30, isolation_level=None)) as con:
+            yield con
+
+    def encolar(self, df_cursos, df_profes, df_salones, zona, motor='recocido', preasignacion='recocido',
+                tiempo_preasignacion=TIEMPO_PREASIGNACION, tiempo_limite=None, iteraciones=None, procesos=None, semilla=None, solo_horario=False,
+                limite_cpu=None, cache=None, respaldo_recocido=False, **criterios):
+        """
+        Agrega un trabajo con las tablas de entrada y los parámetros de
+        `cli.resolver` (con `respaldo_recocido`, cpsat corre el recocido si
+        hay pocos hilos); devuelve su id. Con `cache` (ruta de una
+        CacheSoluciones) el trabajador la consulta antes de resolver y guarda
+        ahí su resultado. Lanza ValueError si el motor no tiene el presupuesto
+        que necesita.
+        """
+        if motor not in MOTORES:
+            raise ValueError(f"Motor desconocido: {motor}")
+        if preasignacion not in ('recocido', 'exacta'):
+            raise ValueError(f"Preasignación desconocida: {preasignacion}")
+        # Lo mismo que pediría `cli.resolver`, pero al encolar y no cuando el trabajador lo toma
+        if motor == 'recocido' and iteraciones is None and tiempo_limite is None:
+            raise ValueError("El recocido requiere un límite de iteraciones o de tiempo")
+        if motor in ('islas', 'templado') and iteraciones is None:
+            raise ValueError(f"El motor {motor} requiere un límite de iteraciones")
+        if motor in ('cpsat', 'lns') and tiempo_limite is None:
+            raise ValueError(f"El motor {motor} requiere un límite de tiempo")
+        parametros = dict(zona=zona, motor=motor, preasignacion=preasignacion,
+                          tiempo_preasignacion=tiempo_preasignacion, tiempo_limite=tiempo_limite,
+                          iteraciones=iteraciones, procesos=procesos, semilla=semilla, solo_horario=solo_horario,
+                          respaldo_recocido=respaldo_recocido and motor == 'cpsat', limite_cpu=limite_cpu,
+                          cache=cache and os.path.abspath(cache), criterios=criterios)
+        id_trabajo = uuid.uuid4().hex
+        with self._conexion() as con:
+            con.execute("INSERT INTO trabajos (id, estado, creado, parametros, entradas) VALUES (?, 'en_cola', ?, ?, ?)",
+                        (id_trabajo, time.time(), json.dumps(parametros),
+                         pickle.dumps((df_cursos, df_profes, df_salones), protocol=pickle.HIGHEST_PROTOCOL)))
+        return id_trabajo
+
+    def estado(self, id_trabajo):
+        """Estado, tiempos, último avance, error y lugar en la cola del trabajo; None si no existe."""
+        with self._conexion() as con:
+            fila = con.execute("SELECT estado, creado, iniciado, terminado, avance, error, parametros FROM trabajos "
+                               "WHERE id = ?", (id_trabajo,)).fetchone()
+            if fila is None:
+                return None
+            estado, creado, iniciado, terminado, avance, error, parametros = fila
+            delante = con.execute("SELECT COUNT(*) FROM trabajos WHERE estado = 'en_cola' AND creado < ?",
+                                  (creado,)).fetchone()[0] if estado == 'en_cola' else 0
+        return {'estado': estado, 'creado': creado, 'iniciado': iniciado, 'terminado': terminado,
+                'avance': json.loads(avance) if avance else {}, 'error': error,
+                'parametros': json.loads(parametros), 'en_cola_delante': delante}
+
+    def resultado(self, id_trabajo):
+        """Resultado de un trabajo terminado o detenido (ver `_resolver_trabajo`), o None si aún no hay."""
+        with self._conexion() as con:
+            fila = con.execute("SELECT resultado FROM trabajos WHERE id = ?", (id_trabajo,)).fetchone()
+        return pickle.loads(fila[0]) if fila and fila[0] is not None else None
+
+    def detener(self, id_trabajo):
+        """Cancela un trabajo en cola, o pide a uno en curso que termine con su mejor solución."""
+        with self._conexion() as con:
+            con.execute("UPDATE trabajos SET estado = 'cancelado', terminado = ? WHERE id = ? AND estado = 'en_cola'",
+                        (time.time(), id_trabajo))
+            con.execute("UPDATE trabajos SET detener = 1 WHERE id = ?", (id_trabajo,))
+
+    def listar(self, limite=50):
+        """Los últimos trabajos: (id, estado, creado, iniciado, terminado, motor)."""
+        with self._conexion() as con:
+            filas = con.execute("SELECT id, estado, creado, iniciado, terminado, parametros FROM trabajos "
+                                "ORDER BY creado DESC LIMIT ?", (limite,)).fetchall()
+        return [(*fila[:5], json.loads(fila[5])['motor']) for fila in filas]
+
+    def recuperar(self):
+        """Devuelve a la cola los trabajos que quedaron 'corriendo' de un servicio anterior."""
+        with self._conexion() as con:
+            return con.execute("UPDATE trabajos SET estado = 'en_cola', iniciado = NULL, trabajador = NULL "
+                               "WHERE estado = 'corriendo'").rowcount
+
+    def _tomar(self, trabajador):
+        """Reserva el trabajo más antiguo en cola para `trabajador`; devuelve su id o None."""
+        with self._conexion() as con:
+            # BEGIN IMMEDIATE toma el candado de escritura: dos trabajadores no pueden llevarse el mismo
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                fila = con.execute("SELECT id FROM trabajos WHERE estado = 'en_cola' ORDER BY creado LIMIT 1").fetchone()
+                if fila is not None:
+                    con.execute("UPDATE trabajos SET estado = 'corriendo', iniciado = ?, trabajador = ? WHERE id = ?",
+                                (time.time(), trabajador, fila[0]))
+                con.execute("COMMIT")
+            except BaseException:
+                con.execute("ROLLBACK")
+                raise
+        return fila[0] if fila else None
+
+    def _cargar(self, id_trabajo):
+        with self._conexion() as con:
+            parametros, entradas = con.execute("SELECT parametros, entradas FROM trabajos WHERE id = ?",
+                                               (id_trabajo,)).fetchone()
+        return json.loads(parametros), pickle.loads(entradas)
+
+    def _guardar_avance(self, id_trabajo, foto):
+        with self._conexion() as con:
+            con.execute("UPDATE trabajos SET avance = ? WHERE id = ?", (json.dumps(foto), id_trabajo))
+
+    def _pedido_detener(self, id_trabajo):
+        with self._conexion() as con:
+            return bool(con.execute("SELECT detener FROM trabajos WHERE id = ?", (id_trabajo,)).fetchone()[0])
+
+    def _terminar(self, id_trabajo, estado, resultado=None, error=None):
+        with self._conexion() as con:
+            con.execute("UPDATE trabajos SET estado = ?, terminado = ?, resultado = ?, error = ? WHERE id = ?",
+                        (estado, time.time(), None if resultado is None else
+                         pickle.dumps(resultado, protocol=pickle.HIGHEST_PROTOCOL), error, id_trabajo))
+
+# ==============================================================================
+# TRABAJADORES
+# ==============================================================================
+class _AvanceCola(Avance):
+    """Avance que además escribe en la cola, a lo sumo cada INTERVALO_AVANCE segundos."""
+    def __init__(self, cola, id_trabajo, scheduler):
+        super().__init__()
+        self.cola, self.id_trabajo, self.scheduler = cola, id_trabajo, scheduler
+        self.inicio = time.perf_counter()
+        self._escrito = 0.0
+
+    def progress(self, valor):
+        super().progress(valor)
+        self._publicar()
+
+    def markdown(self, texto):
+        super().markdown(texto)
+        self._publicar()
+
+    text = markdown
+
+    def _publicar(self):
+        ahora = time.perf_counter()
+        if ahora - self._escrito < INTERVALO_AVANCE:
+            return
+        self._escrito = ahora
+        sch, segundos = self.scheduler, ahora - self.inicio
+        iteraciones = sch.metricas.contadores.get('iteraciones', 0)
+        self.cola._guardar_avance(self.id_trabajo, {
+            'fraccion': self.fraccion, 'mensaje': self.mensaje, 'segundos': round(segundos, 1),
+            'mejor_costo': float(sch.mejor_costo), 'conflictos_duros': int(sch.mejor_costo // 10000),
+            'iteraciones_s': round(iteraciones / segundos, 1) if iteraciones and segundos > 0 else None})
+
+class _SenalCola:
+    """Señal de parada del motor: SIGXCPU (límite de CPU) o un pedido en la cola, consultado cada tanto."""
+    def __init__(self, cola, id_trabajo):
+        self.cola, self.id_trabajo = cola, id_trabajo
+        self.evento = threading.Event()
+        self._consultado = 0.0
+
+    def is_set(self):
+        ahora = time.monotonic()
+        if not self.evento.is_set() and ahora - self._consultado >= INTERVALO_AVANCE:
+            self._consultado = ahora
+            if self.cola._pedido_detener(self.id_trabajo):
+                self.evento.set()
+        return self.evento.is_set()
+
+def _resolver_trabajo(ruta, id_trabajo, limite_cpu):
+    """Proceso de un trabajo: aplica el límite de CPU, resuelve y guarda el resultado en la cola."""
+    cola = ColaTrabajos(ruta)
+    senal = _SenalCola(cola, id_trabajo)
+    try:
+        # Al pasar el límite blando llega SIGXCPU: el motor para y guarda su mejor solución
+        limitar_cpu(limite_cpu, senal.evento.set)
+        p, (df_cursos, df_profes, df_salones) = cola._cargar(id_trabajo)
+        if p['semilla'] is not None:
+            random.seed(p['semilla'])
+        inicio = time.perf_counter()
+        parametros = dict(id_trabajo=id_trabajo, **{k: v for k, v in p.items() if k not in ('criterios', 'cache')},
+                          **p['criterios'])
+        cache = CacheSoluciones(p['cache']) if p.get('cache') else None
+        if cache is not None:
+            instancia = Instancia(df_cursos, df_profes, df_salones)
+            config = dict(zona=p['zona'], motor=p['motor'], preasignacion=p['preasignacion'], semilla=p['semilla'],
+                          tiempo_preasignacion=p['tiempo_preasignacion'], procesos=p['procesos'],
+                          solo_horario=p['solo_horario'], iteraciones=p['iteraciones'],
+                          tiempo_limite=p['tiempo_limite'], respaldo_recocido=p.get('respaldo_recocido', False),
+                          **p['criterios'])
+            resultado = cache.buscar(instancia, **config, parametros=parametros)
+            if resultado is not None:
+                cola._terminar(id_trabajo, 'terminado', resultado=resultado)
+                return
+        scheduler = TabuScheduler(df_cursos, df_profes, df_salones, p['zona'], p['preasignacion'],
+                                  p['tiempo_preasignacion'])
+        if cache is not None:
+            cache.sembrar(scheduler, instancia)
+        scheduler.detener = senal
+        if limite_cpu and resource is not None:
+            scheduler.limite_cpu = limite_cpu
+        avance = _AvanceCola(cola, id_trabajo, scheduler)
+        solucion, conflictos, historial = resolver(scheduler, p['motor'], p['tiempo_limite'], p['iteraciones'],
+                                                   p['procesos'], p['semilla'], p['solo_horario'],
+                                                   bar=avance, status_text=avance,
+                                                   respaldo_recocido=p.get('respaldo_recocido', False), **p['criterios'])
+        segundos = time.perf_counter() - inicio
+        if senal.evento.is_set() and not cola._pedido_detener(id_trabajo):
+            scheduler.motivo_parada = "límite de CPU"
+        resultado = resultado_corrida(scheduler, solucion, conflictos, historial, segundos, **parametros)
+        if cache is not None:
+            cache.guardar(instancia, scheduler, resultado, **config)
+        cortado = senal.evento.is_set() or scheduler.motivo_parada == "límite de CPU"
+        cola._terminar(id_trabajo, 'detenido' if cortado else 'terminado', resultado=resultado)
+    except Exception:
+        cola._terminar(id_trabajo, 'error', error=traceback.format_exc())
+
+def _salir(*_):
+    raise SystemExit(0)
+
+def _trabajador(ruta, numero, limite_cpu, prioridad, espera):
+    """Bucle de un trabajador: toma el trabajo más antiguo y lo corre en un proceso hijo con sus límites."""
+    # Al detener el servicio, el trabajo en curso se corta y `recuperar` lo vuelve a encolar
+    signal.signal(signal.SIGTERM, _salir)
+    if prioridad and hasattr(os, 'nice'):
+        os.nice(prioridad)
+    cola = ColaTrabajos(ruta)
+    contexto = mp.get_context("fork" if "fork" in mp.get_all_start_methods() else None)
+    while True:
+        id_trabajo = cola._tomar(numero)
+        if id_trabajo is None:
+            time.sleep(espera)
+            continue
+        propio = cola.estado(id_trabajo)['parametros']['limite_cpu']
+        proceso = contexto.Process(target=_resolver_trabajo, args=(ruta, id_trabajo, propio or limite_cpu),
+                                   name=f"trabajo-{id_trabajo[:8]}")
+        proceso.start()
+        try:
+            proceso.join()
+        finally:
+            if proceso.is_alive():
+                proceso.terminate()
+        if cola.estado(id_trabajo)['estado'] == 'corriendo':
+            # El proceso murió sin guardar nada (SIGKILL por el límite duro de CPU, memoria, etc.)
+            motivo = " (límite de CPU)" if proceso.exitcode in (-signal.SIGKILL, -signal.SIGXCPU) else ""
+            cola._terminar(id_trabajo, 'error', error=f"El proceso del trabajo terminó con código {proceso.exitcode}{motivo}")
+
+def servir(ruta=RUTA_POR_DEFECTO, trabajadores=None, limite_cpu=None, prioridad=10, espera=0.5):
+    """
+    Levanta `trabajadores` procesos (por defecto, núcleos menos uno) que
+    consumen la cola hasta que se interrumpa el servicio. `limite_cpu` son
+    los segundos de CPU de cada trabajo, salvo que el trabajo traiga el
+    suyo (islas y templado los reparten entre sus procesos); `prioridad` es
+    el incremento de nice de los trabajadores.
+    """
+    trabajadores = trabajadores or max(1, (os.cpu_count() or 2) - 1)
+    cola = ColaTrabajos(ruta)
+    recuperados = cola.recuperar()
+    if recuperados:
+        print(f"{recuperados} trabajos interrumpidos vuelven a la cola", file=sys.stderr)
+    contexto = mp.get_context("fork" if "fork" in mp.get_all_start_methods() else None)
+    procesos = [contexto.Process(target=_trabajador, args=(ruta, k, limite_cpu, prioridad, espera), name=f"trabajador-{k}")
+                for k in range(trabajadores)]
+    for proceso in procesos:
+        proceso.start()
+    print(f"Servicio de cola en {ruta} con {trabajadores} trabajadores", file=sys.stderr)
+    signal.signal(signal.SIGTERM, _salir)
+    try:
+        for proceso in procesos:
+            proceso.join()
+    except (KeyboardInterrupt, SystemExit):
+        for proceso in procesos:
+            proceso.terminate()
+        for proceso in procesos:
+            proceso.join()
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m horarios.cola", description="Servicio local de resolución de horarios.")
+    parser.add_argument("--db", default=RUTA_POR_DEFECTO, help="Archivo SQLite de la cola (también HORARIOS_COLA)")
+    parser.add_argument("--trabajadores", type=int, default=None, help="Trabajos a la vez (por defecto, núcleos menos uno)")
+    parser.add_argument("--limite-cpu", type=float, default=None, help="Segundos de CPU de cada trabajo, repartidos entre sus procesos")
+    parser.add_argument("--prioridad", type=int, default=10, help="Incremento de nice de los trabajadores")
+    args = parser.parse_args(argv)
+    return servir(args.db, args.trabajadores, args.limite_cpu, args.prioridad)
+
+if __name__ == "__main__":
+    sys.exit(main())
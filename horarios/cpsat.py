@@ -0,0 +1,237 @@
+"""Modelo exacto CP-SAT del horario (completo o por vecindarios)."""
+import os
+import threading
+import time
+
+from ortools.sat.python import cp_model
+
+from .utilidades import CATALOGO_PATRONES, id_patron
+from .evaluacion import DIAS_SEMANA
+
+# ==============================================================================
+# MOTOR EXACTO CP-SAT
+# ==============================================================================
+MINUTOS_DIA = 1440
+
+class ModeloCPSAT:
+    """
+    Modelo CP-SAT del horario con los profesores ya preasignados. Cada sección
+    elige exactamente una opción (patrón, inicio) y un salón. Las reglas duras
+    del evaluador (hora universal, ventana operativa, intensivos, capacidad y
+    tipo) recortan las opciones; los cruces de profesor se prohíben con
+    NoOverlap, los de salón con un NoOverlap por salón sobre intervalos
+    opcionales y la fusión en salones mega con un Cumulative por asientos. Las preferencias AM/PM y de
+    días forman el objetivo. Una sección puede quedar omitida (fuera de todas
+    las restricciones, con el peso de un conflicto duro) para que el modelo
+    siempre tenga solución; las omitidas conservan su asignación actual.
+
+    Con `libres` solo esas secciones son variables: las demás sin cruces entran
+    como intervalos fijos en los profesores y salones que comparten con ellas.
+    """
+    def __init__(self, scheduler, libres=None):
+        self.sch = scheduler
+        self.model = cp_model.CpModel()
+        self.salones = list(scheduler.info_salon)
+        self.idx_salon = {c: k for k, c in enumerate(self.salones)}
+        sol = scheduler.solucion
+        # Las secciones sin profesor cuestan lo mismo en cualquier lugar: no se modelan
+        self.libres = [i for i in (range(len(sol)) if libres is None else libres)
+                       if sol[i]['profesor'] != "TBA" and sol[i]['salon'] != "TBA"]
+        self.opciones = {}
+        self.var_salon = {}
+        self.omitidas = {}
+        self.objetivos = []
+        self._construir()
+
+    def _y(self, a, b):
+        """Literal equivalente a (a ∧ b)."""
+        c = self.model.NewBoolVar("")
+        self.model.AddImplication(c, a)
+        self.model.AddImplication(c, b)
+        self.model.AddBoolOr([a.Not(), b.Not(), c])
+        return c
+
+    def _salones_candidatos(self, i):
+        ev = self.sch.evaluador
+        costos = {c: ev.costo_salon(i, c) for c in self.salones}
+        minimo = min(costos.values())
+        return [self.idx_salon[c] for c, v in costos.items() if v == minimo]
+
+    def _construir(self):
+        sch, m = self.sch, self.model
+        ev = sch.evaluador
+        sol = sch.solucion
+        intervalos_prof = {}
+        intervalos_salon = {}
+        mega = {self.idx_salon[c]: sch.info_salon[c]['CAPACIDAD'] for c in sch.mega_salones}
+        cumulativos = {k: ([], []) for k in mega}
+        objetivo = []
+
+        for i in self.libres:
+            s = ev.secs[i]
+            prof = sol[i]['profesor']
+            pids, _ = sch._opciones_movimiento(s, prof)
+            opciones = [(int(pid), ini, ev.costo_horario(i, prof, int(pid), ini)) for pid in pids for ini in sch.bloques]
+            viables = [o for o in opciones if o[2] < 10000]
+            # Si ninguna opción cumple las reglas duras se admiten todas, con su penalización
+            opciones = viables or opciones
+
+            xs = [m.NewBoolVar(f"x{i}_{pid}_{ini}") for pid, ini, _ in opciones]
+            m.AddExactlyOne(xs)
+            omitida = m.NewBoolVar(f"omitida{i}")
+            self.omitidas[i] = omitida
+            objetivo.append(10000 * omitida)
+            self.opciones[i] = [(pid, ini, x) for (pid, ini, _), x in zip(opciones, xs)]
+            objetivo += [c * x for (_, _, c), x in zip(opciones, xs) if c]
+
+            inicios = sorted({ini for _, ini, _ in opciones})
+            v_ini = m.NewIntVarFromDomain(cp_model.Domain.FromValues(inicios), f"ini{i}")
+            m.Add(v_ini == sum(ini * x for (_, ini, _), x in zip(opciones, xs)))
+
+            candidatos = self._salones_candidatos(i)
+            v_salon = m.NewIntVarFromDomain(cp_model.Domain.FromValues(candidatos), f"salon{i}")
+            self.var_salon[i] = v_salon
+            # Un literal por salón candidato; cada uno lleva sus propios intervalos
+            en_salon = {k: m.NewBoolVar("") for k in candidatos}
+            m.AddExactlyOne(en_salon.values())
+            m.Add(v_salon == sum(k * b for k, b in en_salon.items()))
+
+            # La solución actual sirve de pista; las secciones en conflicto se sugieren omitidas
+            hint = (id_patron(sol[i]['patron']), sol[i]['ini'])
+            estado = (ev.prof[i], ev.salon[i], ev.pid[i], ev.ini[i])
+            en_opciones = any((pid, ini) == hint for pid, ini, _ in opciones)
+            salon_actual = self.idx_salon.get(sol[i]['salon'])
+            if en_opciones:
+                for (pid, ini, _), x in zip(opciones, xs):
+                    m.AddHint(x, (pid, ini) == hint)
+            if salon_actual in candidatos:
+                m.AddHint(v_salon, salon_actual)
+                for k, b in en_salon.items():
+                    m.AddHint(b, k == salon_actual)
+            m.AddHint(omitida, not en_opciones or salon_actual not in candidatos
+                      or ev.propio[i] >= 10000 or bool(ev.cruces(i, *estado)))
+
+            for d, dia in enumerate(DIAS_SEMANA):
+                del_dia = [(int(CATALOGO_PATRONES[pid]['days'][dia] * 50), x)
+                           for (pid, _, _), x in zip(opciones, xs) if dia in CATALOGO_PATRONES[pid]['days']]
+                if not del_dia: continue
+                presente = m.NewBoolVar("")
+                elegido = sum(x for _, x in del_dia)
+                m.Add(presente <= elegido)
+                m.Add(presente + omitida <= 1)
+                m.Add(presente >= elegido - omitida)
+                dur_max = max(dur for dur, _ in del_dia)
+                duracion = m.NewIntVar(0, dur_max, "")
+                m.Add(duracion == sum(dur * x for dur, x in del_dia))
+                fin = m.NewIntVar(0, MINUTOS_DIA * len(DIAS_SEMANA), "")
+                inicio = v_ini + d * MINUTOS_DIA
+                iv = m.NewOptionalIntervalVar(inicio, duracion, fin, presente, "")
+
+                if prof != "GRADUADOS":
+                    intervalos_prof.setdefault(prof, []).append(iv)
+                for k, b in en_salon.items():
+                    iv_salon = m.NewOptionalIntervalVar(inicio, duracion, fin, self._y(presente, b), "")
+                    if k in mega:
+                        cumulativos[k][0].append(iv_salon)
+                        cumulativos[k][1].append(min(s.cupo, mega[k]) if s.es_fusionable else mega[k])
+                    else:
+                        intervalos_salon.setdefault(k, []).append(iv_salon)
+
+        fijos_prof, fijos_salon = {}, {}
+        if len(self.libres) < len(sol):
+            self._fijar_resto(intervalos_prof, intervalos_salon, cumulativos, mega, fijos_prof, fijos_salon)
+        for libres, fijos in ((intervalos_prof, fijos_prof), (intervalos_salon, fijos_salon)):
+            for clave, ivs in libres.items():
+                # Las fijas ya cruzadas entre sí van en grupos sin solape, cada uno con las libres
+                for grupo in self._grupos_sin_solape(fijos.get(clave, [])) or [[]]:
+                    m.AddNoOverlap(ivs + [m.NewFixedSizeIntervalVar(a, b - a, "") for a, b in grupo])
+        for k, (ivs, demandas) in cumulativos.items():
+            if ivs: m.AddCumulative(ivs, demandas, mega[k])
+        m.Minimize(sum(objetivo))
+
+    @staticmethod
+    def _grupos_sin_solape(tramos):
+        """Reparte tramos [a, b) en el menor número de grupos sin solapes (coloreo de intervalos)."""
+        grupos = []
+        for a, b in sorted(tramos):
+            grupo = next((g for g in grupos if g[-1][1] <= a), None)
+            if grupo is None: grupos.append([(a, b)])
+            else: grupo.append((a, b))
+        return grupos
+
+    def _fijar_resto(self, intervalos_prof, intervalos_salon, cumulativos, mega, fijos_prof, fijos_salon):
+        """
+        Tramos de las secciones no libres que comparten profesor o salón con el
+        modelo: van a `fijos_prof`/`fijos_salon` o, en los salones mega, como
+        carga fija del Cumulative.
+        """
+        sch, m = self.sch, self.model
+        ev = sch.evaluador
+        libres = set(self.libres)
+        megas_libres = {k for k, (ivs, _) in cumulativos.items() if ivs}
+        fijos_mega = {}
+        for j, s in enumerate(ev.secs):
+            prof, salon = ev.prof[j], ev.salon[j]
+            k = self.idx_salon.get(salon)
+            if j in libres or not ev._activa(prof, salon): continue
+            for dia, contrib in CATALOGO_PATRONES[ev.pid[j]]['days'].items():
+                inicio = ev.ini[j] + DIAS_SEMANA.index(dia) * MINUTOS_DIA
+                fin = inicio + int(contrib * 50)
+                if prof in intervalos_prof:
+                    fijos_prof.setdefault(prof, []).append((inicio, fin))
+                if k in intervalos_salon:
+                    fijos_salon.setdefault(k, []).append((inicio, fin))
+                elif k in megas_libres:
+                    demanda = min(s.cupo, mega[k]) if s.es_fusionable else mega[k]
+                    fijos_mega.setdefault(k, []).append((inicio, fin, demanda))
+        # Las fijas pueden exceder la capacidad (fusión válida solo por pares o cruces ya
+        # existentes): su carga entra por tramos entre cortes, recortada a la capacidad
+        for k, tramos in fijos_mega.items():
+            cortes = sorted({t for a, b, _ in tramos for t in (a, b)})
+            for t0, t1 in zip(cortes, cortes[1:]):
+                carga = sum(dem for a, b, dem in tramos if a <= t0 and t1 <= b)
+                if carga:
+                    cumulativos[k][0].append(m.NewFixedSizeIntervalVar(t0, t1 - t0, ""))
+                    cumulativos[k][1].append(min(carga, mega[k]))
+
+    def resolver(self, tiempo_limite=60, workers=None, bar=None, status_text=None, detener=None):
+        """
+        Resuelve con búsqueda multi-hilo hasta `tiempo_limite` segundos y
+        devuelve {sección: (salón, patrón, inicio)} o None si no halló solución.
+        El solver corre en un hilo aparte para poder reportar el avance y
+        cortarlo con la mejor solución hallada si se activa `detener`.
+        """
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = float(tiempo_limite)
+        solver.parameters.num_workers = workers or os.cpu_count() or 1
+        # El sondeo del presolve cuesta más que lo que aporta en este modelo de muchas opciones
+        solver.parameters.cp_model_probing_level = 0
+        modelo = self
+        inicio = time.time()
+
+        class _Registro(cp_model.CpSolverSolutionCallback):
+            def on_solution_callback(self):
+                modelo.objetivos.append((time.time() - inicio, self.ObjectiveValue()))
+
+        resultado = {}
+        hilo = threading.Thread(target=lambda: resultado.setdefault('estado', solver.Solve(self.model, _Registro())))
+        hilo.start()
+        while hilo.is_alive():
+            hilo.join(0.5)
+            if detener is not None and detener.is_set():
+                solver.StopSearch()
+            transcurrido = time.time() - inicio
+            if status_text:
+                mejor = f"{self.objetivos[-1][1]:.0f}" if self.objetivos else "—"
+                status_text.markdown(f"**🧮 CP-SAT {transcurrido:.0f}s/{tiempo_limite}s** | Soluciones: {len(self.objetivos)} | Objetivo: {mejor}")
+            if bar: bar.progress(min(1.0, transcurrido / tiempo_limite))
+
+        self.estado = solver.StatusName(resultado['estado'])
+        if resultado['estado'] not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            return None
+        asignaciones = {}
+        for i, opciones in self.opciones.items():
+            if solver.BooleanValue(self.omitidas[i]): continue
+            pid, ini = next((pid, ini) for pid, ini, x in opciones if solver.BooleanValue(x))
+            asignaciones[i] = (self.salones[solver.Value(self.var_salon[i])], CATALOGO_PATRONES[pid], ini)
+        return asignaciones
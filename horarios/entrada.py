@@ -0,0 +1,141 @@
+"""Lectura de las tablas de entrada (Cursos, Profesores, Salones) y su normalización por columnas."""
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import python_calamine  # lector de Excel en Rust, bastante más rápido que openpyxl
+except ImportError:
+    python_calamine = None
+
+HOJAS = ('Cursos', 'Profesores', 'Salones')
+# Lectores de tablas sueltas por extensión; se pueden agregar otros formatos
+LECTORES = {'.csv': pd.read_csv, '.parquet': pd.read_parquet, '.pq': pd.read_parquet}
+
+def _extension(origen):
+    return os.path.splitext(str(getattr(origen, 'name', origen)))[1].lower()
+
+def leer_tabla(origen):
+    """Una tabla desde CSV o Parquet (ruta o archivo abierto con `name`), según la extensión."""
+    ext = _extension(origen)
+    if ext not in LECTORES:
+        raise ValueError(f"Formato de tabla no soportado: {getattr(origen, 'name', origen)}")
+    return LECTORES[ext](origen)
+
+def leer_libro(origen):
+    """Las tres hojas de un libro Excel en una sola pasada, con calamine si está instalado."""
+    hojas = pd.read_excel(origen, sheet_name=list(HOJAS), engine='calamine' if python_calamine else None)
+    return tuple(hojas[hoja] for hoja in HOJAS)
+
+def leer_entradas(origen):
+    """
+    (df_cursos, df_profes, df_salones) desde un libro Excel con las hojas
+    Cursos, Profesores y Salones (ruta o archivo abierto), desde una carpeta
+    con Cursos, Profesores y Salones en .parquet o .csv, o desde una lista de
+    archivos: un libro, o las tres tablas nombradas así.
+    """
+    if isinstance(origen, (list, tuple)):
+        if len(origen) == 1 and _extension(origen[0]) not in LECTORES:
+            return leer_libro(origen[0])
+        por_nombre = {os.path.splitext(os.path.basename(str(getattr(a, 'name', a))))[0].upper(): a for a in origen}
+        faltan = [hoja for hoja in HOJAS if hoja.upper() not in por_nombre]
+        if faltan:
+            raise FileNotFoundError(f"Faltan las tablas: {', '.join(faltan)}")
+        return tuple(leer_tabla(por_nombre[hoja.upper()]) for hoja in HOJAS)
+    if isinstance(origen, (str, os.PathLike)) and os.path.isdir(origen):
+        tablas = []
+        for hoja in HOJAS:
+            rutas = [os.path.join(origen, hoja + ext) for ext in ('.parquet', '.csv')]
+            ruta = next((r for r in rutas if os.path.exists(r)), None)
+            if ruta is None:
+                raise FileNotFoundError(f"Falta {hoja}.parquet o {hoja}.csv en {origen}")
+            tablas.append(leer_tabla(ruta))
+        return tuple(tablas)
+    return leer_libro(origen)
+
+# ==============================================================================
+# NORMALIZACIÓN POR COLUMNAS
+# ==============================================================================
+def _columnas(df):
+    """Copia con los nombres de columna sin espacios y en mayúsculas."""
+    df = df.copy()
+    df.columns = [str(c).strip().upper() for c in df.columns]
+    return df
+
+def _columna(df, nombre, defecto):
+    return df[nombre] if nombre in df.columns else pd.Series(defecto, index=df.index, dtype=object)
+
+def _texto(serie):
+    return serie.astype(str).str.strip().str.upper()
+
+def _enteros(serie, defecto):
+    """Enteros truncados; lo que no es número toma `defecto`."""
+    return pd.to_numeric(serie, errors='coerce').fillna(defecto).astype(np.int64)
+
+def normalizar_salones(df_salones):
+    """CODIGO, CAPACIDAD (25 si falta), TIPO (1 si falta) y MEGA (salones FA/FB/FC, donde se fusiona)."""
+    df = _columnas(df_salones)
+    codigo = _texto(df['CODIGO'])
+    return pd.DataFrame({
+        'CODIGO': codigo,
+        'CAPACIDAD': _enteros(_columna(df, 'CAPACIDAD', None), 25),
+        'TIPO': _enteros(_columna(df, 'TIPO', None), 1),
+        'MEGA': codigo.str.replace(" ", "").str.replace("-", "").str.contains("FA|FB|FC"),
+    })
+
+def normalizar_profesores(df_profes):
+    """Columnas de Profesor con sus valores por defecto y PREFS: la lista de cursos preferidos (PREF1-PREF3)."""
+    df = _columnas(df_profes)
+    prefs = [[] for _ in range(len(df))]
+    for col in ('PREF1', 'PREF2', 'PREF3'):
+        if col not in df.columns: continue
+        valores = df[col].where(df[col].notnull())
+        for k, v in zip(np.flatnonzero(valores.notnull().to_numpy()), _texto(valores.dropna())):
+            if v != 'NAN': prefs[k].append(v)
+    return pd.DataFrame({
+        'NOMBRE': _texto(df['NOMBRE']),
+        'CARGA_MIN': _columna(df, 'CARGA_MIN', 0),
+        'CARGA_MAX': _columna(df, 'CARGA_MAX', 15),
+        'PREF_DIAS': _columna(df, 'PREF_DIAS', ''),
+        'PREF_HORAS': _columna(df, 'PREF_HORAS', 'ANY'),
+        'PREFS': prefs,
+        'COMPENSACION': _columna(df, 'COMPENSACION', 'NO'),
+        'ACEPTA_GRANDES': _columna(df, 'ACEPTA_GRANDES', 0),
+        'CURSOS_INTENSIVOS': _columna(df, 'CURSOS_INTENSIVOS', 0),
+    }, index=df.index)
+
+def candidatos_de(valor):
+    return [c.strip().upper() for c in str(valor).split(',') if c.strip() and str(c).upper() != 'NAN']
+
+def expandir_secciones(df_cursos, compensan):
+    """
+    Una fila por sección. Las filas de un mismo CODIGO se agrupan (la primera
+    fija créditos, cupo, candidatos y tipo; la demanda se suma) y la demanda se
+    reparte en secciones del cupo típico. Si algún candidato está en
+    `compensan` y la demanda supera el cupo, se abren secciones de hasta 150.
+    """
+    df = _columnas(df_cursos)
+    df['CODIGO'] = _texto(df['CODIGO'])
+    df['DEMANDA'] = _enteros(_columna(df, 'DEMANDA', None), 0)
+    cursos = df.drop_duplicates('CODIGO').set_index('CODIGO')
+    demanda = df.groupby('CODIGO', sort=False)['DEMANDA'].sum().reindex(cursos.index).to_numpy()
+    candidatos = _columna(cursos, 'CANDIDATOS', '')
+    cupo = _enteros(_columna(cursos, 'CUPO', None), 30).to_numpy()
+
+    listas = candidatos.map(candidatos_de).explode()
+    acepta_comp = listas.isin(compensan).groupby(level=0, sort=False).any().reindex(cursos.index).to_numpy()
+    cupo_efectivo = np.where(acepta_comp & (demanda > cupo), np.minimum(demanda, 150), cupo)
+    n = np.where(demanda > 0, -(-demanda // cupo_efectivo), 1)
+    ultimo = demanda - cupo_efectivo * (n - 1)
+
+    fila = np.repeat(np.arange(len(cursos)), n)
+    posicion = np.arange(len(fila)) - np.repeat(np.cumsum(n) - n, n)
+    es_ultima = posicion == n[fila] - 1
+    return pd.DataFrame({
+        'CODIGO': [f"{c}-{i+1:02d}" for c, i in zip(cursos.index.to_numpy()[fila], posicion)],
+        'CREDITOS': pd.to_numeric(cursos['CREDITOS']).astype(np.int64).to_numpy()[fila],
+        'CUPO': np.where(es_ultima & (ultimo[fila] > 0), ultimo[fila], cupo_efectivo[fila]),
+        'CANDIDATOS': candidatos.to_numpy()[fila],
+        'TIPO_SALON': _enteros(_columna(cursos, 'TIPO_SALON', None), 1).to_numpy()[fila],
+    })
@@ -0,0 +1,529 @@
+"""Evaluación incremental del costo de un horario."""
+import random
+
+import numpy as np
+
+from .utilidades import CATALOGO_PATRONES, PATRONES, id_patron, mins_to_str
+
+# ==============================================================================
+# EVALUACIÓN INCREMENTAL DEL COSTO
+# ==============================================================================
+MINUTOS_FRANJA = 5
+DIAS_SEMANA = ['Lu', 'Ma', 'Mi', 'Ju', 'Vi']
+def es_intensivo(patron):
+    return any(c >= 3 for c in patron['days'].values())
+
+def admite_intensivo(creditos):
+    return any(es_intensivo(p) for p in PATRONES.get(creditos, PATRONES[3]))
+
+class ConjuntoIndexado:
+    """Conjunto de enteros con alta, baja y elección al azar en O(1)."""
+    def __init__(self):
+        self.elementos = []
+        self.posicion = {}
+
+    def agregar(self, x):
+        if x not in self.posicion:
+            self.posicion[x] = len(self.elementos)
+            self.elementos.append(x)
+
+    def quitar(self, x):
+        k = self.posicion.pop(x, None)
+        if k is None: return
+        ultimo = self.elementos.pop()
+        if ultimo != x:
+            self.elementos[k] = ultimo
+            self.posicion[ultimo] = k
+
+    def elegir(self):
+        return self.elementos[random.randrange(len(self.elementos))]
+
+    def __contains__(self, x):
+        return x in self.posicion
+
+    def __len__(self):
+        return len(self.elementos)
+
+    def __iter__(self):
+        return iter(self.elementos)
+
+class IndiceOcupacion:
+    """
+    Ocupación por franjas de 5 minutos para un conjunto de claves (profesores
+    o salones). Cada par (patrón, inicio) se traduce una sola vez a sus tramos
+    (día, franja_ini, franja_fin); por clave y día se guarda cuántas clases
+    cubren cada franja y cuántas han empezado hasta ella, así el número de
+    clases que cruzan un tramo sale de tres lecturas en vez de recorrer listas.
+    En los salones mega se llevan además los asientos ocupados por secciones
+    fusionables y la cobertura de las que no lo son.
+    """
+    def __init__(self, bloques, claves, capacidad_fusion=None):
+        self.origen = min(bloques)
+        dur_max = max(int(c * 50) for p in CATALOGO_PATRONES for c in p['days'].values())
+        self.n_franjas = (max(bloques) + dur_max - self.origen) // MINUTOS_FRANJA + 1
+        self._tramos = {(pid, ini): self._calcular_tramos(p, ini)
+                        for pid, p in enumerate(CATALOGO_PATRONES) for ini in bloques}
+
+        # Los mismos tramos en arreglos (patrón, bloque, día del patrón) para evaluar en lote
+        self.bloques = np.array(sorted(set(bloques)), dtype=np.int32)
+        forma = (len(CATALOGO_PATRONES), len(self.bloques), len(DIAS_SEMANA))
+        self.tramo_d = np.zeros(forma, dtype=np.int32)
+        self.tramo_a = np.zeros(forma, dtype=np.int32)
+        self.tramo_b = np.ones(forma, dtype=np.int32)
+        self.tramo_ok = np.zeros(forma, dtype=bool)
+        for pid in range(len(CATALOGO_PATRONES)):
+            for j, ini in enumerate(self.bloques.tolist()):
+                for n, (d, a, b) in enumerate(self.tramos(pid, ini)):
+                    self.tramo_d[pid, j, n], self.tramo_a[pid, j, n], self.tramo_b[pid, j, n] = d, a, b
+                    self.tramo_ok[pid, j, n] = True
+
+        self.fila = {}
+        self.cubre = np.zeros((0, len(DIAS_SEMANA), self.n_franjas), dtype=np.int32)
+        self.acum = np.zeros_like(self.cubre)
+        self._agregar_filas(claves)
+        self.ocupantes = {}
+
+        self.capacidad_fusion = dict(capacidad_fusion or {})
+        self.asientos = {c: np.zeros((len(DIAS_SEMANA), self.n_franjas), dtype=np.int32) for c in self.capacidad_fusion}
+        self.exclusivos = {c: np.zeros((len(DIAS_SEMANA), self.n_franjas), dtype=np.int32) for c in self.capacidad_fusion}
+
+    def _calcular_tramos(self, patron, ini):
+        tramos = []
+        for dia, contrib in patron['days'].items():
+            a = (ini - self.origen) // MINUTOS_FRANJA
+            b = (ini + int(contrib * 50) - self.origen) // MINUTOS_FRANJA
+            tramos.append((DIAS_SEMANA.index(dia), a, b))
+        return tuple(tramos)
+
+    def tramos(self, pid, ini):
+        t = self._tramos.get((pid, ini))
+        if t is None:
+            t = self._tramos[(pid, ini)] = self._calcular_tramos(CATALOGO_PATRONES[pid], ini)
+        return t
+
+    def _agregar_filas(self, claves):
+        nuevas = [c for c in dict.fromkeys(claves) if c not in self.fila]
+        if not nuevas: return
+        for c in nuevas:
+            self.fila[c] = len(self.fila)
+        extra = np.zeros((len(nuevas),) + self.cubre.shape[1:], dtype=np.int32)
+        self.cubre = np.concatenate([self.cubre, extra])
+        self.acum = np.concatenate([self.acum, extra])
+
+    def contar(self, clave, d, a, b):
+        """Número de clases de `clave` que se cruzan con [a, b) el día d."""
+        k = self.fila.get(clave)
+        if k is None: return 0
+        # Cubren la franja a, o empiezan estrictamente dentro de (a, b)
+        return int(self.cubre[k, d, a] + self.acum[k, d, b - 1] - self.acum[k, d, a])
+
+    def contar_lote(self, filas, d, a, b):
+        """Versión en lote de `contar`: filas (K,), tramos (K, días). Las filas < 0 cuentan 0."""
+        k = np.maximum(filas, 0)[:, None]
+        n = self.cubre[k, d, a] + self.acum[k, d, b - 1] - self.acum[k, d, a]
+        return np.where((filas >= 0)[:, None], n, 0)
+
+    def cabe_fusion(self, clave, d, a, b, cupo):
+        """En un salón mega: ninguna clase exclusiva y asientos suficientes en [a, b)."""
+        return (not self.exclusivos[clave][d, a:b].any()
+                and int(self.asientos[clave][d, a:b].max()) + cupo <= self.capacidad_fusion[clave])
+
+    def agregar(self, clave, i, tramos, cupo=0, fusionable=False, signo=1):
+        if clave not in self.fila: self._agregar_filas([clave])
+        k = self.fila[clave]
+        for d, a, b in tramos:
+            self.cubre[k, d, a:b] += signo
+            self.acum[k, d, a:] += signo
+            ocupantes = self.ocupantes.setdefault((clave, d), {})
+            if signo > 0: ocupantes[i] = (a, b, cupo, fusionable)
+            else: del ocupantes[i]
+            if clave in self.capacidad_fusion:
+                if fusionable: self.asientos[clave][d, a:b] += signo * cupo
+                else: self.exclusivos[clave][d, a:b] += signo
+
+    def quitar(self, clave, i, tramos, cupo=0, fusionable=False):
+        self.agregar(clave, i, tramos, cupo, fusionable, signo=-1)
+
+class EvaluadorIncremental:
+    """
+    Mantiene el costo de una solución entre movimientos: ocupación de
+    profesores y salones (ver `IndiceOcupacion`), carga acumulada por profesor
+    y el costo propio de cada sección. Un movimiento se puntúa calculando solo
+    el delta de la sección que cambia; `mover` lo confirma. Las entradas None
+    de `sol` se consideran secciones aún sin colocar.
+
+    También lleva al día quién está en falta: cuántos cruces tiene cada
+    sección (`n_cruces`), el conjunto de secciones activas con alguna
+    violación dura (`conflictivas`) y los profesores fuera de rango de carga
+    (`profes_fuera`).
+    """
+    def __init__(self, scheduler, sol):
+        self.sch = scheduler
+        scheduler.metricas.contar('evaluaciones_completas')
+        n = len(sol)
+        self.secs = [a['seccion'] if a else scheduler.secciones[i] for i, a in enumerate(sol)]
+        self.prof = ["TBA"] * n
+        self.salon = ["TBA"] * n
+        self.pid = [None] * n
+        self.ini = [None] * n
+
+        self.ind_prof = IndiceOcupacion(scheduler.bloques, list(scheduler.profesores))
+        capacidad_mega = {c: scheduler.info_salon[c]['CAPACIDAD'] for c in scheduler.mega_salones}
+        self.ind_salon = IndiceOcupacion(scheduler.bloques, list(scheduler.info_salon), capacidad_mega)
+        self.carga = {p: 0.0 for p in scheduler.profesores}
+        self.carga["GRADUADOS"] = 0.0
+        self.carga["TBA"] = 0.0
+
+        self._preparar_lote()
+
+        # Todas las secciones parten sin colocar; colocarlas en orden cuenta cada cruce una vez
+        self.propio = [10000] * n
+        self.costo = 10000 * n
+        self.n_cruces = [0] * n
+        self.conflictivas = ConjuntoIndexado()
+        self.profes_fuera = set()
+        for p in scheduler.profesores:
+            self.costo += self._violaciones_carga(p, 0.0) * 10000
+            if self._violaciones_carga(p, 0.0): self.profes_fuera.add(p)
+        for i, a in enumerate(sol):
+            if a: self.mover(i, a['profesor'], a['salon'], a['patron'], a['ini'])
+
+    @staticmethod
+    def _activa(prof, salon):
+        return prof != "TBA" and salon != "TBA"
+
+    def _costo_propio(self, i, prof, salon, pid, ini):
+        """Costo que depende solo de la asignación de la sección i."""
+        if not self._activa(prof, salon):
+            return 10000
+        return self.costo_salon(i, salon) + self.costo_horario(i, prof, pid, ini)
+
+    def costo_salon(self, i, salon):
+        """Capacidad y tipo del salón para la sección i."""
+        sch = self.sch
+        s = self.secs[i]
+        costo = 0
+        salon_info = sch.info_salon.get(salon)
+        if salon_info and salon_info['CAPACIDAD'] < s.cupo: costo += 10000
+        if salon_info and not (salon in sch.mega_salones and s.es_fusionable) and salon_info['TIPO'] != s.tipo_salon:
+            costo += 10000
+        return costo
+
+    def costo_salon_lote(self, i, filas):
+        """`costo_salon` de la sección i para varios salones, dados por sus filas en `ind_salon`."""
+        s = self.secs[i]
+        exento_tipo = self._mega_salon[filas] & s.es_fusionable
+        return (np.where(self._cap_salon[filas] < s.cupo, 10000, 0)
+                + np.where(~exento_tipo & (self._tipo_salon[filas] != s.tipo_salon), 10000, 0))
+
+    def costo_horario(self, i, prof, pid, ini):
+        """Reglas de intensivos, preferencias y ventanas de tiempo para la sección i."""
+        sch = self.sch
+        s = self.secs[i]
+        patron = CATALOGO_PATRONES[pid]
+        costo = 0
+
+        if prof != "GRADUADOS" and prof in sch.profesores:
+            prof_obj = sch.profesores[prof]
+            intensivo = es_intensivo(patron)
+            if prof_obj.cursos_intensivos == 0 and intensivo:
+                costo += 10000
+            elif prof_obj.cursos_intensivos == 1 and admite_intensivo(s.creditos) and not intensivo:
+                costo += 10000
+
+            if prof_obj.pref_horas == 'AM' and ini >= 720: costo += 30
+            elif prof_obj.pref_horas == 'PM' and ini < 720: costo += 30
+
+            if prof_obj.pref_dias:
+                for dia in patron['days'].keys():
+                    dia_letra = 'W' if dia == 'Mi' else dia[0]
+                    if dia_letra not in prof_obj.pref_dias:
+                        costo += 15
+
+        for dia, contrib in patron['days'].items():
+            fin = ini + int(contrib * 50)
+            if dia in ["Ma", "Ju"] and max(ini, sch.hora_universal[0]) < min(fin, sch.hora_universal[1]): costo += 10000
+            if s.creditos == 3 and contrib >= 3 and ini < 930: costo += 10000
+            if fin > sch.limite_operativo[1] or ini < sch.limite_operativo[0]: costo += 10000
+        return costo
+
+    def _es_propia(self, indice, i, clave, d, a, b):
+        """1 si la ocupación confirmada de la sección i en (clave, d) se cruza con [a, b)."""
+        propia = indice.ocupantes.get((clave, d), {}).get(i)
+        return int(propia is not None and propia[0] < b and a < propia[1])
+
+    def cruces(self, i, prof, salon, pid, ini):
+        """Lista (día, cruces de profesor, cruces de salón) de la sección i contra las demás."""
+        if not self._activa(prof, salon):
+            return []
+        s = self.secs[i]
+        fusion = salon in self.ind_salon.capacidad_fusion and s.es_fusionable
+        resultado = []
+        for d, a, b in self.ind_salon.tramos(pid, ini):
+            n_prof = 0
+            if prof != "GRADUADOS":
+                n_prof = self.ind_prof.contar(prof, d, a, b) - self._es_propia(self.ind_prof, i, prof, d, a, b)
+            n_salon = self.ind_salon.contar(salon, d, a, b) - self._es_propia(self.ind_salon, i, salon, d, a, b)
+            if n_salon and fusion and not self.ind_salon.cabe_fusion(salon, d, a, b, s.cupo):
+                # Caso raro: se revisa par a par la regla de fusión de salones mega
+                n_salon = 0
+                cap = self.ind_salon.capacidad_fusion[salon]
+                for j, (a_j, b_j, cupo_j, fus_j) in self.ind_salon.ocupantes.get((salon, d), {}).items():
+                    if j != i and a_j < b and a < b_j and not (fus_j and s.cupo + cupo_j <= cap):
+                        n_salon += 1
+            elif n_salon and fusion:
+                n_salon = 0
+            if n_prof or n_salon:
+                resultado.append((DIAS_SEMANA[d], n_prof, n_salon))
+        return resultado
+
+    def pares(self, i, prof, salon, pid, ini):
+        """
+        Cruces de la sección i en esa asignación, uno por (sección, recurso,
+        día) como los cuenta `cruces`: lista de (j, es_salon, d).
+        """
+        if not self._activa(prof, salon):
+            return []
+        s = self.secs[i]
+        cap = self.ind_salon.capacidad_fusion.get(salon)
+        fusion = cap is not None and s.es_fusionable
+        resultado = []
+        for d, a, b in self.ind_salon.tramos(pid, ini):
+            if prof != "GRADUADOS" and self.ind_prof.contar(prof, d, a, b):
+                for j, (a_j, b_j, _, _) in self.ind_prof.ocupantes.get((prof, d), {}).items():
+                    if j != i and a_j < b and a < b_j: resultado.append((j, False, d))
+            if self.ind_salon.contar(salon, d, a, b):
+                for j, (a_j, b_j, cupo_j, fus_j) in self.ind_salon.ocupantes.get((salon, d), {}).items():
+                    if j != i and a_j < b and a < b_j and not (fusion and fus_j and s.cupo + cupo_j <= cap):
+                        resultado.append((j, True, d))
+        return resultado
+
+    def detalle_conflictos(self):
+        """Mensajes de auditoría de la solución actual, leídos del estado que se lleva al día."""
+        mensajes = []
+        inactivas = {i for i in range(len(self.secs)) if not self._activa(self.prof[i], self.salon[i])}
+        for i in sorted(inactivas | set(self.conflictivas)):
+            s, prof, salon = self.secs[i], self.prof[i], self.salon[i]
+            if prof == "TBA": mensajes.append(f"Sección {s.cod}: profesor TBA")
+            if salon == "TBA": mensajes.append(f"Sección {s.cod}: salón TBA")
+            if i in inactivas: continue
+            if self.propio[i] >= 10000:
+                mensajes += self._mensajes_propios(i)
+            # Cada cruce se reporta una vez, desde la sección de índice mayor
+            for j, es_salon, d in self.pares(i, prof, salon, self.pid[i], self.ini[i]):
+                if j < i:
+                    mensajes.append(f"Cruce de salón {salon} el {DIAS_SEMANA[d]}" if es_salon
+                                    else f"Cruce de profesor {prof} el {DIAS_SEMANA[d]}")
+        for prof in sorted(self.profes_fuera):
+            prof_obj, carga = self.sch.profesores[prof], self.carga[prof]
+            if carga > prof_obj.carga_max + 1.5:
+                mensajes.append(f"Profesor {prof} excede carga máxima ({carga} > {prof_obj.carga_max})")
+            if carga < prof_obj.carga_min - 1.5:
+                mensajes.append(f"Profesor {prof} no alcanza carga mínima ({carga} < {prof_obj.carga_min})")
+        return mensajes
+
+    def _mensajes_propios(self, i):
+        """Las violaciones duras de `costo_salon` y `costo_horario` de la sección i, en texto."""
+        sch = self.sch
+        s, prof, salon, ini = self.secs[i], self.prof[i], self.salon[i], self.ini[i]
+        patron = CATALOGO_PATRONES[self.pid[i]]
+        mensajes = []
+        salon_info = sch.info_salon.get(salon)
+        if salon_info and salon_info['CAPACIDAD'] < s.cupo:
+            mensajes.append(f"Sección {s.cod}: salón {salon} capacidad insuficiente")
+        if salon_info and not (salon in sch.mega_salones and s.es_fusionable) and salon_info['TIPO'] != s.tipo_salon:
+            mensajes.append(f"Sección {s.cod}: salón {salon} es tipo {salon_info['TIPO']} y la sección pide tipo {s.tipo_salon}")
+        if prof != "GRADUADOS" and prof in sch.profesores:
+            prof_obj = sch.profesores[prof]
+            intensivo = es_intensivo(patron)
+            if prof_obj.cursos_intensivos == 0 and intensivo:
+                mensajes.append(f"Sección {s.cod}: Prof {prof} tiene clase intensiva pero solicitó NO intensivos.")
+            elif prof_obj.cursos_intensivos == 1 and admite_intensivo(s.creditos) and not intensivo:
+                mensajes.append(f"Sección {s.cod}: Prof {prof} NO tiene clase intensiva pero solicitó SÍ intensivos.")
+        for dia, contrib in patron['days'].items():
+            fin = ini + int(contrib * 50)
+            if dia in ["Ma", "Ju"] and max(ini, sch.hora_universal[0]) < min(fin, sch.hora_universal[1]):
+                mensajes.append(f"Sección {s.cod}: violación de hora universal el {dia}")
+            if s.creditos == 3 and contrib >= 3 and ini < 930:
+                mensajes.append(f"Sección {s.cod}: bloque intensivo antes de las {mins_to_str(930)} el {dia}")
+            if fin > sch.limite_operativo[1] or ini < sch.limite_operativo[0]:
+                mensajes.append(f"Sección {s.cod}: fuera de la ventana operativa el {dia}")
+        return mensajes
+
+    def _actualizar_conflicto(self, i):
+        if self._activa(self.prof[i], self.salon[i]) and (self.propio[i] >= 10000 or self.n_cruces[i]):
+            self.conflictivas.agregar(i)
+        else:
+            self.conflictivas.quitar(i)
+
+    def _conflictos_pares(self, i, prof, salon, pid, ini):
+        return 10000 * sum(n_prof + n_salon for _, n_prof, n_salon in self.cruces(i, prof, salon, pid, ini))
+
+    def _violaciones_carga(self, prof, carga):
+        prof_obj = self.sch.profesores[prof]
+        return int(carga > prof_obj.carga_max + 1.5) + int(carga < prof_obj.carga_min - 1.5)
+
+    def _cambios_carga(self, i, prof_v, activa_v, prof_n, activa_n):
+        cambios = {}
+        if activa_v and prof_v in self.carga:
+            cambios[prof_v] = cambios.get(prof_v, 0.0) - self.sch.creditos_seccion(i, prof_v)
+        if activa_n and prof_n in self.carga:
+            cambios[prof_n] = cambios.get(prof_n, 0.0) + self.sch.creditos_seccion(i, prof_n)
+        return cambios
+
+    def _delta_carga(self, cambios):
+        delta = 0
+        for p, c in cambios.items():
+            if c != 0 and p in self.sch.profesores:
+                delta += (self._violaciones_carga(p, self.carga[p] + c) - self._violaciones_carga(p, self.carga[p])) * 10000
+        return delta
+
+    def _ocupar(self, i, prof, salon, pid, ini, signo=1):
+        if not self._activa(prof, salon):
+            return
+        s = self.secs[i]
+        tramos = self.ind_salon.tramos(pid, ini)
+        if prof != "GRADUADOS":
+            self.ind_prof.agregar(prof, i, tramos, signo=signo)
+        self.ind_salon.agregar(salon, i, tramos, s.cupo, s.es_fusionable, signo=signo)
+        if prof in self.carga:
+            self.carga[prof] += signo * self.sch.creditos_seccion(i, prof)
+
+    def _delta(self, i, prof, salon, pid, ini):
+        viejo = (self.prof[i], self.salon[i], self.pid[i], self.ini[i])
+        delta = self._costo_propio(i, prof, salon, pid, ini) - self.propio[i]
+        delta -= self._conflictos_pares(i, *viejo)
+        delta += self._conflictos_pares(i, prof, salon, pid, ini)
+        delta += self._delta_carga(self._cambios_carga(i, viejo[0], self._activa(viejo[0], viejo[1]),
+                                                       prof, self._activa(prof, salon)))
+        return delta
+
+    def delta(self, i, prof, salon, patron, ini):
+        """Cambio de costo si la sección i pasara a (prof, salon, patron, ini)."""
+        self.sch.metricas.contar('candidatos_evaluados')
+        return self._delta(i, prof, salon, id_patron(patron), ini)
+
+    def _preparar_lote(self):
+        """Tablas de costo por (patrón, bloque) y por salón que usa `deltas_lote`."""
+        sch = self.sch
+        ind = self.ind_salon
+        n_pat, n_blq = len(CATALOGO_PATRONES), len(ind.bloques)
+        self._horario = np.zeros((n_pat, n_blq), dtype=np.int64)
+        self._intensivo_temprano = np.zeros((n_pat, n_blq), dtype=np.int64)
+        for pid, patron in enumerate(CATALOGO_PATRONES):
+            for j, ini in enumerate(ind.bloques.tolist()):
+                for dia, contrib in patron['days'].items():
+                    fin = ini + int(contrib * 50)
+                    if dia in ["Ma", "Ju"] and max(ini, sch.hora_universal[0]) < min(fin, sch.hora_universal[1]): self._horario[pid, j] += 10000
+                    if fin > sch.limite_operativo[1] or ini < sch.limite_operativo[0]: self._horario[pid, j] += 10000
+                    if contrib >= 3 and ini < 930: self._intensivo_temprano[pid, j] += 10000
+        self._patron_intensivo = np.array([es_intensivo(p) for p in CATALOGO_PATRONES])
+        self._costo_dias = {}
+
+        filas = sorted(ind.fila.items(), key=lambda kv: kv[1])
+        self._cap_salon = np.array([sch.info_salon[c]['CAPACIDAD'] if c in sch.info_salon else 0 for c, _ in filas], dtype=np.int64)
+        self._tipo_salon = np.array([sch.info_salon[c]['TIPO'] if c in sch.info_salon else 0 for c, _ in filas], dtype=np.int64)
+        self._mega_salon = np.array([c in ind.capacidad_fusion for c, _ in filas], dtype=bool)
+
+    def _dias_no_preferidos(self, prof_obj):
+        """15 por cada día del patrón fuera de PREF_DIAS, para todo el catálogo."""
+        if prof_obj.nombre not in self._costo_dias:
+            self._costo_dias[prof_obj.nombre] = np.array([
+                15 * sum(1 for dia in p['days'] if ('W' if dia == 'Mi' else dia[0]) not in prof_obj.pref_dias)
+                for p in CATALOGO_PATRONES], dtype=np.int64)
+        return self._costo_dias[prof_obj.nombre]
+
+    def deltas_lote(self, i, prof, salones, pids, inis):
+        """
+        Deltas de costo de K candidatos (salones[k], pids[k], inis[k]) para la
+        sección i con el profesor `prof`, calculados a la vez sobre los
+        arreglos de ocupación. Equivale a llamar `delta` K veces; los casos de
+        fusión en salones mega se resuelven con la ruta exacta escalar.
+        """
+        sch = self.sch
+        ind = self.ind_salon
+        s = self.secs[i]
+        pids = np.asarray(pids, dtype=np.int64)
+        inis = np.asarray(inis, dtype=np.int64)
+        sch.metricas.contar('candidatos_evaluados', len(inis))
+        blq = np.searchsorted(ind.bloques, inis)
+        filas = np.array([ind.fila.get(sl, -1) for sl in salones], dtype=np.int64)
+        tba = np.array([sl == "TBA" for sl in salones], dtype=bool)
+        activo = ~tba & (prof != "TBA")
+
+        # Costo propio
+        propio = self._horario[pids, blq].copy()
+        if s.creditos == 3: propio += self._intensivo_temprano[pids, blq]
+        conocido = np.array([sl in sch.info_salon for sl in salones], dtype=bool)
+        f = np.where(conocido, filas, 0)
+        propio += np.where(conocido & (self._cap_salon[f] < s.cupo), 10000, 0)
+        exento_tipo = self._mega_salon[f] & s.es_fusionable
+        propio += np.where(conocido & ~exento_tipo & (self._tipo_salon[f] != s.tipo_salon), 10000, 0)
+        if prof != "GRADUADOS" and prof in sch.profesores:
+            prof_obj = sch.profesores[prof]
+            intensivo = self._patron_intensivo[pids]
+            if prof_obj.cursos_intensivos == 0: propio += np.where(intensivo, 10000, 0)
+            elif prof_obj.cursos_intensivos == 1 and admite_intensivo(s.creditos): propio += np.where(intensivo, 0, 10000)
+            if prof_obj.pref_horas == 'AM': propio += np.where(inis >= 720, 30, 0)
+            elif prof_obj.pref_horas == 'PM': propio += np.where(inis < 720, 30, 0)
+            if prof_obj.pref_dias: propio += self._dias_no_preferidos(prof_obj)[pids]
+        propio = np.where(activo, propio, 10000)
+
+        # Cruces del estado nuevo contra las demás secciones, descontando la ocupación propia
+        d, a, b = ind.tramo_d[pids, blq], ind.tramo_a[pids, blq], ind.tramo_b[pids, blq]
+        ok = ind.tramo_ok[pids, blq]
+        cruces = np.zeros(d.shape, dtype=np.int64)
+        viejo = (self.prof[i], self.salon[i], self.pid[i], self.ini[i])
+        propias = self._activa(viejo[0], viejo[1])
+        tramos_viejos = ind.tramos(viejo[2], viejo[3]) if propias else ()
+        if prof != "GRADUADOS" and prof != "TBA":
+            fila_prof = self.ind_prof.fila.get(prof, -1)
+            cruces += self.ind_prof.contar_lote(np.full(len(pids), fila_prof), d, a, b)
+            if propias and viejo[0] == prof:
+                for d_v, a_v, b_v in tramos_viejos:
+                    cruces -= (d == d_v) & (a < b_v) & (a_v < b)
+        cruces += ind.contar_lote(filas, d, a, b)
+        if propias:
+            mismo = (np.array([sl == viejo[1] for sl in salones], dtype=bool))[:, None]
+            for d_v, a_v, b_v in tramos_viejos:
+                cruces -= mismo & (d == d_v) & (a < b_v) & (a_v < b)
+        pares = 10000 * np.where(ok & activo[:, None], cruces, 0).sum(axis=1)
+
+        carga_activa = self._delta_carga(self._cambios_carga(i, viejo[0], propias, prof, prof != "TBA"))
+        carga_inactiva = self._delta_carga(self._cambios_carga(i, viejo[0], propias, prof, False))
+        deltas = (propio - self.propio[i] - self._conflictos_pares(i, *viejo) + pares
+                  + np.where(activo, carga_activa, carga_inactiva))
+
+        # Fusión en salones mega o salones desconocidos: ruta exacta
+        if s.es_fusionable or not (conocido | tba).all():
+            for k in np.flatnonzero((conocido & self._mega_salon[f] & s.es_fusionable) | ~(conocido | tba)):
+                deltas[k] = self._delta(i, prof, salones[k], int(pids[k]), int(inis[k]))
+        return deltas
+
+    def mover(self, i, prof, salon, patron, ini):
+        """Confirma el movimiento de la sección i y devuelve su estado anterior."""
+        pid = id_patron(patron)
+        viejo = (self.prof[i], self.salon[i], self.pid[i], self.ini[i])
+        # Mismo delta que `_delta`, pero con los pares a mano para llevar los cruces por sección
+        pares_viejos = self.pares(i, *viejo)
+        pares_nuevos = self.pares(i, prof, salon, pid, ini)
+        propio = self._costo_propio(i, prof, salon, pid, ini)
+        cambios = self._cambios_carga(i, viejo[0], self._activa(viejo[0], viejo[1]), prof, self._activa(prof, salon))
+        self.costo += (propio - self.propio[i] + 10000 * (len(pares_nuevos) - len(pares_viejos))
+                       + self._delta_carga(cambios))
+
+        self._ocupar(i, *viejo, signo=-1)
+        self.prof[i], self.salon[i], self.pid[i], self.ini[i] = prof, salon, pid, ini
+        self.propio[i] = propio
+        self._ocupar(i, prof, salon, pid, ini)
+
+        for j, _, _ in pares_viejos: self.n_cruces[j] -= 1
+        for j, _, _ in pares_nuevos: self.n_cruces[j] += 1
+        self.n_cruces[i] = len(pares_nuevos)
+        for j in {j for j, _, _ in pares_viejos + pares_nuevos} | {i}:
+            self._actualizar_conflicto(j)
+        for p in cambios:
+            if p in self.sch.profesores and self._violaciones_carga(p, self.carga[p]): self.profes_fuera.add(p)
+            else: self.profes_fuera.discard(p)
+        viejo_patron = CATALOGO_PATRONES[viejo[2]] if viejo[2] is not None else None
+        return (viejo[0], viejo[1], viejo_patron, viejo[3])
@@ -0,0 +1,95 @@
+"""Contadores, cronómetros y perfilado opcional de una corrida del motor."""
+import cProfile
+import io
+import pstats
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+class Metricas:
+    """
+    Instrumentación liviana de un TabuScheduler: segundos por etapa,
+    contadores de eventos y la mejor solución en el tiempo. Los contadores
+    son enteros en un diccionario, así que cuestan lo mismo con cualquier
+    núcleo de evaluación.
+    """
+    def __init__(self):
+        self.inicio = self._marca = time.perf_counter()
+        self.tiempos = {}
+        self.contadores = {}
+        self.mejoras = []  # (segundos desde el inicio, mejor costo)
+
+    @contextmanager
+    def cronometro(self, etapa):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.tiempos[etapa] = self.tiempos.get(etapa, 0.0) + time.perf_counter() - inicio
+
+    def cerrar(self, etapa):
+        """Acumula en `etapa` el tiempo desde la etapa cerrada anterior (para etapas seguidas, sin bloque `with`)."""
+        ahora = time.perf_counter()
+        self.tiempos[etapa] = self.tiempos.get(etapa, 0.0) + ahora - self._marca
+        self._marca = ahora
+
+    def contar(self, nombre, n=1):
+        self.contadores[nombre] = self.contadores.get(nombre, 0) + n
+
+    def sumar(self, contadores):
+        """Agrega contadores de otra corrida, p. ej. los de un proceso trabajador."""
+        for nombre, n in contadores.items():
+            self.contar(nombre, n)
+
+    def desde(self, previos):
+        """Contadores acumulados desde la foto `previos` (un dict(self.contadores) anterior)."""
+        return {nombre: n - previos.get(nombre, 0) for nombre, n in self.contadores.items() if n != previos.get(nombre, 0)}
+
+    def mejora(self, costo):
+        if not self.mejoras or costo < self.mejoras[-1][1]:
+            self.mejoras.append((round(time.perf_counter() - self.inicio, 4), float(costo)))
+
+    def reporte(self):
+        """Resumen apto para JSON, con las tasas derivadas de la búsqueda."""
+        c, busqueda = self.contadores, self.tiempos.get('busqueda', 0.0)
+        iteraciones = c.get('iteraciones', 0)
+        return {
+            'tiempos': {etapa: round(s, 4) for etapa, s in self.tiempos.items()},
+            'contadores': dict(c),
+            'iteraciones_s': round(iteraciones / busqueda, 1) if busqueda else None,
+            'candidatos_evaluados_s': round(c.get('candidatos_evaluados', 0) / busqueda, 1) if busqueda else None,
+            'tasa_aceptacion': round(c.get('aceptados', 0) / iteraciones, 4) if iteraciones else None,
+            'mejoras': [list(m) for m in self.mejoras],
+        }
+
+def cronometrado(etapa):
+    """Decorador de métodos del motor: acumula su duración en `self.metricas` bajo `etapa`."""
+    def decorador(metodo):
+        @wraps(metodo)
+        def envoltura(self, *args, **kwargs):
+            with self.metricas.cronometro(etapa):
+                return metodo(self, *args, **kwargs)
+        return envoltura
+    return decorador
+
+@contextmanager
+def perfil(ruta=None, lineas=25):
+    """
+    Perfila el bloque con cProfile. Entrega un diccionario que al salir trae
+    en 'resumen' las `lineas` funciones de mayor tiempo acumulado; con `ruta`
+    además guarda las estadísticas completas (.prof, para pstats o snakeviz).
+    Para muestrear sin instrumentar, la línea de comandos se puede correr bajo
+    `py-spy record -- python -m horarios ...`.
+    """
+    perfilador = cProfile.Profile()
+    resultado = {}
+    perfilador.enable()
+    try:
+        yield resultado
+    finally:
+        perfilador.disable()
+        if ruta:
+            perfilador.dump_stats(ruta)
+        texto = io.StringIO()
+        pstats.Stats(perfilador, stream=texto).sort_stats('cumulative').print_stats(lineas)
+        resultado['resumen'] = texto.getvalue()
@@ -0,0 +1,114 @@
+"""Modelo de datos: secciones, profesores y la representación compacta de una solución."""
+import numpy as np
+import pandas as pd
+
+from .utilidades import CATALOGO_PATRONES, id_patron
+
+# ==============================================================================
+# MODELO DE DATOS
+# ==============================================================================
+class Seccion:
+    def __init__(self, cod, creditos, cupo, candidatos_raw, tipo_salon, es_ayudantia=False):
+        self.cod = str(cod)
+        self.creditos = int(creditos)
+        self.cupo = int(cupo)
+        
+        if isinstance(candidatos_raw, list):
+            raw_list = [c.strip().upper() for c in candidatos_raw if c.strip()]
+        else:
+            raw_list = [c.strip().upper() for c in str(candidatos_raw).split(',') if c.strip() and str(c).upper() != 'NAN']
+        # Ordenados: el orden de un set cambia con PYTHONHASHSEED y con él las elecciones al azar
+        self.cands = sorted(set(raw_list))
+        
+        try:
+            self.tipo_salon = int(float(str(tipo_salon)))
+        except:
+            self.tipo_salon = 1
+            
+        self.es_ayudantia = es_ayudantia
+        base = self.cod.split('-')[0].upper().replace(" ", "")
+        self.es_fusionable = base in ["MATE3171", "MATE3172", "MATE3173"]
+        self.prof_preasignado = None  
+
+class Profesor:
+    def __init__(self, nombre, carga_min, carga_max, pref_dias, pref_horas,
+                 bloqueo_dias, bloqueo_ini, bloqueo_fin,
+                 preferencias_cursos, compensacion, acepta_grandes, cursos_intensivos=0):
+        self.nombre = nombre.upper().strip()
+        self.carga_min = float(carga_min) if pd.notnull(carga_min) and carga_min != '' else 0.0
+        self.carga_max = float(carga_max) if pd.notnull(carga_max) and carga_max != '' else 12.0
+        self.pref_dias = pref_dias if isinstance(pref_dias, str) else ''
+        self.pref_horas = pref_horas if isinstance(pref_horas, str) else 'ANY'
+        
+        self.preferencias = []
+        if isinstance(preferencias_cursos, list):
+            self.preferencias = [c.upper().strip() for c in preferencias_cursos if c and str(c).upper() != 'NAN']
+            
+        self.compensacion = str(compensacion).upper().strip() in ('SI', 'SÍ', 'YES', '1')
+        self.acepta_grandes = int(acepta_grandes) if pd.notnull(acepta_grandes) and acepta_grandes != '' else 0
+        
+        try:
+            self.cursos_intensivos = int(cursos_intensivos)
+        except:
+            self.cursos_intensivos = 0
+
+    def prioridad_curso(self, curso_cod):
+        for idx, pref in enumerate(self.preferencias):
+            if pref in curso_cod:
+                return 1.0 / (idx + 1)
+        return 0.0
+
+class TablaIds:
+    """Traducción nombre <-> id entero; los nombres nuevos se agregan al final."""
+    def __init__(self, nombres=()):
+        self.nombres = []
+        self.ids = {}
+        for nombre in nombres:
+            self.id(nombre)
+
+    def id(self, nombre):
+        if nombre not in self.ids:
+            self.ids[nombre] = len(self.nombres)
+            self.nombres.append(nombre)
+        return self.ids[nombre]
+
+    def __getitem__(self, i):
+        return self.nombres[i]
+
+    def __len__(self):
+        return len(self.nombres)
+
+class SolucionArreglos:
+    """
+    Solución como estructura de arreglos: por sección, un entero para el
+    profesor, el salón, el patrón (índice en CATALOGO_PATRONES) y el bloque de
+    inicio. Los nombres se recuperan con las tablas de ids. Ocupa una fracción
+    de la lista de diccionarios y permite evaluar costos sobre arreglos.
+    """
+    def __init__(self, secciones, profes, salones, prof, salon, patron, ini):
+        self.secciones = secciones
+        self.profes = profes
+        self.salones = salones
+        self.prof = np.asarray(prof, dtype=np.int32)
+        self.salon = np.asarray(salon, dtype=np.int32)
+        self.patron = np.asarray(patron, dtype=np.int32)
+        self.ini = np.asarray(ini, dtype=np.int32)
+
+    @classmethod
+    def desde_asignaciones(cls, sol, profes, salones):
+        return cls([a['seccion'] for a in sol], profes, salones,
+                   [profes.id(a['profesor']) for a in sol], [salones.id(a['salon']) for a in sol],
+                   [id_patron(a['patron']) for a in sol], [a['ini'] for a in sol])
+
+    def a_asignaciones(self):
+        return [{'seccion': s, 'profesor': self.profes[p], 'salon': self.salones[sl],
+                 'patron': CATALOGO_PATRONES[pid], 'ini': int(ini)}
+                for s, p, sl, pid, ini in zip(self.secciones, self.prof.tolist(), self.salon.tolist(),
+                                              self.patron.tolist(), self.ini)]
+
+    def copia(self):
+        return SolucionArreglos(self.secciones, self.profes, self.salones,
+                                self.prof.copy(), self.salon.copy(), self.patron.copy(), self.ini.copy())
+
+    def __len__(self):
+        return len(self.secciones)
@@ -0,0 +1,1254 @@
+"""Motor de optimización: construcción voraz, recocido con memoria tabú y los motores alternativos."""
+import logging
+import math
+import os
+import queue
+import random
+import time
+import multiprocessing as mp
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from ortools.sat.python import cp_model
+from ortools.graph.python import min_cost_flow
+
+from .utilidades import CATALOGO_PATRONES, PATRONES, get_creditos_reales, id_patron
+from .modelo import Profesor, Seccion, SolucionArreglos, TablaIds
+from .evaluacion import DIAS_SEMANA, EvaluadorIncremental, IndiceOcupacion, admite_intensivo, es_intensivo
+from .cpsat import ModeloCPSAT
+from .entrada import expandir_secciones, normalizar_profesores, normalizar_salones
+from .metricas import Metricas, cronometrado
+from .paralelo import _ejecutar_isla, _ejecutar_replica, _iniciar_proceso, reparto_cpu
+
+log = logging.getLogger(__name__)
+
+# El modelo completo de CP-SAT solo rinde con el portafolio de búsqueda en paralelo. En un núcleo
+# y 15 s, con 100 secciones terminó en 11770 contra 10060 del recocido, y con 300 no mejoró la
+# construcción inicial (no se midió con 2 a 7 hilos). Con menos hilos que estos, resolver_cpsat
+# usa el recocido solo si se pide el respaldo
+MIN_HILOS_CPSAT = 8
+# Segundos por defecto de la preasignación exacta (las dos pasadas de CP-SAT)
+TIEMPO_PREASIGNACION = 2.0
+# Tamaño de los bloques (inicios × salones) en que la construcción voraz busca lugar para una sección
+BLOQUE_INICIOS = 8
+BLOQUE_SALONES = 64
+
+# ==============================================================================
+# MOTOR DE OPTIMIZACIÓN EVOLUTIVA
+# ==============================================================================
+class TabuScheduler:
+    def __init__(self, df_cursos, df_profes, df_salones, zona, preasignacion="recocido",
+                 tiempo_preasignacion=TIEMPO_PREASIGNACION):
+        self.zona = zona
+        # Segundos por etapa, contadores y mejor costo en el tiempo (ver Metricas)
+        self.metricas = Metricas()
+        # Entradas ya leídas, para que los procesos de islas construyan su propio scheduler
+        self.datos_entrada = (df_cursos, df_profes, df_salones, zona, preasignacion, tiempo_preasignacion)
+        # Señal de parada externa (un threading.Event o similar): todos los motores la revisan y
+        # terminan con la mejor solución hallada, así un trabajo en segundo plano se puede detener
+        self.detener = None
+        self.motivo_parada = None
+        # Si resolver_cpsat corrió el recocido de respaldo en lugar de CP-SAT
+        self.respaldo_recocido = False
+        # Segundos de CPU de toda la corrida (los fija la cola de trabajos); islas y templado
+        # los reparten entre sus procesos
+        self.limite_cpu = None
+        # Última temperatura del recocido (None si aún no corrió): de aquí sigue una reanudación
+        self.temperatura = None
+        # Secciones tomadas de una solución anterior con `sembrar` (arranque en caliente)
+        self.sembradas = 0
+        
+        # 1. Procesar Salones
+        df_salones = normalizar_salones(df_salones)
+        self.salones = df_salones[['CODIGO', 'CAPACIDAD', 'TIPO']].to_dict('records')
+        self.info_salon = {}
+        for sl in self.salones:
+            self.info_salon.setdefault(sl['CODIGO'], sl)
+        self.mega_salones = set(df_salones['CODIGO'][df_salones['MEGA']])
+
+        # Cubetas de salones por TIPO (y una general, clave None) ordenadas por capacidad
+        self._cubetas_salon = {}
+        for sl in sorted(self.salones, key=lambda sl: sl['CAPACIDAD']):
+            for tipo in (sl['TIPO'], None):
+                caps, codigos = self._cubetas_salon.setdefault(tipo, ([], []))
+                caps.append(sl['CAPACIDAD'])
+                codigos.append(sl['CODIGO'])
+        self._aptos = {}
+        self._aptos_filas = {}
+
+        # 2. Procesar Profesores
+        self.profesores = {}
+        if df_profes is not None and not df_profes.empty:
+            df_profes = normalizar_profesores(df_profes)
+            for nombre, carga_min, carga_max, pref_dias, pref_horas, prefs, compensacion, acepta_grandes, intensivos in zip(
+                    df_profes['NOMBRE'], df_profes['CARGA_MIN'], df_profes['CARGA_MAX'], df_profes['PREF_DIAS'],
+                    df_profes['PREF_HORAS'], df_profes['PREFS'], df_profes['COMPENSACION'],
+                    df_profes['ACEPTA_GRANDES'], df_profes['CURSOS_INTENSIVOS']):
+                prof = Profesor(
+                    nombre=nombre, carga_min=carga_min, carga_max=carga_max,
+                    pref_dias=pref_dias, pref_horas=pref_horas,
+                    bloqueo_dias='', bloqueo_ini='', bloqueo_fin='',
+                    preferencias_cursos=prefs, compensacion=compensacion,
+                    acepta_grandes=acepta_grandes, cursos_intensivos=intensivos
+                )
+                self.profesores[prof.nombre] = prof
+
+        # 3. Procesar Cursos y Secciones (la demanda de cada curso repartida en secciones)
+        compensan = [p for p, obj in self.profesores.items() if obj.compensacion]
+        df_secciones = expandir_secciones(df_cursos, compensan)
+        self.secciones = [Seccion(cod, creditos, cupo, candidatos, tipo) for cod, creditos, cupo, candidatos, tipo in zip(
+            df_secciones['CODIGO'], df_secciones['CREDITOS'].tolist(), df_secciones['CUPO'].tolist(),
+            df_secciones['CANDIDATOS'], df_secciones['TIPO_SALON'].tolist())]
+
+        # Tablas de ids para la representación en arreglos (SolucionArreglos)
+        self.ids_profes = TablaIds(list(self.profesores) + ["GRADUADOS", "TBA"])
+        self.ids_salones = TablaIds(list(self.info_salon) + ["TBA"])
+        self.creditos_sec_prof = self._matriz_creditos()
+        self.metricas.cerrar('lectura')
+
+        # La exacta parte de la del recocido y solo la reemplaza si no deja más profesores fuera de rango
+        self._preasignar_profesores_robusto()
+        if preasignacion == "exacta":
+            self._preasignar_profesores_exacto(tiempo_preasignacion)
+        self.metricas.cerrar('preasignacion')
+
+        self.bloques = list(range(420, 1171, 30))
+        if zona == "CENTRAL":
+            self.hora_universal = (630, 750)
+            self.limite_operativo = (450, 1170)
+        else:
+            self.hora_universal = (600, 720)
+            self.limite_operativo = (420, 1140)
+
+        self._bloques = np.array(self.bloques)
+        self._rng = np.random.default_rng(random.getrandbits(32))
+        self._opciones = {}
+        self._inicios = {}
+
+        # Memoria tabú: hash de (sección, patrón, inicio, salón) -> iteración en que vence
+        self._iteracion = 0
+        self._tabu = {}
+        self.tenencia = (7, 15)
+        # Operadores de vecindario, elegidos por ruleta según mejora por candidato evaluado
+        self.operadores = {}
+        self._puntaje_op = {}
+        self._uso_op = {}
+        self.registrar_operador('reprogramar', self._op_reprogramar)
+        self.registrar_operador('intercambiar_horarios', self._op_intercambiar_horarios)
+        self.registrar_operador('intercambiar_profesores', self._op_intercambiar_profesores)
+        self.registrar_operador('cadena_kempe', self._op_cadena_kempe)
+        self.registrar_operador('intercambiar_salones', self._op_intercambiar_salones, usa_salones=True)
+
+        self.solucion = self._construir_solucion_greedy()
+        self.evaluador = EvaluadorIncremental(self, self.solucion)
+        self._registro = []
+        self._mejor_instantanea = None  # None: la solución actual es la mejor
+        self.mejor_solucion = self._instantanea().a_asignaciones()
+        self.mejor_costo = self.evaluador.costo
+        self.metricas.mejora(self.mejor_costo)
+        self.metricas.cerrar('construccion')
+        # Los salones del greedy (y de sus colocaciones al azar) se rehacen con profesores y horarios ya fijos
+        self.asignar_salones()
+        self.metricas.cerrar('salones_iniciales')
+        self.historial_costos = [self.mejor_costo]
+
+    def get_sec_creditos(self, s, prof_name):
+        if prof_name in self.profesores:
+            if self.profesores[prof_name].compensacion:
+                return get_creditos_reales(s.creditos, s.cupo)
+        return float(s.creditos)
+
+    def _matriz_creditos(self):
+        """
+        Créditos de cada sección (filas) para cada profesor de `ids_profes`
+        (columnas), como `get_sec_creditos`: la tabla de compensación se
+        consulta una vez por sección, no en cada movimiento.
+        """
+        base = np.array([float(s.creditos) for s in self.secciones])
+        compensados = np.array([get_creditos_reales(s.creditos, s.cupo) for s in self.secciones])
+        compensa = np.array([p in self.profesores and bool(self.profesores[p].compensacion) for p in self.ids_profes.nombres])
+        return np.where(compensa[None, :], compensados[:, None], base[:, None])
+
+    def creditos_seccion(self, i, prof_name):
+        """Igual que get_sec_creditos pero por índice de sección, leyendo la matriz."""
+        return float(self.creditos_sec_prof[i, self.ids_profes.ids[prof_name]])
+
+    def _preasignar_profesores_robusto(self):
+        ids = self.ids_profes
+        creditos = self.creditos_sec_prof.tolist()
+        carga_actual = [0.0] * len(ids)
+        limites = [(self.profesores[p].carga_min, self.profesores[p].carga_max) if p in self.profesores else None
+                   for p in ids.nombres]
+        cands_validos = [[p for p in s.cands if p in self.profesores] for s in self.secciones]
+
+        for i, s in enumerate(self.secciones):
+            if cands_validos[i]:
+                s.prof_preasignado = random.choice(cands_validos[i])
+            elif "GRADUADOS" in s.cands:
+                s.prof_preasignado = "GRADUADOS"
+            else:
+                s.prof_preasignado = "TBA"
+            k = ids.ids[s.prof_preasignado]
+            carga_actual[k] += creditos[i][k]
+
+        def penalidad(k, c):
+            if limites[k] is None: return 0
+            carga_min, carga_max = limites[k]
+            if c < carga_min - 1.5: return (carga_min - c) * 10
+            if c > carga_max + 1.5: return (c - carga_max) * 10
+            return 0
+
+        # La penalidad se lleva al día: un movimiento solo cambia la de dos profesores
+        penalidad_actual = sum(penalidad(k, c) for k, c in enumerate(carga_actual))
+
+        T = 100.0
+        for _ in range(30000):
+            # Tolerancia: la suma incremental puede arrastrar redondeo si las cargas no son múltiplos de 0.5
+            if penalidad_actual < 1e-9: break
+            
+            i = random.randrange(len(self.secciones))
+            s = self.secciones[i]
+            prof_viejo = s.prof_preasignado
+            if prof_viejo not in self.profesores: continue
+            
+            cands = [p for p in cands_validos[i] if p != prof_viejo]
+            if not cands: continue
+            
+            nuevo_prof = random.choice(cands)
+            k_viejo, k_nuevo = ids.ids[prof_viejo], ids.ids[nuevo_prof]
+            carga_vieja = carga_actual[k_viejo] - creditos[i][k_viejo]
+            carga_nueva = carga_actual[k_nuevo] + creditos[i][k_nuevo]
+            delta = (penalidad(k_viejo, carga_vieja) - penalidad(k_viejo, carga_actual[k_viejo])
+                     + penalidad(k_nuevo, carga_nueva) - penalidad(k_nuevo, carga_actual[k_nuevo]))
+            
+            if delta < 0 or (T > 0.01 and random.random() < math.exp(-delta / T)):
+                penalidad_actual += delta
+                s.prof_preasignado = nuevo_prof
+                carga_actual[k_viejo], carga_actual[k_nuevo] = carga_vieja, carga_nueva
+            T *= 0.995
+
+    def _fuera_de_rango(self, asignacion):
+        """Profesores cuya carga con `asignacion` (un profesor por sección) cae fuera de [carga_min - 1.5, carga_max + 1.5]."""
+        ids = self.ids_profes
+        cargas = np.zeros(len(ids))
+        k = np.array([ids.ids[p] for p in asignacion], dtype=np.int64)
+        np.add.at(cargas, k, self.creditos_sec_prof[np.arange(len(k)), k])
+        return sum(1 for p, prof in self.profesores.items()
+                   if not prof.carga_min - 1.5 <= cargas[ids.ids[p]] <= prof.carga_max + 1.5)
+
+    def _preasignar_profesores_exacto(self, tiempo_limite=TIEMPO_PREASIGNACION):
+        """
+        Alternativa exacta a `_preasignar_profesores_robusto`, con CP-SAT y a
+        partir de lo que este dejó: cada sección con candidatos válidos toma
+        exactamente uno y la carga de cada profesor (créditos de compensación
+        incluidos, en medios créditos) debe quedar dentro de
+        [carga_min - 1.5, carga_max + 1.5], la misma tolerancia del evaluador.
+        En dos pasadas que se reparten `tiempo_limite`: primero se minimiza el
+        número de profesores fuera de rango y, con ese número como tope, se
+        maximiza `prioridad_curso`. Si el solver no encuentra solución, o la
+        suya deja más profesores fuera de rango que el recocido, se conserva la
+        del recocido. Devuelve si se tomó la exacta.
+        """
+        previa = [s.prof_preasignado for s in self.secciones]
+        fuera_previa = self._fuera_de_rango(previa)
+        m = cp_model.CpModel()
+        elegir = {}
+        carga = {p: [] for p in self.profesores}
+        prioridades = []
+        for i, s in enumerate(self.secciones):
+            cands = [p for p in dict.fromkeys(s.cands) if p in self.profesores]
+            if not cands: continue
+            for p in cands:
+                elegir[i, p] = m.NewBoolVar(f"x{i}_{p}")
+                m.AddHint(elegir[i, p], p == previa[i])
+                carga[p].append((int(round(2 * self.creditos_seccion(i, p))), elegir[i, p]))
+                prioridad = int(round(1000 * self.profesores[p].prioridad_curso(s.cod)))
+                if prioridad: prioridades.append(prioridad * elegir[i, p])
+            m.AddExactlyOne(elegir[i, p] for p in cands)
+
+        fuera = []
+        for p, terminos in carga.items():
+            prof = self.profesores[p]
+            f = m.NewBoolVar(f"fuera_{p}")
+            total = sum(c * v for c, v in terminos)
+            m.Add(total >= math.ceil(2 * (prof.carga_min - 1.5) - 1e-9)).OnlyEnforceIf(f.Not())
+            m.Add(total <= math.floor(2 * (prof.carga_max + 1.5) + 1e-9)).OnlyEnforceIf(f.Not())
+            fuera.append(f)
+
+        solver = cp_model.CpSolver()
+        solver.parameters.num_workers = os.cpu_count() or 1
+        inicio = time.perf_counter()
+        # 1. Mínimo de profesores fuera de rango
+        m.Minimize(sum(fuera))
+        solver.parameters.max_time_in_seconds = tiempo_limite / 2
+        estado = solver.Solve(m)
+        nueva = None
+        if estado in (cp_model.OPTIMAL, cp_model.FEASIBLE) and solver.ObjectiveValue() <= fuera_previa:
+            # 2. Prioridades, sin pasar de ese número y partiendo de la solución anterior
+            m.Add(sum(fuera) <= round(solver.ObjectiveValue()))
+            m.ClearHints()
+            for x in elegir.values():
+                m.AddHint(x, solver.BooleanValue(x))
+            m.Maximize(sum(prioridades))
+            solver.parameters.max_time_in_seconds = max(0.1, tiempo_limite - (time.perf_counter() - inicio))
+            estado = solver.Solve(m)
+            if estado in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                nueva = [next((p for p in dict.fromkeys(s.cands) if (i, p) in elegir and solver.BooleanValue(elegir[i, p])),
+                              previa[i]) for i, s in enumerate(self.secciones)]
+        fuera_nueva = None if nueva is None else self._fuera_de_rango(nueva)
+        if fuera_nueva is None or fuera_nueva > fuera_previa:
+            log.warning("Preasignación exacta (%s, %.1f s) %s: se conserva la del recocido, con %d profesores fuera de rango",
+                        solver.StatusName(estado), time.perf_counter() - inicio,
+                        "sin solución" if fuera_nueva is None else f"con {fuera_nueva} profesores fuera de rango",
+                        fuera_previa)
+            self.metricas.contar('respaldo_preasignacion')
+            return False
+        for s, prof in zip(self.secciones, nueva):
+            s.prof_preasignado = prof
+        return True
+
+    def _costo_total(self, sol):
+        self.metricas.contar('llamadas_costo_total')
+        return EvaluadorIncremental(self, sol).costo
+
+    def _obtener_conflictos(self, sol):
+        """Auditoría de una solución cualquiera; para la actual basta `evaluador.detalle_conflictos()`."""
+        return EvaluadorIncremental(self, sol).detalle_conflictos()
+
+    def _construir_solucion_greedy(self):
+        sol = [None] * len(self.secciones)
+        asignado = [False] * len(self.secciones)
+        ocupacion = EvaluadorIncremental(self, sol)
+        for i in self._orden_mas_restringido():
+            s = self.secciones[i]
+            prof = getattr(s, 'prof_preasignado', 'TBA')
+            exito = self._asignar_seccion(i, prof, sol, asignado, ocupacion)
+            if not exito:
+                sol[i] = self._crear_asignacion_temporal(s, prof=prof)
+                asignado[i] = True
+            a = sol[i]
+            ocupacion.mover(i, a['profesor'], a['salon'], a['patron'], a['ini'])
+        return sol
+
+    def _orden_mas_restringido(self):
+        """
+        Secciones de menos a más opciones (inicios válidos × salones aptos); a
+        igualdad, primero las de profesores con más secciones.
+        """
+        secciones_prof = {}
+        for s in self.secciones:
+            prof = getattr(s, 'prof_preasignado', 'TBA')
+            secciones_prof[prof] = secciones_prof.get(prof, 0) + 1
+
+        def clave(i):
+            s = self.secciones[i]
+            prof = getattr(s, 'prof_preasignado', 'TBA')
+            pids, _ = self._opciones_movimiento(s, prof)
+            n_inicios = sum(len(self._inicios_validos(pid, s.creditos)) for pid in pids)
+            n_salones = len(self._salones_aptos(s.tipo_salon, s.cupo) or self._salones_aptos(None, s.cupo))
+            return (n_inicios * n_salones, -secciones_prof[prof])
+        return sorted(range(len(self.secciones)), key=clave)
+
+    def _salones_aptos(self, tipo, cupo):
+        """Salones del TIPO dado (None: cualquiera) con capacidad suficiente, del más chico al más grande."""
+        clave = (tipo, cupo)
+        if clave not in self._aptos:
+            caps, codigos = self._cubetas_salon.get(tipo, ([], []))
+            self._aptos[clave] = codigos[bisect_left(caps, cupo):]
+        return self._aptos[clave]
+
+    def _inicios_validos(self, pid, creditos):
+        """Inicios que respetan ventana operativa, hora universal e intensivos en todos los días del patrón."""
+        clave = (pid, creditos)
+        if clave not in self._inicios:
+            inicios = [ini for ini in self.bloques if ini >= self.limite_operativo[0]]
+            for dia, contrib in CATALOGO_PATRONES[pid]['days'].items():
+                duracion = contrib * 50
+                inicios = [ini for ini in inicios if ini + duracion <= self.limite_operativo[1]]
+                if dia in ["Ma", "Ju"]:
+                    inicios = [ini for ini in inicios if not (max(ini, self.hora_universal[0]) < min(ini+duracion, self.hora_universal[1]))]
+                if creditos == 3 and contrib >= 3:
+                    inicios = [ini for ini in inicios if ini >= 930]
+            self._inicios[clave] = np.array(inicios, dtype=np.int32)
+        return self._inicios[clave]
+
+    def _crear_asignacion_temporal(self, seccion, prof="TBA", salon="TBA", patron=None, ini=None):
+        if patron is None: patron = random.choice(PATRONES.get(seccion.creditos, PATRONES[3]))
+        if ini is None: ini = random.choice(self.bloques)
+        if salon == "TBA":
+            salones_posibles = self._salones_aptos(None, seccion.cupo)
+            salon = random.choice(salones_posibles) if salones_posibles else "TBA"
+        return {'seccion': seccion, 'profesor': prof, 'salon': salon, 'patron': patron, 'ini': ini}
+
+    def _filas_aptos(self, tipo, cupo, ind_salon):
+        """Filas en el índice de ocupación de salones y marca de salón mega de `_salones_aptos(tipo, cupo)`."""
+        clave = (tipo, cupo)
+        if clave not in self._aptos_filas:
+            # Las filas de los salones siguen el orden de info_salon en todo IndiceOcupacion
+            salones = self._salones_aptos(tipo, cupo)
+            self._aptos_filas[clave] = (np.array([ind_salon.fila.get(c, -1) for c in salones], dtype=np.int64),
+                                        np.array([c in ind_salon.capacidad_fusion for c in salones], dtype=bool))
+        return self._aptos_filas[clave]
+
+    def _asignar_seccion(self, idx, prof, sol, asignado, ocupacion):
+        """
+        Coloca la sección en el primer (inicio, salón) sin cruces de un patrón
+        al azar. Se descartan primero los inicios en que el profesor está
+        ocupado; los cruces de salón se cuentan en lote por bloques de
+        BLOQUE_INICIOS inicios × BLOQUE_SALONES salones (del más chico al más
+        grande) y la búsqueda para en el primer bloque con lugar, así el costo
+        por sección no crece con la cantidad de salones.
+        """
+        s = sol[idx]['seccion'] if sol[idx] else self.secciones[idx]
+        tipo = s.tipo_salon if self._salones_aptos(s.tipo_salon, s.cupo) else None
+        salones = self._salones_aptos(tipo, s.cupo)
+        if not salones: return False
+        ind_prof, ind_salon = ocupacion.ind_prof, ocupacion.ind_salon
+        fila_prof = ind_prof.fila.get(prof, -1) if prof != "GRADUADOS" else -1
+        filas_salon, mega = self._filas_aptos(tipo, s.cupo, ind_salon)
+
+        pids = list(self._opciones_movimiento(s, prof)[0])
+        random.shuffle(pids)
+        for pid in pids:
+            inicios = self._inicios_validos(pid, s.creditos)
+            if not len(inicios): continue
+            if prof == "TBA":
+                # Sin profesor no hay cruces que contar
+                sol[idx] = {'seccion': s, 'profesor': prof, 'salon': salones[0], 'patron': CATALOGO_PATRONES[pid], 'ini': int(inicios[0])}
+                asignado[idx] = True
+                return True
+            j = np.searchsorted(ind_salon.bloques, inicios)
+            n_dias = len(CATALOGO_PATRONES[pid]['days'])
+            d, a, b = (t[pid, j, :n_dias] for t in (ind_salon.tramo_d, ind_salon.tramo_a, ind_salon.tramo_b))
+            libres_prof = np.flatnonzero(ind_prof.contar_lote(np.full(len(inicios), fila_prof), d, a, b).sum(axis=1) == 0)
+            for r0 in range(0, len(libres_prof), BLOQUE_INICIOS):
+                rs = libres_prof[r0:r0 + BLOQUE_INICIOS]
+                for k0 in range(0, len(salones), BLOQUE_SALONES):
+                    filas = filas_salon[k0:k0 + BLOQUE_SALONES]
+                    n_r, n_k = len(rs), len(filas)
+                    en_salon = ind_salon.contar_lote(np.tile(filas, n_r), np.repeat(d[rs], n_k, axis=0),
+                                                     np.repeat(a[rs], n_k, axis=0), np.repeat(b[rs], n_k, axis=0))
+                    en_salon = en_salon.sum(axis=1).reshape(n_r, n_k)
+                    libre = en_salon == 0
+                    if s.es_fusionable:
+                        # En salones mega ocupados decide la regla de fusión
+                        for r, k in zip(*np.nonzero((en_salon > 0) & mega[None, k0:k0 + n_k])):
+                            libre[r, k] = not ocupacion.cruces(idx, prof, salones[k0 + k], pid, int(inicios[rs[r]]))
+                    if libre.any():
+                        r, k = np.unravel_index(np.argmax(libre), libre.shape)
+                        sol[idx] = {'seccion': s, 'profesor': prof, 'salon': salones[k0 + k],
+                                    'patron': CATALOGO_PATRONES[pid], 'ini': int(inicios[rs[r]])}
+                        asignado[idx] = True
+                        return True
+        return False
+
+    def _opciones_movimiento(self, s, prof):
+        """Ids de patrones permitidos y salones compatibles para mover la sección s."""
+        clave = (s.cod, prof)
+        if clave not in self._opciones:
+            patrones = PATRONES.get(s.creditos, PATRONES[3])
+            if prof in self.profesores:
+                p_obj = self.profesores[prof]
+                if p_obj.cursos_intensivos == 0:
+                    patrones = [p for p in patrones if not es_intensivo(p)]
+                elif p_obj.cursos_intensivos == 1 and admite_intensivo(s.creditos):
+                    patrones_int = [p for p in patrones if es_intensivo(p)]
+                    if patrones_int: patrones = patrones_int
+            if not patrones: patrones = PATRONES.get(s.creditos, PATRONES[3])
+            sals = self._salones_aptos(s.tipo_salon, s.cupo)
+            self._opciones[clave] = (np.array([id_patron(p) for p in patrones]), sals)
+        return self._opciones[clave]
+
+    def _recolocar(self, sol, indices):
+        """Lleva cada sección a su mejor (patrón, inicio, salón) dado el resto, evaluando todas las combinaciones."""
+        for i in indices:
+            s = sol[i]['seccion']
+            prof = sol[i]['profesor']
+            pids, sals = self._opciones_movimiento(s, prof)
+            sals = sals or [sol[i]['salon']]
+            p, b, r = np.meshgrid(np.arange(len(pids)), np.arange(len(self._bloques)), np.arange(len(sals)), indexing='ij')
+            p_test, ini_test, r_test = pids[p.ravel()], self._bloques[b.ravel()], r.ravel()
+            deltas = self.evaluador.deltas_lote(i, prof, [sals[k] for k in r_test], p_test, ini_test)
+            k = int(np.argmin(deltas))
+            if deltas[k] < 0:
+                self._aplicar(sol, i, prof, sals[r_test[k]], CATALOGO_PATRONES[p_test[k]], int(ini_test[k]))
+
+    def asignar_salones(self):
+        """
+        Reasigna los salones con profesores y horarios fijos. Las secciones se
+        agrupan por huella horaria (patrón, inicio) y los grupos se recorren en
+        orden de inicio: las fusionables van a un salón mega donde quepan y el
+        resto se reparte por emparejamiento bipartito de costo mínimo entre
+        los salones aptos (ver `_salones_aptos`) libres en toda la huella. El
+        cambio se conserva solo si no empeora el costo; devuelve si se conservó.
+        """
+        ev = self.evaluador
+        capacidad_mega = {c: self.info_salon[c]['CAPACIDAD'] for c in sorted(self.mega_salones)}
+        megas = sorted(capacidad_mega, key=capacidad_mega.get)
+        ocupacion = IndiceOcupacion(self.bloques, list(self.info_salon), capacidad_mega)
+        grupos = {}
+        for i in range(len(self.solucion)):
+            if ev._activa(ev.prof[i], ev.salon[i]):
+                grupos.setdefault((ev.ini[i], ev.pid[i]), []).append(i)
+
+        nuevos = {}
+        for (ini, pid), secciones in sorted(grupos.items()):
+            tramos = ocupacion.tramos(pid, ini)
+            pendientes = []
+            for i in secciones:
+                s = ev.secs[i]
+                mega = None
+                if s.es_fusionable:
+                    mega = next((c for c in megas if capacidad_mega[c] >= s.cupo and all(
+                        ocupacion.contar(c, d, a, b) == 0 or ocupacion.cabe_fusion(c, d, a, b, s.cupo) for d, a, b in tramos)), None)
+                if mega:
+                    nuevos[i] = mega
+                    ocupacion.agregar(mega, i, tramos, s.cupo, True)
+                else:
+                    pendientes.append(i)
+            if pendientes:
+                # Solo se miran los salones aptos de cada (tipo, cupo) del grupo, en lote
+                d, a, b = (np.array([t[n] for t in tramos])[None, :] for n in range(3))
+                libres, aptos = {}, {}
+                for i in pendientes:
+                    s = ev.secs[i]
+                    clave = (s.tipo_salon if self._salones_aptos(s.tipo_salon, s.cupo) else None, s.cupo)
+                    if clave not in libres:
+                        filas, _ = self._filas_aptos(*clave, ocupacion)
+                        libres[clave] = filas[ocupacion.contar_lote(filas, d, a, b).sum(axis=1) == 0]
+                    aptos[i] = libres[clave]
+                for i, salon in self._emparejar_salones(pendientes, aptos, tramos, ocupacion).items():
+                    nuevos[i] = salon
+                    ocupacion.agregar(salon, i, tramos, ev.secs[i].cupo, ev.secs[i].es_fusionable)
+
+        cambios = {i: (salon, CATALOGO_PATRONES[ev.pid[i]], ev.ini[i]) for i, salon in nuevos.items() if salon != ev.salon[i]}
+        return self._adoptar(cambios, solo_si_mejora=True)
+
+    def _emparejar_salones(self, secciones, aptos, tramos, ocupacion):
+        """
+        Flujo de costo mínimo sección -> salón, con arcos solo a los salones
+        de `aptos[i]` (filas de `ocupacion` libres, del salón más chico al más
+        grande): el costo es el de capacidad y tipo del evaluador más la
+        holgura de asientos. Con una sola sección o un solo salón no hace falta
+        el flujo: el salón más ajustado va a la sección más grande. Las
+        secciones sin salón libre van al de menos cruces.
+        """
+        ev = self.evaluador
+        codigos = list(ocupacion.fila)
+        costos = {i: ev.costo_salon_lote(i, aptos[i]) + np.maximum(0, ev._cap_salon[aptos[i]] - ev.secs[i].cupo)
+                  for i in secciones}
+        filas = np.unique(np.concatenate([aptos[i] for i in secciones]))
+        asignados = {}
+        if len(secciones) == 1 or len(filas) <= 1:
+            for i in sorted(secciones, key=lambda i: -ev.secs[i].cupo):
+                libre = [k for k, f in enumerate(aptos[i].tolist()) if codigos[f] not in asignados.values()]
+                if libre: asignados[i] = codigos[aptos[i][min(libre, key=lambda k: costos[i][k])]]
+        else:
+            # Nodos: 0 fuente, 1..n secciones, n+1..n+m salones, n+m+1 sumidero; el arco
+            # directo sección -> sumidero es "sin salón libre"
+            n, m = len(secciones), len(filas)
+            sumidero = n + m + 1
+            origen = np.concatenate([np.full(len(aptos[i]), 1 + k) for k, i in enumerate(secciones)])
+            destino = 1 + n + np.searchsorted(filas, np.concatenate([aptos[i] for i in secciones]))
+            n_aptos = len(origen)
+            origen = np.concatenate([origen, np.zeros(n, dtype=np.int64), np.arange(1 + n, 1 + n + m), np.arange(1, 1 + n)])
+            destino = np.concatenate([destino, np.arange(1, 1 + n), np.full(m + n, sumidero)])
+            costo = np.concatenate([costos[i] for i in secciones] + [np.zeros(n + m, dtype=np.int64), np.full(n, 10 ** 6)])
+            flujo = min_cost_flow.SimpleMinCostFlow()
+            arcos = flujo.add_arcs_with_capacity_and_unit_cost(origen, destino, np.ones(len(origen), dtype=np.int64), costo)
+            flujo.set_nodes_supplies(np.array([0, sumidero]), np.array([n, -n]))
+            flujo.solve()
+            for arco in np.flatnonzero(flujo.flows(arcos[:n_aptos])).tolist():
+                asignados[secciones[origen[arco] - 1]] = codigos[filas[destino[arco] - 1 - n]]
+
+        faltan = [i for i in secciones if i not in asignados]
+        if faltan:
+            # Todos los salones, con los cruces de la huella y los ya tomados en este grupo
+            todas = np.arange(len(codigos))
+            d, a, b = (np.array([t[n] for t in tramos])[None, :] for n in range(3))
+            cruces = ocupacion.contar_lote(todas, d, a, b).sum(axis=1)
+            cruces[[ocupacion.fila[c] for c in asignados.values()]] += 1
+            for i in faltan:
+                f = int(np.argmin(ev.costo_salon_lote(i, todas) + 10000 * cruces))
+                asignados[i] = codigos[f]
+                cruces[f] += 1
+        return asignados
+
+    def _elegir_seccion(self, sol, prob_conflicto=0.8):
+        # Casi siempre se mueve una sección en falta; el resto del tiempo cualquiera, para seguir explorando
+        conflictivas = self.evaluador.conflictivas
+        if len(conflictivas) and random.random() < prob_conflicto:
+            return conflictivas.elegir()
+        return random.randint(0, len(sol)-1)
+
+    def _mutar_solucion(self, sol, candidatos=100, prob_salon=0.2, prob_conflicto=0.8, tabu=False):
+        idx = self._elegir_seccion(sol, prob_conflicto)
+        asign = sol[idx]
+        s = asign['seccion']
+        prof = asign['profesor']
+        pids, sals = self._opciones_movimiento(s, prof)
+
+        # Se sortean todos los candidatos (patrón, inicio, salón) y se puntúan en un solo lote
+        p_test = pids[self._rng.integers(len(pids), size=candidatos)]
+        ini_test = self._bloques[self._rng.integers(len(self._bloques), size=candidatos)]
+        s_test = [asign['salon']] * candidatos
+        if sals:
+            for k in np.flatnonzero(self._rng.random(candidatos) < prob_salon):
+                s_test[k] = sals[self._rng.integers(len(sals))]
+
+        deltas = self.evaluador.deltas_lote(idx, prof, s_test, p_test, ini_test)
+        if tabu:
+            prohibido = np.array([self._es_tabu(idx, pid, ini, sl) for pid, ini, sl in zip(p_test.tolist(), ini_test.tolist(), s_test)])
+            # Aspiración: un candidato tabú se admite si deja un costo mejor que el mejor conocido
+            prohibido &= self.evaluador.costo + deltas >= self.mejor_costo
+            if not prohibido.all():
+                deltas = np.where(prohibido, np.inf, deltas)
+        k = int(np.argmin(deltas))
+        self._aplicar(sol, idx, prof, s_test[k], CATALOGO_PATRONES[p_test[k]], int(ini_test[k]))
+        return self.evaluador.costo
+
+    # --- Memoria tabú ---
+    def _es_tabu(self, idx, pid, ini, salon):
+        return self._tabu.get(hash((idx, pid, ini, salon)), 0) > self._iteracion
+
+    def _marcar_tabu(self, movimientos):
+        """Prohíbe volver, por unas iteraciones, a la asignación que dejó cada sección movida."""
+        for idx, (prof, salon, patron, ini) in movimientos:
+            if patron is None: continue
+            self._tabu[hash((idx, id_patron(patron), ini, salon))] = self._iteracion + random.randint(*self.tenencia)
+        if len(self._tabu) > 4 * len(self.solucion):
+            self._tabu = {k: v for k, v in self._tabu.items() if v > self._iteracion}
+
+    def _movimiento_tabu(self):
+        """Si algún movimiento pendiente lleva a una sección a una asignación tabú."""
+        ev = self.evaluador
+        return any(self._es_tabu(idx, ev.pid[idx], ev.ini[idx], ev.salon[idx]) for idx, _ in self._registro)
+
+    # --- Operadores de vecindario ---
+    # Cada operador aplica su movimiento en sitio con `_aplicar` (queda en el registro para
+    # deshacerlo) y devuelve el costo resultante, o None si no encontró movimiento.
+    def registrar_operador(self, nombre, operador, usa_salones=False):
+        """Agrega un operador operador(sol, candidatos, prob_salon) -> costo | None a la ruleta."""
+        self.operadores[nombre] = (operador, usa_salones)
+        self._puntaje_op[nombre] = 1.0
+        self._uso_op[nombre] = [0.0, 0.0]
+
+    def _mejor_compuesto(self, sol, propuestas):
+        """Prueba cada propuesta (lista de movimientos) aplicándola y deshaciéndola; deja aplicada la mejor."""
+        mejor, costo_mejor = None, None
+        for propuesta in propuestas:
+            self.metricas.contar('candidatos_evaluados', len(propuesta))
+            for movimiento in propuesta:
+                self._aplicar(sol, *movimiento)
+            if costo_mejor is None or self.evaluador.costo < costo_mejor:
+                mejor, costo_mejor = propuesta, self.evaluador.costo
+            self._deshacer(sol)
+        if mejor is None: return None
+        for movimiento in mejor:
+            self._aplicar(sol, *movimiento)
+        return self.evaluador.costo
+
+    def _pids_creditos(self, creditos):
+        clave = ('pids', creditos)
+        if clave not in self._opciones:
+            self._opciones[clave] = {id_patron(p) for p in PATRONES.get(creditos, PATRONES[3])}
+        return self._opciones[clave]
+
+    def _op_reprogramar(self, sol, candidatos, prob_salon):
+        """Mueve una sección a otro (patrón, inicio, salón)."""
+        return self._mutar_solucion(sol, candidatos, prob_salon, tabu=True)
+
+    def _op_intercambiar_horarios(self, sol, candidatos, prob_salon, muestras=8):
+        """Dos secciones de iguales créditos intercambian su (patrón, inicio)."""
+        ev = self.evaluador
+        i = self._elegir_seccion(sol)
+        pares = [j for j in random.sample(range(len(sol)), min(4 * muestras, len(sol)))
+                 if j != i and ev.secs[j].creditos == ev.secs[i].creditos and (ev.pid[j], ev.ini[j]) != (ev.pid[i], ev.ini[i])]
+        propuestas = [[(i, ev.prof[i], ev.salon[i], CATALOGO_PATRONES[ev.pid[j]], ev.ini[j]),
+                       (j, ev.prof[j], ev.salon[j], CATALOGO_PATRONES[ev.pid[i]], ev.ini[i])] for j in pares[:muestras]]
+        return self._mejor_compuesto(sol, propuestas)
+
+    def _op_intercambiar_profesores(self, sol, candidatos, prob_salon, muestras=8):
+        """Dos secciones intercambian profesor, si cada uno es candidato de la otra."""
+        ev = self.evaluador
+        i = self._elegir_seccion(sol)
+        prof_i = ev.prof[i]
+        if prof_i not in self.profesores: return None
+        propuestas = []
+        for p in ev.secs[i].cands:
+            if p == prof_i or p not in self.profesores: continue
+            secciones_p = {j for d in range(len(DIAS_SEMANA)) for j in ev.ind_prof.ocupantes.get((p, d), {})}
+            for j in secciones_p:
+                if prof_i in ev.secs[j].cands:
+                    propuestas.append([(i, p, ev.salon[i], CATALOGO_PATRONES[ev.pid[i]], ev.ini[i]),
+                                       (j, prof_i, ev.salon[j], CATALOGO_PATRONES[ev.pid[j]], ev.ini[j])])
+        return self._mejor_compuesto(sol, random.sample(propuestas, min(muestras, len(propuestas))))
+
+    def _op_cadena_kempe(self, sol, candidatos, prob_salon, largo_max=30):
+        """
+        Cadena de Kempe entre la huella horaria A = (patrón, inicio) de una
+        sección y otra huella B: las secciones de A y B enlazadas por profesor
+        o salón compartido cambian de huella en bloque, así la cadena no crea
+        cruces entre sus propias secciones.
+        """
+        ev = self.evaluador
+        i = self._elegir_seccion(sol)
+        if not ev._activa(ev.prof[i], ev.salon[i]): return None
+        pids, _ = self._opciones_movimiento(ev.secs[i], ev.prof[i])
+        huella_a = (ev.pid[i], ev.ini[i])
+        huella_b = (int(random.choice(pids)), int(random.choice(self.bloques)))
+        if huella_a == huella_b: return None
+        grupos = {huella_a: [], huella_b: []}
+        for j in range(len(sol)):
+            if (ev.pid[j], ev.ini[j]) in grupos and ev._activa(ev.prof[j], ev.salon[j]):
+                grupos[(ev.pid[j], ev.ini[j])].append(j)
+
+        def recursos(j):
+            return {('salon', ev.salon[j])} | ({('prof', ev.prof[j])} if ev.prof[j] != "GRADUADOS" else set())
+
+        cadena, pendientes = {i: huella_b}, [i]
+        while pendientes:
+            x = pendientes.pop()
+            destino = cadena[x]
+            origen = huella_a if destino == huella_b else huella_b
+            for y in grupos[destino]:
+                if y not in cadena and recursos(x) & recursos(y):
+                    cadena[y] = origen
+                    pendientes.append(y)
+            if len(cadena) > largo_max: return None
+        if any(pid not in self._pids_creditos(ev.secs[y].creditos) for y, (pid, _) in cadena.items()):
+            return None
+        return self._mejor_compuesto(sol, [[(y, ev.prof[y], ev.salon[y], CATALOGO_PATRONES[pid], ini)
+                                            for y, (pid, ini) in cadena.items()]])
+
+    def _op_intercambiar_salones(self, sol, candidatos, prob_salon, muestras=8):
+        """Una sección pasa a otro salón apto y quienes lo ocupan a esas horas pasan al suyo."""
+        ev = self.evaluador
+        i = self._elegir_seccion(sol)
+        _, sals = self._opciones_movimiento(ev.secs[i], ev.prof[i])
+        if not sals or not ev._activa(ev.prof[i], ev.salon[i]): return None
+        tramos = ev.ind_salon.tramos(ev.pid[i], ev.ini[i])
+        propuestas = []
+        for r in random.sample(sals, min(muestras, len(sals))):
+            if r == ev.salon[i]: continue
+            ocupantes = {j for d, a, b in tramos for j, (a_j, b_j, _, _) in ev.ind_salon.ocupantes.get((r, d), {}).items()
+                         if a_j < b and a < b_j}
+            propuestas.append([(i, ev.prof[i], r, CATALOGO_PATRONES[ev.pid[i]], ev.ini[i])]
+                              + [(j, ev.prof[j], ev.salon[i], CATALOGO_PATRONES[ev.pid[j]], ev.ini[j]) for j in ocupantes])
+        return self._mejor_compuesto(sol, propuestas)
+
+    def _elegir_operador(self, solo_horario=False):
+        """Ruleta: cada operador pesa su puntaje reciente, con un piso para que todos se sigan probando."""
+        nombres = [n for n, (_, usa_salones) in self.operadores.items() if not (solo_horario and usa_salones)]
+        total = sum(self._puntaje_op[n] for n in nombres) or 1.0
+        pesos = [0.9 * self._puntaje_op[n] / total + 0.1 / len(nombres) for n in nombres]
+        return random.choices(nombres, weights=pesos)[0]
+
+    def _actualizar_puntajes(self, reaccion=0.2):
+        """
+        Al cerrar un segmento, cada operador usado acerca su puntaje a la
+        mejora por candidato evaluado que logró.
+
+        El esfuerzo se mide en candidatos evaluados, que siguen de cerca el
+        costo de CPU de cada operador, y no en milisegundos de CPU. Con tiempo
+        medido los puntajes varían con la carga de la máquina, la ruleta elige
+        otra secuencia y la misma semilla ya no repite la corrida (lo piden la
+        caché de soluciones y las comparaciones del banco de pruebas). No
+        cambiar a tiempo sin resolver eso.
+        """
+        for nombre, (mejora, esfuerzo) in self._uso_op.items():
+            if esfuerzo > 0:
+                self._puntaje_op[nombre] = (1 - reaccion) * self._puntaje_op[nombre] + reaccion * mejora / esfuerzo
+            self._uso_op[nombre] = [0.0, 0.0]
+
+    def _aplicar(self, sol, idx, prof, salon, patron, ini):
+        """Aplica el movimiento en sitio y lo anota en el registro para poder deshacerlo."""
+        viejo = self.evaluador.mover(idx, prof, salon, patron, ini)
+        self._registro.append((idx, viejo))
+        asign = sol[idx]
+        asign['profesor'], asign['salon'], asign['patron'], asign['ini'] = prof, salon, patron, ini
+
+    def _deshacer(self, sol):
+        while self._registro:
+            idx, (prof, salon, patron, ini) = self._registro.pop()
+            self.evaluador.mover(idx, prof, salon, patron, ini)
+            asign = sol[idx]
+            asign['profesor'], asign['salon'], asign['patron'], asign['ini'] = prof, salon, patron, ini
+
+    def _instantanea(self):
+        """
+        Copia compacta (SolucionArreglos) de la última solución confirmada.
+        Los movimientos aún pendientes en el registro de deshacer no se incluyen.
+        """
+        ev = self.evaluador
+        inst = SolucionArreglos(ev.secs, self.ids_profes, self.ids_salones,
+                                [self.ids_profes.id(p) for p in ev.prof], [self.ids_salones.id(sl) for sl in ev.salon],
+                                ev.pid, ev.ini)
+        for idx, (prof, salon, patron, ini) in reversed(self._registro):
+            inst.prof[idx] = self.ids_profes.id(prof)
+            inst.salon[idx] = self.ids_salones.id(salon)
+            inst.patron[idx] = id_patron(patron)
+            inst.ini[idx] = ini
+        return inst
+
+    @cronometrado('busqueda')
+    def optimizar(self, iteraciones=200, bar=None, status_text=None, candidatos=100, solo_horario=False,
+                  tiempo_limite=None, costo_objetivo=None, sin_mejora=None, meseta_suave=None, temp_inicial=None):
+        """
+        Recocido con memoria tabú sobre los operadores de `self.operadores`,
+        elegidos por ruleta. Con `solo_horario` los movimientos no tocan
+        salones: cada 100 iteraciones y al final se reasignan todos con
+        `asignar_salones`.
+
+        Se detiene con el primer criterio que se cumpla (el motivo queda en
+        `self.motivo_parada`): `iteraciones`, `tiempo_limite` en segundos de
+        reloj, `costo_objetivo` alcanzado, `sin_mejora` iteraciones sin mejorar
+        el mejor costo, o `meseta_suave` iteraciones sin mejora ya con cero
+        conflictos duros. Con `iteraciones=None` solo cuentan los demás.
+        También se detiene si se activa la señal `self.detener`.
+
+        El enfriamiento parte de `temp_inicial` (5000 por defecto); la última
+        temperatura queda en `self.temperatura`, para reanudar desde ahí una
+        corrida detenida.
+        """
+        if iteraciones is None and tiempo_limite is None:
+            raise ValueError("Se requiere un límite de iteraciones o de tiempo")
+        if temp_inicial is None:
+            temp_inicial = 5000.0
+        # El enfriamiento sigue el avance (por iteraciones o por tiempo, el que vaya más adelante):
+        # temp = temp_inicial / (1 + avance * (temp_inicial / temp_final - 1)), que por iteraciones es temp_inicial / (it + 1)
+        temp_final = temp_inicial / (iteraciones + 1) if iteraciones else 1.0
+        inicio = time.perf_counter()
+        ultima_mejora = 0
+        self.motivo_parada = None
+        it = 0
+        while self.motivo_parada is None:
+            avance = self._avance(it, iteraciones, inicio, tiempo_limite)
+            self._iteracion += 1
+            costo_previo = self.evaluador.costo
+            nombre = self._elegir_operador(solo_horario)
+            evaluados = self.metricas.contadores.get('candidatos_evaluados', 0)
+            # El movimiento ya quedó aplicado en sitio; si se rechaza se deshace
+            costo_vecino = self.operadores[nombre][0](self.solucion, candidatos, 0.0 if solo_horario else 0.2)
+            if costo_vecino is None:
+                costo_vecino = costo_previo
+            elif costo_vecino >= self.mejor_costo and self._movimiento_tabu():
+                # Tabú sin aspiración: el movimiento no se toma
+                self._deshacer(self.solucion)
+                costo_vecino = costo_previo
+                self.metricas.contar('rechazos_tabu')
+            movimientos = list(self._registro)
+
+            aceptado = True
+            if costo_vecino <= self.mejor_costo:
+                if costo_vecino < self.mejor_costo:
+                    ultima_mejora = it
+                    self.metricas.mejora(costo_vecino)
+                self.mejor_costo = costo_vecino
+                self._mejor_instantanea = None
+                self._registro.clear()
+            else:
+                temp = self.temperatura = temp_inicial / (1 + avance * (temp_inicial / temp_final - 1))
+                try: prob = math.exp((self.mejor_costo - costo_vecino) / temp)
+                except: prob = 0
+                if random.random() < prob:
+                    # Al alejarse de la mejor solución se guarda su instantánea, no una copia completa
+                    if self._mejor_instantanea is None:
+                        self._mejor_instantanea = self._instantanea()
+                    self._registro.clear()
+                else:
+                    self._deshacer(self.solucion)
+                    aceptado = False
+
+            self.metricas.contar('iteraciones')
+            if aceptado:
+                self.metricas.contar('aceptados')
+                self._marcar_tabu(movimientos)
+            # Mejora y candidatos evaluados de cada operador se acumulan por segmentos de 100 iteraciones.
+            # El esfuerzo va en candidatos y no en milisegundos de CPU a propósito: ver _actualizar_puntajes
+            uso = self._uso_op[nombre]
+            uso[0] += max(0, costo_previo - self.evaluador.costo)
+            uso[1] += max(1, self.metricas.contadores.get('candidatos_evaluados', 0) - evaluados)
+            if it % 100 == 99:
+                self._actualizar_puntajes()
+
+            if solo_horario and (it + 1) % 100 == 0:
+                self.asignar_salones()
+                    
+            self.historial_costos.append(self.mejor_costo)
+            it += 1
+            self.motivo_parada = self._criterio_parada(it, iteraciones, inicio, tiempo_limite, costo_objetivo,
+                                                       sin_mejora, meseta_suave, it - 1 - ultima_mejora)
+            
+            if it % 10 == 1 or self.motivo_parada:
+                if status_text: 
+                    fitness_actual = 10000 / (10000 + self.mejor_costo)
+                    duros = int(self.mejor_costo // 10000)
+                    limite = f"/{iteraciones}" if iteraciones else f" ({time.perf_counter() - inicio:.0f}s/{tiempo_limite:.0f}s)"
+                    status_text.markdown(f"**🔄 Generación {it}{limite}** | Conflictos Duros: {duros} | Costo Total: {self.mejor_costo:.2f} | Fitness: {fitness_actual:.5f}")
+                if bar: bar.progress(1.0 if self.motivo_parada else min(1.0, self._avance(it, iteraciones, inicio, tiempo_limite)))
+
+        if solo_horario and it % 100:
+            self.asignar_salones()
+        return self._resultado()
+
+    @staticmethod
+    def _avance(it, iteraciones, inicio, tiempo_limite):
+        """Fracción recorrida del presupuesto: la mayor entre iteraciones y tiempo de reloj."""
+        avance = it / iteraciones if iteraciones else 0.0
+        if tiempo_limite:
+            avance = max(avance, (time.perf_counter() - inicio) / tiempo_limite)
+        return avance
+
+    def _criterio_parada(self, it, iteraciones, inicio, tiempo_limite, costo_objetivo, sin_mejora, meseta_suave, estancadas):
+        """Motivo de parada del recocido, o None si debe seguir."""
+        if self._detenido():
+            return "detenido"
+        if iteraciones and it >= iteraciones:
+            return "iteraciones"
+        if tiempo_limite and time.perf_counter() - inicio >= tiempo_limite:
+            return "tiempo"
+        if costo_objetivo is not None and self.mejor_costo <= costo_objetivo:
+            return "costo objetivo"
+        if sin_mejora and estancadas >= sin_mejora:
+            return "sin mejora"
+        if meseta_suave and self.mejor_costo < 10000 and estancadas >= meseta_suave:
+            return "meseta sin conflictos duros"
+        return None
+
+    def _detenido(self):
+        return self.detener is not None and self.detener.is_set()
+
+    def _resultado(self):
+        # La solución actual vuelve a ser la mejor: así el evaluador (y sus conflictos) describe lo que se devuelve
+        if self._mejor_instantanea is not None:
+            self.importar(self.exportar())
+        self.mejor_solucion = self._instantanea().a_asignaciones()
+        return self.mejor_solucion, int(self.mejor_costo // 10000), self.historial_costos
+
+    def exportar(self):
+        """Mejor solución como filas (profesor, salón, id de patrón, inicio), liviana para enviar entre procesos."""
+        mejor = self._mejor_instantanea if self._mejor_instantanea is not None else self._instantanea()
+        return list(zip([mejor.profes[p] for p in mejor.prof.tolist()], [mejor.salones[sl] for sl in mejor.salon.tolist()],
+                        mejor.patron.tolist(), mejor.ini.tolist()))
+
+    def importar(self, filas):
+        """Toma como actual una solución exportada por `exportar`; pasa a ser la mejor si no empeora."""
+        if self._mejor_instantanea is None:
+            self._mejor_instantanea = self._instantanea()
+        for i, (prof, salon, pid, ini) in enumerate(filas):
+            self._aplicar(self.solucion, i, prof, salon, CATALOGO_PATRONES[pid], ini)
+        self._registro.clear()
+        if self.evaluador.costo <= self.mejor_costo:
+            self.mejor_costo = self.evaluador.costo
+            self._mejor_instantanea = None
+            self.metricas.mejora(self.mejor_costo)
+
+    def sembrar(self, filas):
+        """
+        Arranque en caliente: `filas` trae, por sección, la fila exportada de
+        una solución anterior de una instancia parecida, o None. Se toman las
+        que siguen valiendo aquí (profesor y salón existentes, patrón e inicio
+        permitidos); el resto conserva el profesor del greedy y se recoloca
+        sobre lo sembrado. Devuelve cuántas secciones se tomaron.
+        """
+        actuales = self.exportar()
+        faltan = []
+        for i, fila in enumerate(filas):
+            s = self.secciones[i]
+            if fila is None or fila[0] not in self.ids_profes.ids or fila[1] not in self.ids_salones.ids \
+                    or fila[2] not in self._opciones_movimiento(s, fila[0])[0] \
+                    or fila[3] not in self._inicios_validos(fila[2], s.creditos):
+                faltan.append(i)
+                continue
+            actuales[i] = fila
+            self.sembradas += 1
+        if self.sembradas:
+            self.importar(actuales)
+            self._adoptar({}, recolocar=faltan)
+        return self.sembradas
+
+    def _adoptar(self, asignaciones, recolocar=(), solo_si_mejora=False):
+        """
+        Lleva la solución actual a {sección: (salón, patrón, inicio)} con el
+        mismo profesor, recoloca las secciones de `recolocar` sobre el resultado
+        y actualiza la mejor solución si no empeora. Con `solo_si_mejora` el
+        cambio se deshace si el costo real sube. Devuelve si se conservó.
+        """
+        costo_previo = self.evaluador.costo
+        era_mejor = self._mejor_instantanea is None
+        if era_mejor:
+            self._mejor_instantanea = self._instantanea()
+        for i, (salon, patron, ini) in asignaciones.items():
+            self._aplicar(self.solucion, i, self.solucion[i]['profesor'], salon, patron, ini)
+        self._recolocar(self.solucion, recolocar)
+        if solo_si_mejora and self.evaluador.costo > costo_previo:
+            self._deshacer(self.solucion)
+            if era_mejor: self._mejor_instantanea = None
+            return False
+        self._registro.clear()
+        if self.evaluador.costo <= self.mejor_costo:
+            self.mejor_costo = self.evaluador.costo
+            self._mejor_instantanea = None
+            self.metricas.mejora(self.mejor_costo)
+        return True
+
+    def resolver_cpsat(self, tiempo_limite=60, bar=None, status_text=None, workers=None, respaldo_recocido=False):
+        """
+        Motor alternativo: resuelve el horario completo con ModeloCPSAT, con
+        `workers` hilos (por defecto, todos los núcleos). Con
+        `respaldo_recocido` y sin `workers` explícito, si hay menos de
+        MIN_HILOS_CPSAT hilos corre el recocido con el mismo tiempo y lo deja
+        en `self.respaldo_recocido` (y en el reporte de la corrida).
+        """
+        self.respaldo_recocido = False
+        hilos = workers or os.cpu_count() or 1
+        if respaldo_recocido and workers is None and hilos < MIN_HILOS_CPSAT:
+            log.warning("CP-SAT con %d hilos (mínimo %d): se usa el recocido con el mismo tiempo", hilos, MIN_HILOS_CPSAT)
+            self.metricas.contar('respaldo_recocido')
+            self.respaldo_recocido = True
+            return self.optimizar(None, bar, status_text, tiempo_limite=tiempo_limite)
+        return self._resolver_cpsat(tiempo_limite, bar, status_text, hilos)
+
+    @cronometrado('busqueda')
+    def _resolver_cpsat(self, tiempo_limite, bar, status_text, workers):
+        modelo = ModeloCPSAT(self)
+        asignaciones = modelo.resolver(tiempo_limite, workers, bar, status_text, self.detener)
+        self.motivo_parada = "detenido" if self._detenido() else None
+        # Sin pasos propios: cada solución mejor que halla el solver cuenta como una iteración aceptada
+        self.metricas.contar('iteraciones', len(modelo.objetivos))
+        self.metricas.contar('aceptados', len(modelo.objetivos))
+        if asignaciones is not None:
+            self._adoptar(asignaciones, recolocar=[i for i in modelo.opciones if i not in asignaciones])
+            # Curva aproximada: el objetivo del modelo desplazado hasta el costo real final
+            constante = self.evaluador.costo - modelo.objetivos[-1][1]
+            self.historial_costos += [min(self.mejor_costo, obj + constante) for _, obj in modelo.objetivos]
+        if status_text:
+            status_text.markdown(f"**🧮 CP-SAT: {modelo.estado}** | Conflictos Duros: {int(self.mejor_costo // 10000)} | Costo Total: {self.mejor_costo:.2f}")
+        return self._resultado()
+
+    def _en_conflicto(self, i):
+        ev = self.evaluador
+        if not ev._activa(ev.prof[i], ev.salon[i]): return False
+        return ev.propio[i] >= 10000 or bool(ev.cruces(i, ev.prof[i], ev.salon[i], ev.pid[i], ev.ini[i]))
+
+    def _vecinos_cruce(self, i):
+        """Secciones que comparten profesor o salón con la sección i en algún tramo."""
+        ev = self.evaluador
+        vecinos = set()
+        for d, a, b in ev.ind_salon.tramos(ev.pid[i], ev.ini[i]):
+            for indice, clave in ((ev.ind_prof, ev.prof[i]), (ev.ind_salon, ev.salon[i])):
+                for j, (a_j, b_j, _, _) in indice.ocupantes.get((clave, d), {}).items():
+                    if j != i and a_j < b and a < b_j: vecinos.add(j)
+        return vecinos
+
+    def _vecindario(self, tipo, tamano):
+        """Índices de las secciones a liberar: un profesor, un salón, un día o un grupo de conflictos."""
+        ev = self.evaluador
+        activas = [i for i in range(len(self.solucion)) if ev._activa(ev.prof[i], ev.salon[i])]
+        if tipo == 'conflicto':
+            semillas = [i for i in activas if self._en_conflicto(i)]
+            if semillas:
+                # Se crece desde un conflicto por las secciones con las que comparte recurso
+                grupo, frontera = [], [random.choice(semillas)]
+                while frontera and len(grupo) < tamano:
+                    i = frontera.pop(0)
+                    if i in grupo: continue
+                    grupo.append(i)
+                    frontera += [j for j in self._vecinos_cruce(i) if j not in grupo]
+                return grupo
+            tipo = random.choice(['profesor', 'salon', 'dia'])
+        if tipo == 'profesor':
+            prof = random.choice(sorted({ev.prof[i] for i in activas}))
+            grupo = [i for i in activas if ev.prof[i] == prof]
+        elif tipo == 'salon':
+            salon = random.choice(sorted({ev.salon[i] for i in activas}))
+            grupo = [i for i in activas if ev.salon[i] == salon]
+        else:
+            dia = random.choice(DIAS_SEMANA)
+            grupo = [i for i in activas if dia in CATALOGO_PATRONES[ev.pid[i]]['days']]
+        return random.sample(grupo, min(tamano, len(grupo)))
+
+    @cronometrado('busqueda')
+    def resolver_lns(self, tiempo_limite=60, bar=None, status_text=None, tamano=15, tiempo_ronda=3, workers=None):
+        """
+        Búsqueda de vecindario grande: parte de la solución actual, libera en
+        cada ronda un vecindario (profesor, salón, día o grupo de conflictos) y
+        lo resuelve con ModeloCPSAT dejando fijo el resto. Una ronda que empeora
+        el costo real se deshace.
+        """
+        inicio = time.time()
+        ronda = 0
+        while time.time() - inicio < tiempo_limite and not self._detenido():
+            restante = tiempo_limite - (time.time() - inicio)
+            tipo = 'conflicto' if random.random() < 0.5 else random.choice(['profesor', 'salon', 'dia'])
+            libres = self._vecindario(tipo, tamano)
+            if libres:
+                modelo = ModeloCPSAT(self, libres)
+                asignaciones = modelo.resolver(min(tiempo_ronda, max(restante, 0.1)), workers, detener=self.detener)
+                if asignaciones is not None and self._adoptar(
+                        asignaciones, recolocar=[i for i in modelo.opciones if i not in asignaciones], solo_si_mejora=True):
+                    self.metricas.contar('aceptados')
+            ronda += 1
+            self.metricas.contar('iteraciones')
+            self.historial_costos.append(self.mejor_costo)
+
+            if status_text:
+                duros = int(self.mejor_costo // 10000)
+                status_text.markdown(f"**🧩 LNS Ronda {ronda}** ({tipo}, {len(libres)} secciones) | Conflictos Duros: {duros} | Costo Total: {self.mejor_costo:.2f}")
+            if bar: bar.progress(min(1.0, (time.time() - inicio) / tiempo_limite))
+
+        self.motivo_parada = "detenido" if self._detenido() else None
+        return self._resultado()
+
+    @staticmethod
+    def _contexto_procesos():
+        # Sin fork: el coordinador puede correr en un hilo (trabajos de la interfaz) y un fork
+        # desde un proceso con hilos puede heredar candados tomados. El servidor de forkserver
+        # carga este módulo una vez y los trabajadores salen de él ya importados
+        if "forkserver" in mp.get_all_start_methods():
+            contexto = mp.get_context("forkserver")
+            contexto.set_forkserver_preload([__name__])
+            return contexto
+        return mp.get_context("spawn")
+
+    @cronometrado('busqueda')
+    def optimizar_islas(self, n_islas=None, epocas=10, iteraciones=200, bar=None, status_text=None, semilla=None,
+                        desde_actual=False):
+        """
+        Modelo de islas: n_islas cadenas de recocido independientes, cada una en
+        su proceso y con su semilla, que al final de cada época envían su mejor
+        solución a la isla vecina (anillo). Se adopta el mejor global y las
+        curvas de cada isla quedan en `historiales_islas`. Con `desde_actual`
+        todas las islas parten de la mejor solución de este scheduler (para
+        reanudar una búsqueda detenida).
+        """
+        n_islas = n_islas or os.cpu_count() or 1
+        semilla = random.getrandbits(32) if semilla is None else semilla
+        contexto = self._contexto_procesos()
+        inicial = self.exportar() if desde_actual else None
+        with contexto.Manager() as gestor:
+            buzones = [gestor.Queue() for _ in range(n_islas)]
+            avance = gestor.Queue()
+            parada = gestor.Event()
+            with ProcessPoolExecutor(n_islas, mp_context=contexto, initializer=_iniciar_proceso,
+                                     initargs=(type(self), self.datos_entrada, buzones, avance, parada,
+                                               reparto_cpu(self.limite_cpu, n_islas))) as pool:
+                futuros = [pool.submit(_ejecutar_isla, k, semilla + k, epocas, iteraciones, inicial) for k in range(n_islas)]
+                costos, epocas_hechas = {}, 0
+                while not all(f.done() for f in futuros) or not avance.empty():
+                    if self._detenido(): parada.set()
+                    try: k, epoca, costo = avance.get(timeout=0.5)
+                    except queue.Empty: continue
+                    costos[k] = costo
+                    epocas_hechas += 1
+                    mejor = min(costos.values())
+                    self.metricas.mejora(mejor)
+                    if status_text:
+                        status_text.markdown(f"**🏝️ Islas {n_islas} | Época {epocas_hechas}/{n_islas * epocas}** | Conflictos Duros: {int(mejor // 10000)} | Mejor Costo Global: {mejor:.2f}")
+                    if bar: bar.progress(epocas_hechas / (n_islas * epocas))
+                resultados = [f.result() for f in futuros]
+            # La parada compartida sin pedido propio viene de un trabajador que agotó su CPU
+            sin_cpu = parada.is_set() and not self._detenido()
+
+        self.motivo_parada = "detenido" if self._detenido() else "límite de CPU" if sin_cpu else None
+        for *_, contadores in resultados:
+            self.metricas.sumar(contadores)
+        self.historiales_islas = [historial for _, _, historial, _ in resultados]
+        largo = max(len(h) for h in self.historiales_islas)
+        curva = np.min([h + h[-1:] * (largo - len(h)) for h in self.historiales_islas], axis=0)
+        self.historial_costos += curva.tolist()
+        self.importar(min(resultados, key=lambda r: r[0])[1])
+        return self._resultado()
+
+    def _paso_templado(self, temp, candidatos=100):
+        """Un paso de Metropolis a temperatura fija, contra el costo actual (no contra el mejor)."""
+        costo_actual = self.evaluador.costo
+        costo_vecino = self._mutar_solucion(self.solucion, candidatos)
+        self.metricas.contar('iteraciones')
+        if costo_vecino <= self.mejor_costo:
+            if costo_vecino < self.mejor_costo: self.metricas.mejora(costo_vecino)
+            self.mejor_costo = costo_vecino
+            self._mejor_instantanea = None
+            self._registro.clear()
+            self.metricas.contar('aceptados')
+        elif costo_vecino <= costo_actual or random.random() < math.exp((costo_actual - costo_vecino) / temp):
+            if self._mejor_instantanea is None:
+                self._mejor_instantanea = self._instantanea()
+            self._registro.clear()
+            self.metricas.contar('aceptados')
+        else:
+            self._deshacer(self.solucion)
+
+    @cronometrado('busqueda')
+    def templado_paralelo(self, n_replicas=None, rondas=50, pasos=100, t_min=10.0, t_max=20000.0,
+                          bar=None, status_text=None, semilla=None, candidatos=100, desde_actual=False):
+        """
+        Templado paralelo (intercambio de réplicas): cada proceso mantiene una
+        réplica a una temperatura de la escalera geométrica [t_min, t_max].
+        Tras cada ronda de `pasos` movimientos se proponen intercambios entre
+        niveles vecinos (pares e impares alternados); lo que se intercambia es
+        la temperatura, no la solución. Las tasas de aceptación por par de
+        niveles quedan en `tasas_intercambio`. Con `desde_actual` las réplicas
+        parten de la mejor solución de este scheduler.
+        """
+        n_replicas = max(2, n_replicas or os.cpu_count() or 2)
+        semilla = random.getrandbits(32) if semilla is None else semilla
+        temps = t_min * (t_max / t_min) ** (np.arange(n_replicas) / (n_replicas - 1))
+        nivel = list(range(n_replicas))  # nivel de temperatura de cada réplica
+        intentos, aceptados = [0] * (n_replicas - 1), [0] * (n_replicas - 1)
+        self.tasas_intercambio = [0.0] * (n_replicas - 1)
+        contexto = self._contexto_procesos()
+        inicial = self.exportar() if desde_actual else None
+        with contexto.Manager() as gestor:
+            buzones = [gestor.Queue() for _ in range(n_replicas)]
+            avance = gestor.Queue()
+            parada = gestor.Event()
+            with ProcessPoolExecutor(n_replicas, mp_context=contexto, initializer=_iniciar_proceso,
+                                     initargs=(type(self), self.datos_entrada, buzones, avance, parada,
+                                               reparto_cpu(self.limite_cpu, n_replicas))) as pool:
+                futuros = [pool.submit(_ejecutar_replica, k, semilla + k, candidatos, inicial) for k in range(n_replicas)]
+                try:
+                    for ronda in range(rondas):
+                        # Las réplicas esperan órdenes entre rondas: basta con no enviar más
+                        if self._detenido() or parada.is_set(): break
+                        for k in range(n_replicas):
+                            buzones[k].put((float(temps[nivel[k]]), pasos))
+                        energia, mejores = {}, {}
+                        while len(energia) < n_replicas:
+                            try: k, actual, mejor = avance.get(timeout=0.5)
+                            except queue.Empty:
+                                # Si una réplica falló, su excepción sale aquí en vez de esperar para siempre
+                                for f in futuros:
+                                    if f.done(): f.result()
+                                continue
+                            energia[k], mejores[k] = actual, mejor
+
+                        replica_en = {n: k for k, n in enumerate(nivel)}
+                        for j in range(ronda % 2, n_replicas - 1, 2):
+                            a, b = replica_en[j], replica_en[j + 1]
+                            intentos[j] += 1
+                            x = (energia[a] - energia[b]) * (1 / temps[j] - 1 / temps[j + 1])
+                            if x >= 0 or random.random() < math.exp(x):
+                                nivel[a], nivel[b] = j + 1, j
+                                aceptados[j] += 1
+
+                        mejor = min(mejores.values())
+                        self.metricas.mejora(mejor)
+                        self.historial_costos.append(mejor)
+                        self.tasas_intercambio = [a / i if i else 0.0 for a, i in zip(aceptados, intentos)]
+                        if status_text:
+                            tasas = " ".join(f"{t:.0%}" for t in self.tasas_intercambio)
+                            status_text.markdown(f"**🌡️ Ronda {ronda+1}/{rondas}** | Conflictos Duros: {int(mejor // 10000)} | Mejor Costo: {mejor:.2f} | Intercambios: {tasas}")
+                        if bar: bar.progress((ronda + 1) / rondas)
+                finally:
+                    for b in buzones: b.put(None)
+                resultados = [f.result() for f in futuros]
+            sin_cpu = parada.is_set()
+
+        self.motivo_parada = "detenido" if self._detenido() else "límite de CPU" if sin_cpu else None
+        for *_, contadores in resultados:
+            self.metricas.sumar(contadores)
+        self.importar(min(resultados, key=lambda r: r[0])[1])
+        return self._resultado()
@@ -0,0 +1,106 @@
+"""Trabajadores de las islas y del templado paralelo (se ejecutan en procesos aparte)."""
+import math
+import queue
+import random
+import signal
+
+try:
+    import resource
+except ImportError:  # Windows: sin límite de CPU por proceso
+    resource = None
+
+# CPU extra tras el límite blando para devolver la mejor solución antes del SIGKILL
+MARGEN_CPU = 30
+
+# ==============================================================================
+# OPTIMIZACIÓN PARALELA (ISLAS Y TEMPLADO PARALELO)
+# ==============================================================================
+# Estado de cada proceso trabajador: clase del motor, entradas ya leídas, colas compartidas,
+# la señal de parada del coordinador y si se agotó la CPU propia
+_PROCESO = {}
+
+def reparto_cpu(limite_cpu, n_procesos):
+    """
+    Segundos de CPU para cada uno de n_procesos trabajadores, de modo que
+    entre todos no pasen de lo que le queda a este proceso de `limite_cpu`;
+    None si no hay límite. RLIMIT_CPU es por proceso: sin este reparto cada
+    trabajador tendría el límite entero.
+    """
+    if not limite_cpu or resource is None:
+        return None
+    uso = resource.getrusage(resource.RUSAGE_SELF)
+    return max(1.0, (limite_cpu - uso.ru_utime - uso.ru_stime) / n_procesos)
+
+def limitar_cpu(limite_cpu, al_agotar):
+    """
+    Fija RLIMIT_CPU de este proceso en `limite_cpu` segundos (más MARGEN_CPU
+    hasta el SIGKILL), sin pasar el límite duro heredado, y llama a
+    `al_agotar` al llegar el SIGXCPU. No hace nada sin límite o sin `resource`.
+    """
+    if not limite_cpu or resource is None:
+        return
+    blando, duro = math.ceil(limite_cpu), math.ceil(limite_cpu) + MARGEN_CPU
+    _, heredado = resource.getrlimit(resource.RLIMIT_CPU)
+    if heredado != resource.RLIM_INFINITY:
+        blando, duro = min(blando, heredado), min(duro, heredado)
+    resource.setrlimit(resource.RLIMIT_CPU, (blando, duro))
+    signal.signal(signal.SIGXCPU, lambda *_: al_agotar())
+
+def _iniciar_proceso(clase, datos, buzones, avance, parada=None, limite_cpu=None):
+    _PROCESO.update(clase=clase, datos=datos, buzones=buzones, avance=avance, parada=parada, sin_cpu=False)
+    # El manejador solo marca: la señal compartida se activa fuera de él, entre pasos
+    limitar_cpu(limite_cpu, lambda: _PROCESO.update(sin_cpu=True))
+
+class _SenalProceso:
+    """
+    Señal de parada de un trabajador, con la interfaz de threading.Event que
+    revisan los motores: la del coordinador, o la CPU propia agotada, que
+    también detiene a los demás trabajadores.
+    """
+    def is_set(self):
+        parada = _PROCESO['parada']
+        if _PROCESO['sin_cpu'] and not parada.is_set():
+            parada.set()
+        return parada.is_set()
+
+def _ejecutar_isla(k, semilla, epocas, iteraciones, inicial=None):
+    """Una isla: su propio TabuScheduler, recocido por épocas y migración en anillo."""
+    random.seed(semilla)
+    sch = _PROCESO['clase'](*_PROCESO['datos'])
+    sch.detener = _SenalProceso()
+    if inicial: sch.importar(inicial)
+    previos = dict(sch.metricas.contadores)
+    buzones = _PROCESO['buzones']
+    for epoca in range(epocas):
+        if sch._detenido(): break
+        sch.optimizar(iteraciones)
+        buzones[(k + 1) % len(buzones)].put((sch.mejor_costo, sch.exportar()))
+        # Migración asíncrona: se toma el mejor inmigrante que haya llegado, si supera al propio
+        llegadas = []
+        while True:
+            try: llegadas.append(buzones[k].get_nowait())
+            except queue.Empty: break
+        if llegadas:
+            costo, filas = min(llegadas, key=lambda m: m[0])
+            if costo < sch.mejor_costo: sch.importar(filas)
+        _PROCESO['avance'].put((k, epoca + 1, sch.mejor_costo))
+    return sch.mejor_costo, sch.exportar(), sch.historial_costos, sch.metricas.desde(previos)
+
+def _ejecutar_replica(k, semilla, candidatos, inicial=None):
+    """Una réplica del templado paralelo: corre a la temperatura que le ordene el coordinador."""
+    random.seed(semilla)
+    sch = _PROCESO['clase'](*_PROCESO['datos'])
+    if inicial: sch.importar(inicial)
+    previos = dict(sch.metricas.contadores)
+    ordenes = _PROCESO['buzones'][k]
+    while True:
+        orden = ordenes.get()
+        if orden is None: break
+        temp, pasos = orden
+        for _ in range(pasos):
+            sch._paso_templado(temp, candidatos)
+            sch.historial_costos.append(sch.mejor_costo)
+        # La ronda se termina igual: el coordinador no manda otra si se agotó la CPU
+        _SenalProceso().is_set()
+        _PROCESO['avance'].put((k, sch.evaluador.costo, sch.mejor_costo))
+    return sch.mejor_costo, sch.exportar(), sch.historial_costos, sch.metricas.desde(previos)
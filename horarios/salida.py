@@ -0,0 +1,199 @@
+"""Tablas de resultados, exportación del horario y reporte de la corrida."""
+import csv
+import hashlib
+import io
+import os
+import zipfile
+from collections import OrderedDict
+
+import pandas as pd
+import xlsxwriter
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pandas recurre entonces a fastparquet
+    pa = pq = None
+
+from .utilidades import format_horario
+
+def tabla_maestra(scheduler, solucion):
+    """Horario maestro: una fila por sección con profesor, días, horario y salón."""
+    return pd.DataFrame([{
+        'ID': a['seccion'].cod, 
+        'Asignatura': a['seccion'].cod.split('-')[0],
+        'Estudiantes (Cupo)': a['seccion'].cupo,
+        'Créditos Reales': scheduler.get_sec_creditos(a['seccion'], a['profesor']),
+        'Persona': a['profesor'], 
+        'Días': a['patron']['name'], 
+        'Horario': format_horario(a['patron'], a['ini']), 
+        'Salón': a['salon']
+    } for a in solucion])
+
+def cargas_finales(scheduler, solucion):
+    """Créditos reales asignados a cada profesor (cero si quedó sin secciones)."""
+    cargas = {}
+    for asign in solucion:
+        p = asign['profesor']
+        if p != "GRADUADOS" and p != "TBA":
+            cargas[p] = cargas.get(p, 0) + scheduler.get_sec_creditos(asign['seccion'], p)
+    for p in scheduler.profesores:
+        if p not in cargas:
+            cargas[p] = 0.0
+    return cargas
+
+SIN_HOJA = ("TBA", "GRADUADOS")
+# Exportaciones recientes por (huella del contenido, formato); el editor de la
+# interfaz vuelve a correr en cada clic, pero el contenido casi nunca cambia
+_EXPORTACIONES = OrderedDict()
+MAX_EXPORTACIONES = 4
+
+def huella_tabla(df):
+    """Hash del contenido de la tabla (columnas y valores); igual contenido, igual huella."""
+    h = hashlib.sha256("\x1f".join(map(str, df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+def _valores(df):
+    """Filas de la tabla como listas de valores de Python, con None en lugar de NaN."""
+    return df.astype(object).where(df.notna(), None).to_numpy().tolist()
+
+def _por_persona(df):
+    """(nombre limpio, posiciones de sus filas) por profesor en una sola pasada de groupby, sin TBA ni GRADUADOS."""
+    usados = set()
+    for p, posiciones in df.groupby('Persona', sort=False).indices.items():
+        if str(p) in SIN_HOJA:
+            continue
+        nombre = "".join([c for c in str(p) if c.isalnum() or c == ' '])[:25]
+        base, k = nombre, 2
+        while nombre.upper() in usados:  # nombres que coinciden tras limpiarlos
+            nombre = f"{base[:22]}_{k}"
+            k += 1
+        usados.add(nombre.upper())
+        yield nombre, posiciones
+
+def _escribir_hoja(libro, nombre, columnas, filas, encabezado):
+    """Hoja fila por fila, como exige el modo constant_memory de xlsxwriter."""
+    hoja = libro.add_worksheet(nombre)
+    hoja.write_row(0, 0, columnas, encabezado)
+    for i, fila in enumerate(filas, start=1):
+        hoja.write_row(i, 0, fila)
+
+def exportar_todo(df):
+    """Libro Excel con la hoja Maestro y una hoja User_<profesor> por profesor."""
+    columnas, valores = [str(c) for c in df.columns], _valores(df)
+    out = io.BytesIO()
+    libro = xlsxwriter.Workbook(out, {'constant_memory': True})
+    encabezado = libro.add_format({'bold': True, 'border': 1})
+    _escribir_hoja(libro, 'Maestro', columnas, valores, encabezado)
+    for nombre, posiciones in _por_persona(df):
+        _escribir_hoja(libro, f"User_{nombre}", columnas, [valores[i] for i in posiciones], encabezado)
+    libro.close()
+    return out.getvalue()
+
+def _csv(columnas, filas):
+    texto = io.StringIO()
+    escritor = csv.writer(texto, lineterminator='\n')
+    escritor.writerow(columnas)
+    escritor.writerows(filas)
+    return texto.getvalue().encode('utf-8-sig')
+
+def _parquet(tabla):
+    buf = io.BytesIO()
+    if pa is None:
+        tabla.to_parquet(buf, index=False)
+    else:
+        pq.write_table(tabla, buf)
+    return buf.getvalue()
+
+def exportar_paquete(df, formato='csv'):
+    """ZIP con Maestro y un archivo por profesor en profesores/, en CSV o Parquet (para campus grandes)."""
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as paquete:
+        if formato == 'csv':
+            columnas, valores = [str(c) for c in df.columns], _valores(df)
+            paquete.writestr("Maestro.csv", _csv(columnas, valores))
+            for nombre, posiciones in _por_persona(df):
+                paquete.writestr(f"profesores/{nombre}.csv", _csv(columnas, [valores[i] for i in posiciones]))
+        else:
+            # Con pyarrow la tabla se convierte una vez y cada profesor es un `take` de sus filas
+            tabla = df if pa is None else pa.Table.from_pandas(df, preserve_index=False)
+            paquete.writestr("Maestro.parquet", _parquet(tabla))
+            for nombre, posiciones in _por_persona(df):
+                filas = df.iloc[posiciones] if pa is None else tabla.take(posiciones)
+                paquete.writestr(f"profesores/{nombre}.parquet", _parquet(filas))
+    return out.getvalue()
+
+FORMATOS_EXPORTACION = {
+    'xlsx': exportar_todo,
+    'csv': lambda df: exportar_paquete(df, 'csv'),
+    'parquet': lambda df: exportar_paquete(df, 'parquet'),
+}
+
+def exportar(df, formato='xlsx'):
+    """Exportación en `formato` ('xlsx', o 'csv'/'parquet' en ZIP), reutilizada mientras la tabla no cambie."""
+    if formato not in FORMATOS_EXPORTACION:
+        raise ValueError(f"Formato de exportación no soportado: {formato}")
+    clave = (huella_tabla(df), formato)
+    if clave in _EXPORTACIONES:
+        _EXPORTACIONES.move_to_end(clave)
+    else:
+        _EXPORTACIONES[clave] = FORMATOS_EXPORTACION[formato](df)
+        while len(_EXPORTACIONES) > MAX_EXPORTACIONES:
+            _EXPORTACIONES.popitem(last=False)
+    return _EXPORTACIONES[clave]
+
+def escribir_horario(df, ruta):
+    """Guarda el horario maestro en Parquet, CSV, Excel (con una hoja por profesor) o ZIP de CSV por profesor, según la extensión."""
+    ext = os.path.splitext(str(ruta))[1].lower()
+    if ext in ('.parquet', '.pq'):
+        df.to_parquet(ruta, index=False)
+    elif ext == '.csv':
+        df.to_csv(ruta, index=False)
+    elif ext == '.xlsx':
+        with open(ruta, 'wb') as f:
+            f.write(exportar_todo(df))
+    elif ext == '.zip':
+        with open(ruta, 'wb') as f:
+            f.write(exportar_paquete(df, 'csv'))
+    else:
+        raise ValueError(f"Formato de salida no soportado: {ruta}")
+
+def reporte_ejecucion(scheduler, conflictos, segundos, **parametros):
+    """Resumen de una corrida, apto para JSON: parámetros, costos, criterio de parada, métricas y conflictos."""
+    return {
+        'parametros': parametros,
+        'segundos': round(segundos, 3),
+        'secciones': len(scheduler.secciones),
+        'profesores': len(scheduler.profesores),
+        'salones': len(scheduler.salones),
+        'costo_total': float(scheduler.mejor_costo),
+        'conflictos_duros': int(conflictos),
+        'costo_blando': float(scheduler.mejor_costo - 10000 * int(scheduler.mejor_costo // 10000)),
+        'motivo_parada': getattr(scheduler, 'motivo_parada', None),
+        'respaldo_recocido': getattr(scheduler, 'respaldo_recocido', False),
+        'iteraciones': scheduler.metricas.contadores.get('iteraciones', 0),
+        'metricas': scheduler.metricas.reporte(),
+        'operadores': {nombre: round(puntaje, 4) for nombre, puntaje in scheduler._puntaje_op.items()},
+        'secciones_sembradas': scheduler.sembradas,
+        'detalle_conflictos': scheduler.evaluador.detalle_conflictos(),
+    }
+
+def resultado_corrida(scheduler, solucion, conflictos, historial, segundos, **parametros):
+    """
+    Todo lo que la interfaz muestra de una corrida, sin el scheduler: tabla
+    maestra, cargas, conflictos, curvas y reporte. Es lo que guardan la cola
+    de trabajos y la caché de soluciones.
+    """
+    return {
+        'maestro': tabla_maestra(scheduler, solucion),
+        'cargas_finales': cargas_finales(scheduler, solucion),
+        'conflictos': conflictos,
+        'detalle_conflictos': scheduler.evaluador.detalle_conflictos(),
+        'historial': historial,
+        'historiales_islas': getattr(scheduler, 'historiales_islas', None),
+        'tasas_intercambio': getattr(scheduler, 'tasas_intercambio', None),
+        'motivo_parada': scheduler.motivo_parada,
+        'segundos': segundos,
+        'reporte': reporte_ejecucion(scheduler, conflictos, segundos, **parametros),
+    }
@@ -0,0 +1,97 @@
+"""Generador de instancias sintéticas (Cursos, Profesores, Salones) de tamaño y dificultad ajustables."""
+import math
+import random
+
+import pandas as pd
+
+CURSOS_FUSIONABLES = ["MATE3171", "MATE3172", "MATE3173"]
+# Minutos útiles por salón y semana: ventana operativa menos la hora universal de martes y jueves
+MINUTOS_SALON_SEMANA = 5 * 660 - 2 * 120
+# Capacidades de los salones chicos (hasta 60 asientos) y grandes (hasta 150), con su peso en el sorteo
+CAPACIDADES = {False: [30, 35, 40, 40, 50, 60], True: [100, 120, 150, 150]}
+
+def generar_instancia(n_secciones=100, ocupacion_salones=0.6, solape_profesores=0.2, prop_compensacion=0.2,
+                      prop_intensivos=0.3, holgura_carga=1.25, semilla=0):
+    """
+    Instancia con `n_secciones` secciones, tal como TabuScheduler las
+    reparte a partir de la demanda. La dificultad se ajusta con:
+
+    - `ocupacion_salones`: fracción de las horas-salón de la semana que
+      piden las secciones (cerca de 1, salones escasos).
+    - `solape_profesores`: fracción de candidatos de cada curso que vienen de
+      otra área, así más profesores compiten por los mismos cursos.
+    - `prop_compensacion` y `prop_intensivos`: fracción de profesores que
+      aceptan compensación o piden cursos intensivos.
+    - `holgura_carga`: capacidad docente total sobre los créditos a cubrir.
+
+    Devuelve (df_cursos, df_profes, df_salones) con las columnas del protocolo.
+    """
+    rng = random.Random(semilla)
+    n_areas = max(1, n_secciones // 60)
+
+    # Profesores por área, con capacidad total de `holgura_carga` veces los créditos esperados
+    n_profes = max(3, math.ceil(n_secciones * 3.6 * holgura_carga / 12))
+    profes = []
+    for i in range(n_profes):
+        intensivos = rng.choice([1, 2]) if rng.random() < prop_intensivos else 0
+        profes.append(dict(NOMBRE=f"PROF{i:05d}", CARGA_MIN=rng.choice([3, 6, 9]), CARGA_MAX=rng.choice([12, 12, 15]),
+                           PREF_DIAS=rng.choice(["", "", "LMWJV", "LWV", "MJ"]), PREF_HORAS=rng.choice(["ANY", "ANY", "AM", "PM"]),
+                           PREF1=None, PREF2=None, PREF3=None,
+                           COMPENSACION="SI" if rng.random() < prop_compensacion else "NO",
+                           ACEPTA_GRANDES=0, CURSOS_INTENSIVOS=intensivos))
+    por_area = [profes[a::n_areas] for a in range(n_areas)]
+    cursos_de = {p['NOMBRE']: [] for p in profes}
+
+    # Cursos hasta completar las secciones pedidas, contadas con la misma regla de TabuScheduler
+    # (si algún candidato acepta compensación, el curso se abre en secciones de hasta 150)
+    cursos = []
+    total = 0
+    while total < n_secciones:
+        i = len(cursos)
+        codigo = CURSOS_FUSIONABLES[i] if i < len(CURSOS_FUSIONABLES) else f"MATE{10000 + i}"
+        area = rng.randrange(n_areas)
+        candidatos = {rng.choice(profes if rng.random() < solape_profesores else por_area[area])['NOMBRE'] for _ in range(4)}
+        compensa = any(profes[int(c[4:])]['COMPENSACION'] == "SI" for c in candidatos)
+        cupo = rng.choice([25, 30, 30, 35, 40])
+        pedidas = min(rng.choice([1, 1, 2, 2, 3, 4, 6]), n_secciones - total)
+        demanda = pedidas * cupo - rng.randrange(cupo // 2)
+        # Cupo de cada sección, con el mismo reparto de expandir_secciones
+        efectivo = min(demanda, 150) if compensa and demanda > cupo else cupo
+        n = math.ceil(demanda / efectivo)
+        cupos = [efectivo] * (n - 1) + [demanda - efectivo * (n - 1)]
+        for c in candidatos:
+            cursos_de[c].append(codigo)
+        if rng.random() < 0.05:
+            candidatos.add("GRADUADOS")
+        cursos.append(dict(CODIGO=codigo, CREDITOS=rng.choice([3, 3, 3, 3, 4, 4, 5]), DEMANDA=demanda, CUPO=cupo,
+                           CANDIDATOS=",".join(sorted(candidatos)), TIPO_SALON=2 if rng.random() < 0.1 else 1,
+                           CUPOS=cupos))
+        total += len(cupos)
+    for p in profes:
+        for k, codigo in enumerate(rng.sample(cursos_de[p['NOMBRE']], min(3, len(cursos_de[p['NOMBRE']])))):
+            p[f"PREF{k + 1}"] = codigo
+
+    # Salones: por tipo y tamaño (hasta 60 o hasta 150 asientos), los necesarios para la ocupación pedida.
+    # De la sección más grande a la más chica, cada cupo tiene suficientes salones donde cabe para sus
+    # minutos y los de las secciones mayores, así ninguna queda sin salón posible.
+    minutos = {}
+    for c in cursos:
+        for cupo in c['CUPOS']:
+            clave = (c['TIPO_SALON'], cupo > 60)
+            minutos.setdefault(clave, {})
+            minutos[clave][cupo] = minutos[clave].get(cupo, 0) + c['CREDITOS'] * 50
+    salones = []
+    for (tipo, grande), por_cupo in sorted(minutos.items()):
+        acumulado = 0
+        creados = 0
+        for cupo in sorted(por_cupo, reverse=True):
+            acumulado += por_cupo[cupo]
+            caben = [c for c in CAPACIDADES[grande] if c >= cupo]
+            while creados < math.ceil(acumulado / (MINUTOS_SALON_SEMANA * ocupacion_salones)):
+                salones.append(dict(CODIGO=f"S{len(salones):05d}", CAPACIDAD=rng.choice(caben), TIPO=tipo))
+                creados += 1
+    # Más los salones mega (FA, FB, ...) donde se fusionan las secciones de cursos fusionables
+    for k in range(max(1, n_secciones // 500)):
+        salones.append(dict(CODIGO=f"F{'ABC'[k % 3]}-{k // 3 + 1}", CAPACIDAD=rng.choice([120, 150]), TIPO=1))
+
+    return pd.DataFrame(cursos).drop(columns='CUPOS'), pd.DataFrame(profes), pd.DataFrame(salones)
@@ -0,0 +1,128 @@
+"""
+Trabajos de optimización en segundo plano: la construcción del scheduler y
+la búsqueda corren en un hilo propio y su estado vive en un registro del
+proceso, no en la sesión de la interfaz. Así la interfaz solo consulta el
+avance cada tanto, y recargar la página no interrumpe la corrida.
+"""
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+
+# Trabajos conocidos por id; al pasar el tope se olvidan los más viejos que ya no corren
+_TRABAJOS = OrderedDict()
+_CANDADO = threading.Lock()
+MAX_TRABAJOS = 16
+
+class Avance:
+    """
+    Hace las veces de barra de progreso y de texto de estado para los
+    motores (`progress`, `markdown`, `text`), pero solo guarda el último
+    valor: reportar cuesta una asignación, no un viaje a la interfaz.
+    """
+    def __init__(self):
+        self.fraccion = 0.0
+        self.mensaje = ""
+
+    def progress(self, valor):
+        self.fraccion = float(valor)
+
+    def markdown(self, texto):
+        self.mensaje = texto
+
+    text = markdown
+
+class Trabajo:
+    """
+    Una corrida en segundo plano. `construir()` arma el TabuScheduler y
+    `ejecutar(scheduler, bar, status_text, reanudar)` corre el motor; lo que
+    devuelve queda en `resultado`. Estados: 'construyendo', 'corriendo',
+    'deteniendo', 'detenido', 'terminado' y 'error'.
+    """
+    def __init__(self, construir, ejecutar, **parametros):
+        self.id = uuid.uuid4().hex
+        self.construir = construir
+        self.ejecutar = ejecutar
+        self.parametros = parametros
+        self.scheduler = None
+        self.estado = 'construyendo'
+        self.avance = Avance()
+        self.resultado = None
+        self.error = None
+        self.segundos = 0.0  # de búsqueda, sumando las reanudaciones
+        self.version = 0     # sube con cada resultado nuevo
+        self._inicio = None
+        self._parar = threading.Event()
+        self._hilo = None
+
+    def _correr(self, reanudar):
+        try:
+            if self.scheduler is None:
+                self.scheduler = self.construir()
+                self.scheduler.detener = self._parar
+            self.estado = 'corriendo'
+            self._inicio = time.perf_counter()
+            resultado = self.ejecutar(self.scheduler, self.avance, self.avance, reanudar)
+            self.segundos += time.perf_counter() - self._inicio
+            self._inicio = None
+            self.resultado = resultado
+            self.version += 1
+            self.estado = 'detenido' if self._parar.is_set() else 'terminado'
+        except Exception:
+            self._inicio = None
+            self.error = traceback.format_exc()
+            self.estado = 'error'
+
+    def _lanzar(self, reanudar):
+        self._parar.clear()
+        self._hilo = threading.Thread(target=self._correr, args=(reanudar,), name=f"trabajo-{self.id[:8]}", daemon=True)
+        self._hilo.start()
+
+    @property
+    def activo(self):
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def detener(self):
+        """Pide a los motores que terminen con la mejor solución hallada hasta ahora."""
+        if self.activo:
+            self._parar.set()
+            self.estado = 'deteniendo'
+
+    def reanudar(self):
+        """Sigue buscando desde la mejor solución, con el mismo motor y presupuesto."""
+        if not self.activo and self.scheduler is not None:
+            self.estado = 'corriendo'
+            self._lanzar(True)
+
+    def estado_actual(self):
+        """Foto del avance para la interfaz: estado, progreso, mejor costo, conflictos duros e iteraciones/s."""
+        sch = self.scheduler
+        en_curso = time.perf_counter() - self._inicio if self._inicio is not None else 0.0
+        segundos = self.segundos + en_curso
+        foto = {'estado': self.estado, 'fraccion': self.avance.fraccion, 'mensaje': self.avance.mensaje,
+                'segundos': segundos, 'mejor_costo': None, 'conflictos_duros': None, 'iteraciones_s': None}
+        if sch is not None:
+            foto['mejor_costo'] = float(sch.mejor_costo)
+            foto['conflictos_duros'] = int(sch.mejor_costo // 10000)
+            busqueda = sch.metricas.tiempos.get('busqueda', 0.0) + en_curso
+            iteraciones = sch.metricas.contadores.get('iteraciones', 0)
+            if busqueda > 0 and iteraciones:
+                foto['iteraciones_s'] = round(iteraciones / busqueda, 1)
+        return foto
+
+def lanzar_trabajo(construir, ejecutar, **parametros):
+    """Registra un Trabajo y lo arranca en su hilo."""
+    trabajo = Trabajo(construir, ejecutar, **parametros)
+    with _CANDADO:
+        _TRABAJOS[trabajo.id] = trabajo
+        terminados = [t for t in _TRABAJOS.values() if t is not trabajo and not t.activo]
+        for viejo in terminados[:max(0, len(_TRABAJOS) - MAX_TRABAJOS)]:
+            del _TRABAJOS[viejo.id]
+    trabajo._lanzar(False)
+    return trabajo
+
+def obtener_trabajo(id_trabajo):
+    """Trabajo registrado con ese id, o None si no existe (o ya se olvidó)."""
+    with _CANDADO:
+        return _TRABAJOS.get(id_trabajo)
@@ -0,0 +1,95 @@
+"""Tablas de referencia (compensación, patrones) y utilidades de horas."""
+
+# ==============================================================================
+# UTILIDADES Y TABLAS DE REFERENCIA
+# ==============================================================================
+COMPENSACION_TABLE = [
+    (1, 1, 44, 0.0), (1, 45, 74, 0.5), (1, 75, 104, 1.0), (1, 105, 134, 1.5), (1, 135, 164, 2.0),
+    (2, 1, 37, 0.0), (2, 38, 52, 0.5), (2, 53, 67, 1.0), (2, 68, 82, 1.5), (2, 83, 97, 2.0),
+    (2, 98, 112, 2.5), (2, 113, 127, 3.0), (2, 128, 142, 3.5), (2, 143, 147, 4.0),
+    (3, 1, 34, 0.0), (3, 35, 44, 0.5), (3, 45, 54, 1.0), (3, 55, 64, 1.5), (3, 65, 74, 2.0),
+    (3, 75, 84, 2.5), (3, 85, 94, 3.0), (3, 95, 104, 3.5), (3, 105, 114, 4.0), (3, 115, 124, 4.5),
+    (3, 125, 134, 5.0), (3, 135, 144, 5.5), (3, 145, 154, 6.0),
+    (4, 1, 33, 0.0), (4, 34, 41, 0.5), (4, 42, 48, 1.0), (4, 49, 56, 1.5), (4, 57, 63, 2.0),
+    (4, 64, 71, 2.5), (4, 72, 78, 3.0), (4, 79, 86, 3.5), (4, 87, 93, 4.0), (4, 94, 101, 4.5),
+    (4, 102, 108, 5.0), (4, 109, 116, 5.5), (4, 117, 123, 6.0), (4, 124, 131, 6.5), (4, 132, 138, 7.0),
+    (4, 139, 146, 7.5), (4, 147, 153, 8.0),
+    (5, 1, 32, 0.0), (5, 33, 38, 0.5), (5, 39, 44, 1.0), (5, 45, 50, 1.5), (5, 51, 56, 2.0),
+    (5, 57, 62, 2.5), (5, 63, 68, 3.0), (5, 69, 74, 3.5), (5, 75, 80, 4.0), (5, 81, 86, 4.5),
+    (5, 87, 92, 5.0), (5, 93, 98, 5.5), (5, 99, 104, 6.0), (5, 105, 110, 6.5), (5, 111, 116, 7.0),
+    (5, 117, 122, 7.5), (5, 123, 128, 8.0)
+]
+
+def get_creditos_reales(creditos_base, cupo):
+    for (cb, min_est, max_est, extra) in COMPENSACION_TABLE:
+        if cb == creditos_base and min_est <= cupo <= max_est:
+            return float(creditos_base) + extra
+    max_extra = 0
+    for (cb, min_est, max_est, extra) in COMPENSACION_TABLE:
+        if cb == creditos_base and cupo >= min_est:
+            max_extra = max(max_extra, extra)
+    return float(creditos_base) + max_extra
+
+def mins_to_str(m):
+    h, mins = divmod(int(m), 60)
+    am_pm = "AM" if h < 12 else "PM"
+    h_disp = h if h <= 12 else h - 12
+    if h_disp == 0: h_disp = 12
+    return f"{h_disp:02d}:{mins:02d} {am_pm}"
+
+def str_to_mins(t_str):
+    t_str = t_str.strip().upper()
+    parts = t_str.split()
+    time_part = parts[0]
+    ampm = parts[1] if len(parts) > 1 else "AM"
+    h, m = map(int, time_part.split(':'))
+    if ampm == "PM" and h != 12: h += 12
+    if ampm == "AM" and h == 12: h = 0
+    return h * 60 + m
+
+PATRONES = {
+    3: [
+        {"name": "Lu-Mi-Vi", "days": {"Lu": 1, "Mi": 1, "Vi": 1}},
+        {"name": "Ma-Ju", "days": {"Ma": 1.5, "Ju": 1.5}},
+        {"name": "Lu (Intensivo)", "days": {"Lu": 3}},
+        {"name": "Ma (Intensivo)", "days": {"Ma": 3}},
+        {"name": "Mi (Intensivo)", "days": {"Mi": 3}},
+        {"name": "Ju (Intensivo)", "days": {"Ju": 3}},
+        {"name": "Vi (Intensivo)", "days": {"Vi": 3}},
+    ],
+    4: [
+        {"name": "Lu-Ma-Mi-Ju", "days": {"Lu": 1, "Ma": 1, "Mi": 1, "Ju": 1}},
+        {"name": "Lu-Ma-Mi-Vi", "days": {"Lu": 1, "Ma": 1, "Mi": 1, "Vi": 1}},
+        {"name": "Lu-Ma-Ju-Vi", "days": {"Lu": 1, "Ma": 1, "Ju": 1, "Vi": 1}},
+        {"name": "Lu-Mi-Ju-Vi", "days": {"Lu": 1, "Mi": 1, "Ju": 1, "Vi": 1}},
+        {"name": "Ma-Mi-Ju-Vi", "days": {"Ma": 1, "Mi": 1, "Ju": 1, "Vi": 1}},
+        {"name": "Lu-Mi", "days": {"Lu": 2, "Mi": 2}},
+        {"name": "Lu-Vi", "days": {"Lu": 2, "Vi": 2}},
+        {"name": "Ma-Ju", "days": {"Ma": 2, "Ju": 2}},
+        {"name": "Mi-Vi", "days": {"Mi": 2, "Vi": 2}},
+    ],
+    5: [
+        {"name": "Lu-Ma-Mi-Ju-Vi", "days": {"Lu": 1, "Ma": 1, "Mi": 1, "Ju": 1, "Vi": 1}},
+        {"name": "Lu-Ma-Mi-Vi", "days": {"Lu": 1, "Ma": 1, "Mi": 1, "Vi": 2}},
+        {"name": "Lu-Ma-Ju-Vi", "days": {"Lu": 1, "Ma": 1, "Ju": 1, "Vi": 2}},
+        {"name": "Lu-Mi-Ju-Vi", "days": {"Lu": 1, "Mi": 1, "Ju": 1, "Vi": 2}},
+        {"name": "Ma-Mi-Ju-Vi", "days": {"Ma": 1, "Mi": 1, "Ju": 1, "Vi": 2}},
+        {"name": "Lu-Mi-Vi", "days": {"Lu": 2, "Mi": 2, "Vi": 1}},
+        {"name": "Ma-Ju-Vi", "days": {"Ma": 1.5, "Ju": 1.5, "Vi": 2}},
+        {"name": "Lu-Ma-Mi", "days": {"Lu": 2, "Ma": 1, "Mi": 2}},
+    ]
+}
+
+CATALOGO_PATRONES = [p for grupo in PATRONES.values() for p in grupo]
+_IDS_PATRON = {(p['name'], tuple(p['days'].items())): n for n, p in enumerate(CATALOGO_PATRONES)}
+
+def id_patron(patron):
+    return _IDS_PATRON[(patron['name'], tuple(patron['days'].items()))]
+
+def format_horario(patron, h_ini):
+    parts = []
+    for dia, contrib in patron['days'].items():
+        mins_duracion = int(contrib * 50)
+        h_fin = h_ini + mins_duracion
+        parts.append(f"{dia}: {mins_to_str(h_ini)}-{mins_to_str(h_fin)}")
+    return " | ".join(parts)